@@ -0,0 +1,144 @@
+from itertools import cycle
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from django.db.models import Model
+
+from tests.factories import ArticleFactory, NewsAgencyFactory, PlaceFactory, RestaurantFactory
+from tests.models import Article, Publication, Reporter, Restaurant, TaggedItem, Waiter
+
+O2M = 'o2m'
+M2M = 'm2m'
+GENERIC = 'generic'
+O2O = 'o2o'
+MTI = 'mti'
+
+Cluster = Tuple[Model, List[Model]]
+
+
+class Scenario(NamedTuple):
+    relation: str
+    fan_out: int
+    aliases: int
+    conflict_rate: float
+    bulk: bool
+
+    @property
+    def name(self) -> str:
+        mode = 'bulk' if self.bulk else 'per-row'
+        return (f'{self.relation}-{mode}-fan_out={self.fan_out}-aliases={self.aliases}-'
+                f'conflicts={self.conflict_rate:g}')
+
+    @property
+    def merge_kwargs(self) -> Dict[str, Any]:
+        kwargs = {'keep_old': False, 'bulk': self.bulk}  # type: Dict[str, Any]
+        if self.relation == O2O:
+            kwargs['o2o_merge_depth'] = 1
+        return kwargs
+
+
+def _spread(alias_objects: List[Model], fan_out: int) -> List[Model]:
+    # children are dealt round robin over the alias objects
+    owners = cycle(alias_objects)
+    return [next(owners) for _ in range(fan_out)]
+
+
+def _conflicts(scenario: Scenario) -> int:
+    return int(scenario.fan_out * scenario.conflict_rate)
+
+
+def build_o2m(scenario: Scenario) -> Cluster:
+    # Waiter is unique on (name, restaurant), conflicting waiters of the aliases are nulled
+    primary_object = RestaurantFactory.create(place=None)
+    alias_objects = RestaurantFactory.create_batch(scenario.aliases, place=None)
+    owners = _spread(alias_objects, scenario.fan_out)
+    conflicts = _conflicts(scenario)
+
+    Waiter.objects.bulk_create([Waiter(name=f'Waiter {i}', restaurant=primary_object) for i in range(conflicts)])
+    Waiter.objects.bulk_create([Waiter(name=f'Waiter {i}', restaurant=owner) for i, owner in enumerate(owners)])
+    return primary_object, alias_objects
+
+
+def build_m2m(scenario: Scenario) -> Cluster:
+    # links to publications the primary article already has are deleted
+    primary_object = ArticleFactory.create(reporter=None)
+    alias_objects = ArticleFactory.create_batch(scenario.aliases, reporter=None)
+    publications = Publication.objects.bulk_create(
+        [Publication(title=f'Publication {i}') for i in range(scenario.fan_out)]
+    )
+    owners = _spread(alias_objects, scenario.fan_out)
+
+    through = Article.publications.through
+    links = [through(article=primary_object, publication=publication)
+             for publication in publications[:_conflicts(scenario)]]
+    links += [through(article=owner, publication=publication) for owner, publication in zip(owners, publications)]
+    through.objects.bulk_create(links)
+    return primary_object, alias_objects
+
+
+def build_generic(scenario: Scenario) -> Cluster:
+    primary_object = ArticleFactory.create(reporter=None)
+    alias_objects = ArticleFactory.create_batch(scenario.aliases, reporter=None)
+    owners = _spread(alias_objects, scenario.fan_out)
+
+    TaggedItem.objects.bulk_create([TaggedItem(tag=f'tag-{i}', content_object=owner) for i, owner in enumerate(owners)])
+    return primary_object, alias_objects
+
+
+def build_o2o(scenario: Scenario) -> Cluster:
+    # places whose restaurants are merged recursively, the children hang off the alias restaurants
+    primary_object = PlaceFactory.create()
+    alias_objects = PlaceFactory.create_batch(scenario.aliases)
+    RestaurantFactory.create(place=primary_object)
+    restaurants = [RestaurantFactory.create(place=alias_object) for alias_object in alias_objects]
+    owners = _spread(restaurants, scenario.fan_out)
+    conflicts = _conflicts(scenario)
+
+    primary_restaurant = Restaurant.objects.get(place=primary_object)
+    Waiter.objects.bulk_create([Waiter(name=f'Waiter {i}', restaurant=primary_restaurant) for i in range(conflicts)])
+    Waiter.objects.bulk_create([Waiter(name=f'Waiter {i}', restaurant=owner) for i, owner in enumerate(owners)])
+    return primary_object, alias_objects
+
+
+def build_mti(scenario: Scenario) -> Cluster:
+    # NewsAgency inherits from Place, its fields are saved to both tables
+    primary_object = NewsAgencyFactory.create(website=None)
+    alias_objects = NewsAgencyFactory.create_batch(scenario.aliases)
+    owners = _spread(alias_objects, scenario.fan_out)
+
+    Reporter.objects.bulk_create([
+        Reporter(email=f'reporter{i}@example.com', first_name='Reporter', last_name=str(i), news_agency=owner)
+        for i, owner in enumerate(owners)
+    ])
+    return primary_object, alias_objects
+
+
+BUILDERS = {
+    O2M: build_o2m,
+    M2M: build_m2m,
+    GENERIC: build_generic,
+    O2O: build_o2o,
+    MTI: build_mti,
+}  # type: Dict[str, Callable[[Scenario], Cluster]]
+
+# relations whose children can conflict with children of the primary object
+CONFLICTING_RELATIONS = {O2M, M2M, O2O}
+
+
+def get_scenarios(
+    relations: List[str],
+    fan_outs: List[int],
+    alias_counts: List[int],
+    conflict_rates: List[float],
+    modes: List[bool],
+    per_row_max_fan_out: int,
+) -> List[Scenario]:
+    scenarios = []
+    for relation in relations:
+        for bulk in modes:
+            for fan_out in fan_outs:
+                if not bulk and fan_out > per_row_max_fan_out:
+                    continue
+                for aliases in alias_counts:
+                    for conflict_rate in conflict_rates if relation in CONFLICTING_RELATIONS else [0.0]:
+                        scenarios.append(Scenario(relation, fan_out, aliases, conflict_rate, bulk))
+    return scenarios
@@ -0,0 +1,50 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+from django.core.cache import caches
+
+
+class CheckpointStore(ABC):
+
+    @abstractmethod
+    def get(self, key: str) -> Any:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any):
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        pass
+
+
+class MemoryCheckpointStore(CheckpointStore):
+
+    def __init__(self) -> None:
+        self.checkpoints = {}  # type: Dict[str, Any]
+
+    def get(self, key: str) -> Any:
+        return self.checkpoints.get(key)
+
+    def set(self, key: str, value: Any):
+        self.checkpoints[key] = value
+
+    def delete(self, key: str):
+        self.checkpoints.pop(key, None)
+
+
+class CacheCheckpointStore(CheckpointStore):
+
+    def __init__(self, cache_alias='default', prefix='django_super_deduper') -> None:
+        self.cache = caches[cache_alias]
+        self.prefix = prefix
+
+    def get(self, key: str) -> Any:
+        return self.cache.get(f'{self.prefix}:{key}')
+
+    def set(self, key: str, value: Any):
+        self.cache.set(f'{self.prefix}:{key}', value, timeout=None)
+
+    def delete(self, key: str):
+        self.cache.delete(f'{self.prefix}:{key}')
@@ -0,0 +1,90 @@
+import logging
+from itertools import groupby
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from django.db.models import Count, F, Model, QuerySet, Window
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Lower, Substr, Trim
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+BlockingKey = Union[str, Combinable]
+
+
+def _resolve(key: BlockingKey) -> Combinable:
+    return F(key) if isinstance(key, str) else key
+
+
+def normalized(key: BlockingKey) -> Combinable:
+    return Lower(Trim(_resolve(key)))
+
+
+def prefix(key: BlockingKey, length: int) -> Combinable:
+    return Substr(_resolve(key), 1, length)
+
+
+def _get_queryset(model_or_queryset) -> QuerySet:
+    if isinstance(model_or_queryset, QuerySet):
+        return model_or_queryset
+    return model_or_queryset._default_manager.all()
+
+
+def _cluster_block(
+    objs: List[Model],
+    match: Optional[Callable[[Model, Model], bool]],
+) -> Iterator[Tuple[Model, List[Model]]]:
+    if match is None:
+        yield objs[0], objs[1:]
+        return
+
+    clusters = []  # type: List[Tuple[Model, List[Model]]]
+    for obj in objs:
+        for primary_object, alias_objects in clusters:
+            if match(primary_object, obj):
+                alias_objects.append(obj)
+                break
+        else:
+            clusters.append((obj, []))
+
+    for primary_object, alias_objects in clusters:
+        if alias_objects:
+            yield primary_object, alias_objects
+
+
+def get_blocked_queryset(model_or_queryset, blocking_keys: Sequence[BlockingKey], order_by: Sequence[str] = ('pk', )):
+    queryset = _get_queryset(model_or_queryset)
+    key_names = [f'_blocking_key_{i}' for i in range(len(blocking_keys))]
+    if not key_names:
+        return queryset.order_by(*order_by), key_names
+
+    # Only rows sharing all blocking keys with at least one other row leave the database
+    queryset = (
+        queryset
+        .annotate(**{name: _resolve(key) for name, key in zip(key_names, blocking_keys)})
+        .filter(**{f'{name}__isnull': False for name in key_names})
+        .annotate(_block_size=Window(Count('pk'), partition_by=[F(name) for name in key_names]))
+        .filter(_block_size__gt=1)
+        .order_by(*key_names, *order_by)
+    )
+    return queryset, key_names
+
+
+def find_clusters(
+    model_or_queryset,
+    blocking_keys: Sequence[BlockingKey],
+    order_by: Sequence[str] = ('pk', ),
+    match: Optional[Callable[[Model, Model], bool]] = None,
+    chunk_size=2000,
+) -> Iterator[Tuple[Model, List[Model]]]:
+    queryset, key_names = get_blocked_queryset(model_or_queryset, blocking_keys, order_by)
+
+    blocks = groupby(
+        queryset.iterator(chunk_size=chunk_size),
+        key=lambda obj: tuple(getattr(obj, name) for name in key_names),
+    )
+    for blocking_key, block in blocks:
+        objs = list(block)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Comparing {len(objs)} {queryset.model.__name__} object(s) in block {blocking_key}')
+        yield from _cluster_block(objs, match)
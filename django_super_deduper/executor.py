@@ -0,0 +1,132 @@
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import django
+from django.apps import apps
+from django.db import connections, router, transaction
+from django.db.models import Model
+
+from .merge import MergedModelInstance
+from .models import ModelMeta
+from .reports import ClusterResult, ExecutionReport
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+def _initialize_worker():
+    if not apps.ready:
+        django.setup()
+    # every worker opens its own database connections instead of sharing the parent's
+    connections.close_all()
+
+
+def _merge_cluster(model_label: str, primary_pk, alias_pks: List, merge_kwargs: Dict) -> ClusterResult:
+    start = time.monotonic()
+    try:
+        model = apps.get_model(model_label)
+        with transaction.atomic(using=router.db_for_write(model)):
+            objs = model._base_manager.in_bulk([primary_pk, *alias_pks])
+            MergedModelInstance.create(objs[primary_pk], [objs[pk] for pk in alias_pks], **merge_kwargs)
+    except Exception as e:
+        return ClusterResult(primary_pk, alias_pks, time.monotonic() - start, f'{e.__class__.__name__}: {e}')
+    return ClusterResult(primary_pk, alias_pks, time.monotonic() - start)
+
+
+class ParallelMergeExecutor(object):
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        executor_class: Callable[..., Executor] = ProcessPoolExecutor,
+        **merge_kwargs,
+    ) -> None:
+        self.max_workers = max_workers
+        self.executor_class = executor_class
+        # locking in pk order keeps concurrent workers from deadlocking on shared rows
+        merge_kwargs.setdefault('atomic', True)
+        self.merge_kwargs = merge_kwargs
+
+    @classmethod
+    def get_conflict_graph(cls, clusters: List[Tuple[Model, List[Model]]]) -> Dict[int, Set[int]]:
+        owners = defaultdict(set)  # type: dict
+
+        all_alias_objects = []  # type: List[Model]
+        cluster_indexes = []  # type: List[int]
+        for i, (primary_object, alias_objects) in enumerate(clusters):
+            for obj in [primary_object, *alias_objects]:
+                owners[obj._meta.label, str(obj.pk)].add(i)
+            all_alias_objects.extend(alias_objects)
+            cluster_indexes.extend([i] * len(alias_objects))
+
+        for relation in ModelMeta(clusters[0][0]).relations if clusters else []:
+            if relation.alias_attname is None:
+                continue
+
+            alias_map = dict(zip(map(str, relation.get_alias_values(all_alias_objects)), cluster_indexes))
+            queryset, alias_attnames = relation.get_alias_rows(all_alias_objects)
+            label = queryset.model._meta.label
+            for pk, *alias_values in queryset.values_list('pk', *alias_attnames):
+                for alias_value in alias_values:
+                    owners[label, str(pk)].add(alias_map.get(str(alias_value)))
+
+        graph = {i: set() for i in range(len(clusters))}  # type: Dict[int, Set[int]]
+        for indexes in owners.values():
+            indexes.discard(None)
+            for i in indexes:
+                graph[i] |= indexes - {i}
+        return graph
+
+    @classmethod
+    def schedule(cls, clusters: List[Tuple[Model, List[Model]]]) -> List[List[int]]:
+        # clusters in the same wave touch disjoint rows and can be merged concurrently
+        graph = cls.get_conflict_graph(clusters)
+        waves = []  # type: List[List[int]]
+        wave_members = []  # type: List[Set[int]]
+
+        for i in range(len(clusters)):
+            for wave, members in zip(waves, wave_members):
+                if members.isdisjoint(graph[i]):
+                    wave.append(i)
+                    members.add(i)
+                    break
+            else:
+                waves.append([i])
+                wave_members.append({i})
+
+        return waves
+
+    def run(self, clusters: Iterable[Tuple[Model, List[Model]]]) -> ExecutionReport:
+        debug = logger.isEnabledFor(logging.DEBUG)
+        clusters = [(primary_object, list(alias_objects)) for primary_object, alias_objects in clusters]
+        if not clusters:
+            return ExecutionReport('', 0)
+
+        start = time.monotonic()
+        model = clusters[0][0].__class__
+        waves = self.schedule(clusters)
+        report = ExecutionReport(model.__name__, len(waves))
+        args = [
+            (model._meta.label, primary_object.pk, [obj.pk for obj in alias_objects], self.merge_kwargs)
+            for primary_object, alias_objects in clusters
+        ]
+
+        if self.max_workers == 1:
+            for wave in waves:
+                report.results.extend(_merge_cluster(*args[i]) for i in wave)
+        else:
+            # forked workers must not inherit open connections
+            connections.close_all()
+            with self.executor_class(max_workers=self.max_workers, initializer=_initialize_worker) as executor:
+                for n, wave in enumerate(waves):
+                    if debug:
+                        logger.debug(f'Merging wave {n + 1}/{len(waves)} of {len(wave)} {model.__name__} cluster(s)')
+                    report.results.extend(executor.map(_merge_cluster, *zip(*(args[i] for i in wave))))
+
+        report.elapsed = time.monotonic() - start
+        for result in report.failures:
+            logger.warning(f'Merging {model.__name__}[pk={result.primary_pk}] failed: {result.error}')
+        return report
@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class IndexConfig(AppConfig):
+    name = 'django_super_deduper.index'
+    label = 'super_deduper_index'
+    verbose_name = 'Dedupe index'
+    default_auto_field = 'django.db.models.AutoField'
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router, transaction
+from django.db.models import Count, F, Model, QuerySet, Window
+from django.db.models.expressions import Combinable
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_save
+
+from ..discover import BlockingKey, _cluster_block, _get_queryset, _resolve
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# Blocking keys of the indexed models by name. Objects that share every key of one name are candidate duplicates.
+_indexed_models = {}  # type: Dict[type, Dict[str, List[BlockingKey]]]
+
+
+def _get_dispatch_uid(model) -> str:
+    return f'{__name__}:{model._meta.label}'
+
+
+def register(model, blocking_keys: Dict[str, Sequence[BlockingKey]]):
+    _indexed_models[model] = {name: list(keys) for name, keys in blocking_keys.items()}
+    post_save.connect(_update_instance_index, sender=model, dispatch_uid=_get_dispatch_uid(model))
+    post_delete.connect(_delete_instance_index, sender=model, dispatch_uid=_get_dispatch_uid(model))
+
+
+def unregister(model):
+    _indexed_models.pop(model, None)
+    post_save.disconnect(sender=model, dispatch_uid=_get_dispatch_uid(model))
+    post_delete.disconnect(sender=model, dispatch_uid=_get_dispatch_uid(model))
+
+
+def _get_index(using: Optional[str] = None) -> QuerySet:
+    # the index app is only loaded when models are indexed
+    from .models import DedupeIndex
+
+    return DedupeIndex.objects.using(using or router.db_for_write(DedupeIndex))
+
+
+def _get_digest(name: str, values: Sequence) -> str:
+    # the name is part of the digest, so keys of different names never match
+    return hashlib.sha1(json.dumps([name, *values], cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def _annotate_blocking_keys(queryset: QuerySet) -> Tuple[QuerySet, Dict[str, List[str]]]:
+    # blocking keys are computed by the database, the same way `find_clusters` computes them
+    annotations = {}  # type: Dict[str, Combinable]
+    key_names = {}  # type: Dict[str, List[str]]
+    for name, keys in _indexed_models[queryset.model].items():
+        key_names[name] = []
+        for key in keys:
+            key_name = f'_blocking_key_{len(annotations)}'
+            annotations[key_name] = _resolve(key)
+            key_names[name].append(key_name)
+
+    return queryset.annotate(**annotations).values('pk', *annotations), key_names
+
+
+def update_index(model_or_queryset, batch_size=1000) -> int:
+    # Indexes the objects of a model or queryset again, e.g. the objects written with `bulk_create()` or `update()`,
+    # which send no signals. Objects with a NULL blocking key are not indexed under its name.
+    queryset = _get_queryset(model_or_queryset).order_by()
+    label = queryset.model._meta.label
+    index = _get_index()
+    rows, key_names = _annotate_blocking_keys(queryset)
+    rows = rows.iterator(chunk_size=batch_size)
+    indexed = 0
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+
+        entries = []
+        for row in batch:
+            for name, names in key_names.items():
+                values = [row[key_name] for key_name in names]
+                if None not in values:
+                    entries.append(index.model(
+                        model=label, object_pk=str(row['pk']), name=name, key=_get_digest(name, values),
+                    ))
+
+        with transaction.atomic(using=index.db):
+            index.filter(model=label, object_pk__in=[str(row['pk']) for row in batch]).delete()
+            index.bulk_create(entries)
+        indexed += len(batch)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f'Indexed {indexed} {queryset.model.__name__} object(s)')
+    return indexed
+
+
+def _update_instance_index(sender, instance: Model, using: str, **kwargs):
+    update_index(sender._base_manager.using(using).filter(pk=instance.pk))
+
+
+def _delete_instance_index(sender, instance: Model, **kwargs):
+    _get_index().filter(model=sender._meta.label, object_pk=str(instance.pk)).delete()
+
+
+def get_candidates(instance: Model, queryset: Optional[QuerySet] = None) -> QuerySet:
+    # The objects sharing a blocking key with `instance`, in a single statement that looks the keys up through the
+    # (model, key) index. The index must live in the database of `queryset`.
+    model = instance.__class__
+    queryset = _get_queryset(queryset if queryset is not None else model)
+    object_pk = str(instance.pk)
+    index = _get_index(queryset.db).filter(model=model._meta.label)
+
+    candidate_pks = (
+        index
+        .filter(key__in=index.filter(object_pk=object_pk).values('key'))
+        .exclude(object_pk=object_pk)
+        .annotate(_object_pk=Cast('object_pk', output_field=model._meta.pk))
+        .values('_object_pk')
+    )
+    return queryset.filter(pk__in=candidate_pks)
+
+
+def find_indexed_clusters(
+    model_or_queryset,
+    since=None,
+    match: Optional[Callable[[Model, Model], bool]] = None,
+) -> Iterator[Tuple[Model, List[Model]]]:
+    # Clusters of the objects sharing a blocking key with an object indexed since `since`, so an incremental run only
+    # compares the objects around the rows written since the previous run. The object with the lowest pk of each
+    # cluster is its primary, and an object is only part of the first cluster it falls in.
+    queryset = _get_queryset(model_or_queryset)
+    to_python = queryset.model._meta.pk.to_python
+    index = _get_index(queryset.db).filter(model=queryset.model._meta.label)
+
+    entries = index
+    if since is not None:
+        entries = index.filter(key__in=index.filter(updated_at__gte=since).values('key'))
+    entries = (
+        entries
+        .annotate(_block_size=Window(Count('pk'), partition_by=[F('key')]))
+        .filter(_block_size__gt=1)
+        .order_by('key', 'pk')
+        .values_list('key', 'object_pk')
+    )
+    blocks = [{to_python(pk) for _, pk in block} for _, block in groupby(entries, key=itemgetter(0))]
+    objs = queryset.in_bulk({pk for block in blocks for pk in block})
+
+    clustered = set()  # type: set
+    for block in blocks:
+        block_objs = sorted((objs[pk] for pk in block if pk in objs and pk not in clustered), key=lambda obj: obj.pk)
+        if len(block_objs) < 2:
+            continue
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Comparing {len(block_objs)} {queryset.model.__name__} object(s) of an indexed block')
+        for primary_object, alias_objects in _cluster_block(block_objs, match):
+            clustered.update(obj.pk for obj in [primary_object, *alias_objects])
+            yield primary_object, alias_objects
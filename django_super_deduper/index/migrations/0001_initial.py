@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DedupeIndex',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=255)),
+                ('object_pk', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=100)),
+                ('key', models.CharField(max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'key'], name='super_dedup_model_e51683_idx')],
+                'constraints': [
+                    models.UniqueConstraint(fields=('model', 'object_pk', 'name'), name='unique_dedupe_index_entry'),
+                ],
+            },
+        ),
+    ]
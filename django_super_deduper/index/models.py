@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class DedupeIndex(models.Model):
+    model = models.CharField(max_length=255)
+    object_pk = models.CharField(max_length=255)
+    name = models.CharField(max_length=100)
+    # digest of the blocking key name and values, see `django_super_deduper.index.indexing`
+    key = models.CharField(max_length=40)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model', 'object_pk', 'name'], name='unique_dedupe_index_entry'),
+        ]
+        indexes = [models.Index(fields=['model', 'key'])]
+
+    def __str__(self) -> str:
+        return f'{self.model}[pk={self.object_pk}] {self.name}: {self.key}'
@@ -0,0 +1,100 @@
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from django.db import connections
+from django.dispatch import Signal
+
+from asgiref.sync import sync_to_async
+
+# Sent after every instrumented batch of merges with `metrics`, a `MergeMetrics`, and `primary_objects`
+merge_measured = Signal()
+
+
+class PhaseMetrics(object):
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.elapsed = 0.0
+        self.statements = 0
+        self.rows = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements += 1
+        result = execute(sql, params, many, context)
+        # SELECT row counts are not reported by every backend, only rows written are counted
+        rowcount = context['cursor'].rowcount
+        if rowcount > 0 and not sql.lstrip()[:6].upper() == 'SELECT':
+            self.rows += rowcount
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'elapsed': self.elapsed,
+            'statements': self.statements,
+            'rows': self.rows,
+        }
+
+
+class MergeMetrics(object):
+    # Relation phases are named after the accessor of the relation, the other phases are `lock`, `snapshot`,
+    # `prefetch`, `fields`, `delete`, `save` and `journal`
+
+    def __init__(self, model_name: str, using: str) -> None:
+        self.model_name = model_name
+        self.using = using
+        self.phases = {}  # type: Dict[str, PhaseMetrics]
+
+    def _get_phase(self, name: str) -> PhaseMetrics:
+        return self.phases.setdefault(name, PhaseMetrics(name))
+
+    @contextmanager
+    def measure(self, name: str, using: Optional[str] = None):
+        # relations routed to another database are measured on the connection of the thread rewriting them
+        phase = self._get_phase(name)
+        start = time.monotonic()
+        try:
+            with connections[using or self.using].execute_wrapper(phase):
+                yield phase
+        finally:
+            phase.elapsed += time.monotonic() - start
+
+    def _add_wrapper(self, phase: PhaseMetrics):
+        connections[self.using].execute_wrappers.append(phase)
+
+    def _remove_wrapper(self, phase: PhaseMetrics):
+        connections[self.using].execute_wrappers.remove(phase)
+
+    @asynccontextmanager
+    async def ameasure(self, name: str):
+        # async queries run on the connection of the thread sensitive executor, the wrapper is installed there
+        phase = self._get_phase(name)
+        await sync_to_async(self._add_wrapper)(phase)
+        start = time.monotonic()
+        try:
+            yield phase
+        finally:
+            phase.elapsed += time.monotonic() - start
+            await sync_to_async(self._remove_wrapper)(phase)
+
+    @property
+    def elapsed(self) -> float:
+        return sum(phase.elapsed for phase in self.phases.values())
+
+    @property
+    def statements(self) -> int:
+        return sum(phase.statements for phase in self.phases.values())
+
+    @property
+    def rows(self) -> int:
+        return sum(phase.rows for phase in self.phases.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            'model_name': self.model_name,
+            'phases': [phase.to_dict() for phase in self.phases.values()],
+            'elapsed': self.elapsed,
+            'statements': self.statements,
+            'rows': self.rows,
+        }
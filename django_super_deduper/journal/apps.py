@@ -0,0 +1,8 @@
+from django.apps import AppConfig
+
+
+class JournalConfig(AppConfig):
+    name = 'django_super_deduper.journal'
+    label = 'super_deduper_journal'
+    verbose_name = 'Merge journal'
+    default_auto_field = 'django.db.models.AutoField'
@@ -0,0 +1,30 @@
+import uuid
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MergeJournal',
+            fields=[
+                ('merge_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('model', models.CharField(max_length=255)),
+                ('primary_pk', models.CharField(max_length=255)),
+                ('alias_pks', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('unmerged_at', models.DateTimeField(blank=True, null=True)),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model', 'primary_pk'], name='super_dedup_model_fc9e26_idx')],
+            },
+        ),
+    ]
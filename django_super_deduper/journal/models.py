@@ -0,0 +1,21 @@
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class MergeJournal(models.Model):
+    merge_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    model = models.CharField(max_length=255)
+    primary_pk = models.CharField(max_length=255)
+    alias_pks = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    unmerged_at = models.DateTimeField(null=True, blank=True)
+    # zlib compressed JSON of the operations to undo, see `django_super_deduper.journal.operations`
+    data = models.BinaryField()
+
+    class Meta:
+        indexes = [models.Index(fields=['model', 'primary_pk'])]
+
+    def __str__(self) -> str:
+        return f'{self.model}[pk={self.primary_pk}] merge {self.merge_id}'
@@ -0,0 +1,222 @@
+import base64
+import datetime
+import json
+import logging
+import uuid
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+from django.db.models import Model, QuerySet
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from ..transactions import TwoPhaseCommit
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# A journal is a list of operations, each storing its rows column by column and the database they were written to,
+# that `unmerge` replays backwards:
+#   [UPDATE, label, [pk, *attnames], columns, using]  rows whose columns held these values before the merge
+#   [DELETE, label, attnames, columns, using]         rows deleted by the merge, with every column of their table
+#   [INSERT, label, [source, target], columns, using] links created by the merge
+UPDATE = 'update'
+DELETE = 'delete'
+INSERT = 'insert'
+
+
+class JournalEncoder(DjangoJSONEncoder):
+    # datetimes keep their microseconds and binary values are base64 encoded, which `Field.to_python` reads back
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, (bytes, memoryview)):
+            return base64.b64encode(o).decode()
+        return super().default(o)
+
+
+def encode(operations: List[List]) -> bytes:
+    return zlib.compress(json.dumps(operations, cls=JournalEncoder, separators=(',', ':')).encode())
+
+
+def decode(data) -> List[List]:
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def _batches(items: Sequence, size: int) -> Iterator[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _batch_size(fields: List, objs: Sequence, using: str) -> int:
+    return max(connections[using].ops.bulk_batch_size(fields, objs), 1)
+
+
+class JournalRecorder(object):
+
+    def __init__(self, primary_object: Model) -> None:
+        self.merge_id = uuid.uuid4()
+        self.primary_object = primary_object
+        self.alias_pks = []  # type: List
+        self.operations = []  # type: List[List]
+
+    def _append(self, operation: str, model, attnames: List[str], rows: List, using: str):
+        if rows:
+            columns = [list(column) for column in zip(*rows)]
+            self.operations.append([operation, model._meta.label, attnames, columns, using])
+
+    def record_update(self, model, attnames: List[str], rows: List, using: str):
+        # rows are (pk, *values) tuples of the values the merge is about to overwrite
+        self._append(UPDATE, model, [model._meta.pk.attname, *attnames], rows, using)
+
+    def record_insert(self, model, attnames: List[str], rows: List, using: str):
+        self._append(INSERT, model, attnames, rows, using)
+
+    def record_delete(self, model, queryset: QuerySet):
+        # rows are read again with every column, collected instances only load the fields needed to delete them
+        model = model._meta.concrete_model
+        attnames = [field.attname for field in model._meta.local_concrete_fields]
+        self._append(DELETE, model, attnames, list(queryset.values_list(*attnames)), queryset.db)
+
+    def record_deleted_objects(self, model, objs: List[Model]):
+        model = model._meta.concrete_model
+        attnames = [field.attname for field in model._meta.local_concrete_fields]
+        rows = [[getattr(obj, attname) for attname in attnames] for obj in objs]
+        if rows:
+            self._append(DELETE, model, attnames, rows, objs[0]._state.db)
+
+    def record_collector(self, collector: Collector):
+        # Operations are replayed backwards: the rows deleted last are parents of the rows deleted before them, and
+        # foreign keys set to null or to a default are restored once the rows they point at exist again
+        using = collector.using
+        for (field, _), instances_list in collector.field_updates.items():
+            for instances in instances_list:
+                if not isinstance(instances, QuerySet):
+                    instances = list(instances)
+                    model = instances[0].__class__
+                    instances = model._base_manager.using(using).filter(pk__in=[obj.pk for obj in instances])
+                self.record_update(instances.model, [field.attname], list(instances.values_list('pk', field.attname)),
+                                   using)
+
+        for queryset in collector.fast_deletes:
+            self.record_delete(queryset.model, queryset)
+
+        collector.sort()
+        for model, instances in collector.data.items():
+            pks = [obj.pk for obj in instances]
+            manager = model._base_manager.using(using)
+            for batch in _batches(pks, _batch_size([model._meta.pk], pks, using)):
+                self.record_delete(model, manager.filter(pk__in=batch))
+
+    def delete(self, objs, using: str, origin=None):
+        # the deletion is collected once, and journaled with every row it cascades to before it runs
+        collector = Collector(using=using, origin=origin)
+        collector.collect(objs)
+        self.record_collector(collector)
+        collector.delete()
+
+
+def save_journals(recorders: List[JournalRecorder]):
+    # the journal app is only loaded when merges are journaled
+    from .models import MergeJournal
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f'Saving {len(recorders)} merge journal(s) with '
+                     f'{sum(len(recorder.operations) for recorder in recorders)} operation(s)')
+    MergeJournal.objects.using(router.db_for_write(MergeJournal)).bulk_create([
+        MergeJournal(
+            merge_id=recorder.merge_id,
+            model=recorder.primary_object._meta.label,
+            primary_pk=str(recorder.primary_object.pk),
+            alias_pks=recorder.alias_pks,
+            data=encode(recorder.operations),
+        )
+        for recorder in recorders
+    ])
+
+
+def _to_python(fields: List, row: Sequence) -> Dict:
+    return {field.attname: field.to_python(value) for field, value in zip(fields, row)}
+
+
+def _replay_update(model, attnames: List[str], columns: List[List], using: str):
+    # rows that held the same values are restored with one statement
+    manager = model._base_manager.using(using)
+    pk_field, *fields = [model._meta.get_field(attname) for attname in attnames]
+    groups = defaultdict(list)  # type: Dict[str, List]
+    for pk, *values in zip(*columns):
+        groups[json.dumps(values, sort_keys=True)].append(pk_field.to_python(pk))
+
+    for key, pks in groups.items():
+        update = _to_python(fields, json.loads(key))
+        for batch in _batches(pks, _batch_size([pk_field], pks, using)):
+            manager.filter(pk__in=batch).update(**update)
+
+
+def _replay_delete(model, attnames: List[str], columns: List[List], using: str):
+    # Deleted rows are inserted again table by table, raw values skip `pre_save` so auto_now fields are kept
+    manager = model._base_manager.using(using)
+    fields = [model._meta.get_field(attname) for attname in attnames]
+    objs = [model(**_to_python(fields, row)) for row in zip(*columns)]
+    for batch in _batches(objs, _batch_size(fields, objs, using)):
+        manager._insert(batch, fields=fields, raw=True, using=using)
+
+
+def _replay_insert(model, attnames: List[str], columns: List[List], using: str):
+    # links created by the merge are deleted with one statement per source object
+    manager = model._base_manager.using(using)
+    source_field, target_field = [model._meta.get_field(attname) for attname in attnames]
+    groups = defaultdict(list)  # type: Dict
+    for source, target in zip(*columns):
+        groups[source_field.to_python(source)].append(target_field.to_python(target))
+
+    for source, targets in groups.items():
+        for batch in _batches(targets, _batch_size([target_field], targets, using)):
+            manager.filter(**{source_field.attname: source, f'{target_field.attname}__in': batch}).delete()
+
+
+REPLAYS = {
+    UPDATE: _replay_update,
+    DELETE: _replay_delete,
+    INSERT: _replay_insert,
+}
+
+
+def unmerge(merge_id, using: Optional[str] = None):
+    from .models import MergeJournal
+
+    using = using or router.db_for_write(MergeJournal)
+    # operations are replayed on the database they were written to, those of other databases than the one of the
+    # journal by the participants of a two-phase commit that commits them before the journal is marked as undone
+    two_phase_commit = TwoPhaseCommit()
+    try:
+        with transaction.atomic(using=using):
+            journal = MergeJournal.objects.using(using).select_for_update().get(merge_id=merge_id)
+            if journal.unmerged_at is not None:
+                raise ValueError(f'Merge {merge_id} of {journal.model}[pk={journal.primary_pk}] was already undone')
+
+            operations = decode(journal.data)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f'Undoing merge {merge_id} of {journal.model}[pk={journal.primary_pk}] with '
+                             f'{len(operations)} operation(s)')
+            for operation, label, attnames, columns, operation_using in reversed(operations):
+                replay = REPLAYS[operation]
+                if operation_using == using:
+                    replay(apps.get_model(label), attnames, columns, operation_using)
+                else:
+                    two_phase_commit.submit(operation_using, replay, apps.get_model(label), attnames, columns,
+                                            operation_using)
+            two_phase_commit.prepare()
+
+            journal.unmerged_at = timezone.now()
+            journal.save(update_fields=['unmerged_at'])
+            two_phase_commit.commit()
+    except BaseException:
+        two_phase_commit.rollback()
+        raise
+    return journal
@@ -0,0 +1,168 @@
+import csv
+import json
+import logging
+from itertools import groupby, islice
+from typing import IO, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+
+from django_super_deduper.merge import MergedModelInstance
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+CSV = 'csv'
+JSONL = 'jsonl'
+
+
+class ClusterRow(NamedTuple):
+    model: str
+    primary_pk: str
+    alias_pks: List[str]
+
+
+def read_csv_clusters(f: IO) -> Iterator[ClusterRow]:
+    # app_label.Model,primary_pk,alias_pk[,alias_pk...], a header row is skipped
+    for i, row in enumerate(csv.reader(f)):
+        if not row or (i == 0 and row[1:2] == ['primary_pk']):
+            continue
+        yield ClusterRow(row[0], row[1], [pk for pk in row[2:] if pk])
+
+
+def read_jsonl_clusters(f: IO) -> Iterator[ClusterRow]:
+    # {"model": "app_label.Model", "primary_pk": 1, "alias_pks": [2, 3]}, failure files have the same shape
+    for line in f:
+        if line.strip():
+            row = json.loads(line)
+            yield ClusterRow(row['model'], row['primary_pk'], row['alias_pks'])
+
+
+class Command(BaseCommand):
+    help = 'Merges the duplicate clusters listed in a CSV or JSONL file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='a file of `app_label.Model, primary_pk, alias_pks` clusters')
+        parser.add_argument('--format', choices=[CSV, JSONL], help='inferred from the file extension by default')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='clusters loaded with one in_bulk query per model')
+        parser.add_argument('--transaction-size', type=int, default=100,
+                            help='clusters merged and committed together')
+        parser.add_argument('--audit-log', help='JSONL file receiving the audit trail of every merged cluster')
+        parser.add_argument('--failures', help='JSONL file receiving the clusters that failed, which can be '
+                                               'passed back to this command')
+        parser.add_argument('--delete-aliases', action='store_true', help='delete the alias objects once merged')
+        parser.add_argument('--per-row', action='store_true', help='save related objects one by one')
+        parser.add_argument('--o2o-merge-depth', type=int, default=0)
+        parser.add_argument('--generic-foreign-keys', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['transaction_size'] < 1:
+            raise CommandError('--batch-size and --transaction-size must be positive')
+
+        file_format = options['format'] or (JSONL if options['path'].endswith(('.jsonl', '.json')) else CSV)
+        read_clusters = read_jsonl_clusters if file_format == JSONL else read_csv_clusters
+        self.merge_kwargs = {
+            'keep_old': not options['delete_aliases'],
+            'bulk': not options['per_row'],
+            'o2o_merge_depth': options['o2o_merge_depth'],
+            'generic_foreign_keys': options['generic_foreign_keys'],
+        }
+        self.transaction_size = options['transaction_size']
+        self.merged = self.failed = 0
+
+        audit_log = open(options['audit_log'], 'w') if options['audit_log'] else None
+        failures = open(options['failures'], 'w') if options['failures'] else None
+        self.audit_log, self.failures = audit_log, failures
+        try:
+            with open(options['path'], newline='') as f:
+                for batch in self._batches(read_clusters(f), options['batch_size']):
+                    self._merge_batch(batch)
+        finally:
+            for log in (audit_log, failures):
+                if log is not None:
+                    log.close()
+
+        self.stdout.write(f'Merged {self.merged} cluster(s), {self.failed} failed')
+
+    @staticmethod
+    def _batches(rows: Iterable[ClusterRow], batch_size: int) -> Iterator[List[ClusterRow]]:
+        # rows are only read as far as the current batch, and a batch never mixes models
+        for _, model_rows in groupby(rows, key=lambda row: row.model):
+            while True:
+                batch = list(islice(model_rows, batch_size))
+                if not batch:
+                    break
+                yield batch
+
+    def _merge_batch(self, batch: List[ClusterRow]):
+        try:
+            model = apps.get_model(batch[0].model)
+        except (LookupError, ValueError) as e:
+            for row in batch:
+                self._fail(row, f'{e.__class__.__name__}: {e}')
+            return
+
+        clusters = self._load_clusters(model, batch)
+        using = router.db_for_write(model)
+        for i in range(0, len(clusters), self.transaction_size):
+            chunk = clusters[i:i + self.transaction_size]
+            try:
+                with transaction.atomic(using=using):
+                    audit_trails = self._merge(chunk)
+            except Exception:
+                # the failing clusters are found by merging the rolled back ones one by one
+                self._merge_one_by_one(model, [row for row, _ in chunk], using)
+            else:
+                for (row, _), (_, audit_trail) in zip(chunk, audit_trails):
+                    self._log(row, audit_trail)
+
+    def _load_clusters(self, model, rows: List[ClusterRow]) -> List[Tuple[ClusterRow, Tuple]]:
+        # the primary and alias objects of every cluster are loaded with a single query
+        to_python = model._meta.pk.to_python
+        objs = model._base_manager.in_bulk([to_python(pk) for row in rows for pk in [row.primary_pk, *row.alias_pks]])
+
+        clusters = []  # type: List[Tuple[ClusterRow, Tuple]]
+        for row in rows:
+            pks = [to_python(pk) for pk in [row.primary_pk, *row.alias_pks]]
+            missing = [pk for pk in pks if pk not in objs]
+            if missing:
+                self._fail(row, f'DoesNotExist: {model.__name__} object(s) {missing} not found')
+            else:
+                clusters.append((row, (objs[pks[0]], [objs[pk] for pk in pks[1:]])))
+        return clusters
+
+    def _merge(self, chunk: List[Tuple[ClusterRow, Tuple]]) -> List:
+        return MergedModelInstance.merge_many(
+            [cluster for _, cluster in chunk], batch_size=len(chunk), **self.merge_kwargs,
+        )
+
+    def _merge_one_by_one(self, model, rows: List[ClusterRow], using: str):
+        for row in rows:
+            # objects merged before the rollback carry changes that were never committed, they are loaded again
+            for cluster in self._load_clusters(model, [row]):
+                try:
+                    with transaction.atomic(using=using):
+                        [(_, audit_trail)] = self._merge([cluster])
+                except Exception as e:
+                    self._fail(row, f'{e.__class__.__name__}: {e}')
+                else:
+                    self._log(row, audit_trail)
+
+    def _log(self, row: ClusterRow, audit_trail: List):
+        self.merged += 1
+        if self.audit_log is not None:
+            self._write(self.audit_log, row, audit_trail=[record._asdict() for record in audit_trail])
+
+    def _fail(self, row: ClusterRow, error: str):
+        self.failed += 1
+        logger.warning(f'Merging {row.model}[pk={row.primary_pk}] failed: {error}')
+        if self.failures is not None:
+            self._write(self.failures, row, error=error)
+
+    @staticmethod
+    def _write(f: IO, row: ClusterRow, **extra):
+        line = {'model': row.model, 'primary_pk': row.primary_pk, 'alias_pks': row.alias_pks}  # type: Dict
+        line.update(extra)
+        f.write(json.dumps(line, default=str) + '\n')
@@ -1,16 +1,41 @@
+import asyncio
+import hashlib
 import logging
-from typing import List, Tuple
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, nullcontext
+from itertools import islice
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 
-from django.contrib.contenttypes.fields import GenericRelation
 from django.core.exceptions import ValidationError
 from django.core.serializers import serialize
-from django.db.models import Field, Model
+from django.db import router, transaction
+from django.db.models import DO_NOTHING, Case, Exists, Expression, Field, Model, OuterRef, Q, Value, When
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.db.models.signals import m2m_changed
 
-from .models import ModelMeta
+from asgiref.sync import sync_to_async
+
+from .checkpoints import CheckpointStore
+from .instrumentation import MergeMetrics, merge_measured
+from .journal.operations import JournalRecorder, save_journals
+from .journal.operations import unmerge as unmerge_journal
+from .models import ModelMeta, RelationPlan
+from .reports import DELETED, MERGED, NULLED, REPOINTED, AuditRecord, MergeReport, RelationReport
+from .strategies import Strategy, coalesce, resolve_field_values
+from .transactions import TwoPhaseCommit
 
 logger = logging.getLogger(__name__)
 logger.addHandler(logging.NullHandler())
 
+snapshot_logger = logging.getLogger(f'{__name__}.snapshots')
+
+
+@asynccontextmanager
+async def _anullcontext():
+    # nullcontext only supports async with from Python 3.10
+    yield
+
 
 class MergedModelInstance(object):
 
@@ -20,13 +45,67 @@ class MergedModelInstance(object):
         keep_old=True,
         merge_field_values=True,
         raise_validation_exception=False,
+        bulk=False,
+        send_m2m_signals=False,
+        chunk_size=None,
+        chunk_sleep=0,
+        checkpoint_store: Optional[CheckpointStore] = None,
+        keep_related_objects=False,
+        iterator_chunk_size=2000,
+        take_snapshot=False,
+        atomic=False,
+        field_strategies: Optional[Dict[str, Strategy]] = None,
+        default_strategy: Strategy = coalesce,
+        o2o_merge_depth=0,
+        instrument=False,
+        generic_foreign_keys=False,
+        journal=False,
     ) -> None:
+        if checkpoint_store is not None and atomic:
+            raise ValueError('A checkpoint_store cannot be used with an atomic merge')
         self.primary_object = primary_object
         self.keep_old = keep_old
         self.merge_field_values = merge_field_values
         self.raise_validation_exception = raise_validation_exception
+        # journaled merges rely on the set-based handlers, which journal every row they write in bulk
+        self.bulk = bulk or chunk_size is not None or journal
+        self.send_m2m_signals = send_m2m_signals
+        self.chunk_size = chunk_size
+        self.chunk_sleep = chunk_sleep
+        self.checkpoint_store = checkpoint_store
+        self.keep_related_objects = keep_related_objects
+        self.iterator_chunk_size = iterator_chunk_size
+        self.take_snapshot = take_snapshot
+        self.atomic = atomic
+        self.field_strategies = field_strategies or {}
+        self.default_strategy = default_strategy
+        self.o2o_merge_depth = o2o_merge_depth
+        # (model label, pk) of the objects merged by the enclosing merges, which nested merges must not touch again
+        self.merging_objects = frozenset()  # type: FrozenSet[Tuple[str, str]]
+        self.snapshot = None  # type: Optional[str]
         self.model_meta = ModelMeta(primary_object)
+        self.generic_foreign_keys = generic_foreign_keys
+        self.relations = self.model_meta.get_relations(generic_foreign_keys)
+        self.metrics = None  # type: Optional[MergeMetrics]
+        if instrument:
+            self.metrics = MergeMetrics(self.model_meta.model_name, router.db_for_write(primary_object.__class__))
+        self.journal = JournalRecorder(primary_object) if journal else None  # type: Optional[JournalRecorder]
+        # commits the writes routed to other databases along with the merge, see `_bulk_handle_relations`
+        self.two_phase_commit = None  # type: Optional[TwoPhaseCommit]
+        self.primary_values = {}  # type: Dict[str, Any]
+        # related rows of the whole batch by relation, see `_prefetch_relations`
+        self.related_values = {}  # type: Dict[RelationPlan, Dict]
+        self.related_conflicts = {}  # type: Dict[RelationPlan, set]
         self.modified_related_objects = []  # type: List
+        self.updated_fields = []  # type: List[str]
+
+    @property
+    def merge_id(self):
+        return self.journal.merge_id if self.journal is not None else None
+
+    @property
+    def using(self) -> str:
+        return router.db_for_write(self.primary_object.__class__, instance=self.primary_object)
 
     @classmethod
     def _create(
@@ -35,15 +114,13 @@ class MergedModelInstance(object):
         alias_objects: List[Model],
         **kwargs,
     ) -> 'MergedModelInstance':
+        debug = logger.isEnabledFor(logging.DEBUG)
         merged_model_instance = cls(primary_object, **kwargs)
 
-        logger.debug(f'Primary object {merged_model_instance.model_meta.model_name}[pk={primary_object.pk}] '
-                     f'will be merged with {len(alias_objects)} alias object(s)')
-        logger.debug(serialize('json', [primary_object, ]))
-        logger.debug(serialize('json', alias_objects))
-
-        for alias_object in alias_objects:
-            merged_model_instance.merge(alias_object)
+        if debug:
+            logger.debug(f'Primary object {merged_model_instance.model_meta.model_name}[pk={primary_object.pk}] '
+                         f'will be merged with {len(alias_objects)} alias object(s)')
+        merged_model_instance.merge_aliases(alias_objects)
 
         return merged_model_instance
 
@@ -52,115 +129,1526 @@ class MergedModelInstance(object):
         return cls._create(*args, **kwargs).primary_object
 
     @classmethod
-    def create_with_audit_trail(cls, *args, **kwargs) -> Tuple[Model, List[Model]]:
+    def create_with_audit_trail(cls, *args, **kwargs) -> Tuple[Model, List]:
         instance = cls._create(*args, **kwargs)
         return instance.primary_object, instance.modified_related_objects
 
-    def _handle_o2m_related_field(self, related_field: Field, alias_object: Model):
-        if isinstance(related_field, GenericRelation):
-            fields = related_field.remote_field.model._meta.private_fields
-            matching_field = [f for f in fields if related_field._is_matching_generic_foreign_key(f)][0]
+    @classmethod
+    async def _acreate(
+        cls,
+        primary_object: Model,
+        alias_objects: List[Model],
+        **kwargs,
+    ) -> 'MergedModelInstance':
+        kwargs.setdefault('bulk', True)
+        merged_model_instance = cls(primary_object, **kwargs)
 
-            reverse_o2m_accessor_name = related_field.get_attname()
-            o2m_accessor_name = matching_field.name
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Primary object {merged_model_instance.model_meta.model_name}[pk={primary_object.pk}] '
+                         f'will be merged with {len(alias_objects)} alias object(s)')
+        await merged_model_instance.amerge_aliases(alias_objects)
+
+        return merged_model_instance
+
+    @classmethod
+    async def acreate(cls, *args, **kwargs) -> Model:
+        return (await cls._acreate(*args, **kwargs)).primary_object
+
+    @classmethod
+    async def acreate_with_audit_trail(cls, *args, **kwargs) -> Tuple[Model, List]:
+        instance = await cls._acreate(*args, **kwargs)
+        return instance.primary_object, instance.modified_related_objects
+
+    @staticmethod
+    def unmerge(merge_id):
+        return unmerge_journal(merge_id)
+
+    def _measure(self, phase: str, using: Optional[str] = None):
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.measure(phase, using)
+
+    def _ameasure(self, phase: str):
+        if self.metrics is None:
+            return _anullcontext()
+        return self.metrics.ameasure(phase)
+
+    @staticmethod
+    def _share_metrics(merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        # relations are handled once for a whole batch, every instance of the batch reports the batch's metrics
+        for merged_model_instance, _ in merges:
+            merged_model_instance.metrics = merges[0][0].metrics
+
+    @staticmethod
+    def _send_metrics(merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        merged_model_instance = merges[0][0]
+        if merged_model_instance.metrics is None:
+            return
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Merged {len(merges)} {merged_model_instance.model_meta.model_name} cluster(s) with '
+                         f'{merged_model_instance.metrics.statements} statement(s) '
+                         f'in {merged_model_instance.metrics.elapsed:.3f}s')
+        merge_measured.send(
+            sender=merged_model_instance.primary_object.__class__,
+            metrics=merged_model_instance.metrics,
+            primary_objects=[instance.primary_object for instance, _ in merges],
+        )
+
+    def _record(self, obj: Model, action: str):
+        if self.keep_related_objects:
+            self.modified_related_objects.append(obj)
         else:
-            reverse_o2m_accessor_name = related_field.get_accessor_name()
-            o2m_accessor_name = related_field.field.name
+            self.modified_related_objects.append(AuditRecord(obj._meta.label, obj.pk, action))
 
-        for obj in getattr(alias_object, reverse_o2m_accessor_name).all():
-            try:
-                logger.debug(f'Attempting to set o2m field {o2m_accessor_name} on '
-                             f'{obj._meta.model.__name__}[pk={obj.pk}] to '
-                             f'{self.model_meta.model_name}[pk={self.primary_object.pk}] ...')
-                setattr(obj, o2m_accessor_name, self.primary_object)
-                obj.validate_unique()
-                obj.save()
-                logger.debug('success.')
-            except ValidationError as e:
-                logger.debug(f'failed. {e}')
-
-                if self.raise_validation_exception:
-                    raise
-
-                if related_field.field.null:
+    @staticmethod
+    def _iterate(queryset, chunk_size: int) -> Iterator[Model]:
+        # Keyset pagination keeps memory bounded and stays correct while the iterated rows are being modified
+        last_pk = None
+        while True:
+            chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            objs = list(chunk_queryset.order_by('pk')[:chunk_size])
+            yield from objs
+
+            if len(objs) < chunk_size:
+                return
+            last_pk = objs[-1].pk
+
+    def _get_o2m_target(self, relation: RelationPlan) -> Value:
+        fk_field = relation.fk_field
+        output_field = fk_field if relation.is_generic else fk_field.target_field
+        return Value(relation.get_alias_values([self.primary_object])[0], output_field=output_field)
+
+    def _handle_o2m_related_field(self, relation: RelationPlan, alias_object: Model):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        o2m_accessor_name = relation.remote_field_name
+        related_model = relation.related_model
+        # alias objects without related rows are skipped without a query
+        pks = self.related_values[relation].get(relation.get_alias_values([alias_object])[0])
+        if not pks:
+            return
+
+        if relation.is_generic:
+            # undeclared generic relations have no accessor on the alias object
+            related_objects, _ = relation.get_alias_rows([alias_object])
+        else:
+            related_objects = getattr(alias_object, relation.accessor_name).all()
+
+        conflicts = self.related_conflicts[relation].intersection(pks)
+
+        if conflicts:
+            if self.raise_validation_exception:
+                raise ValidationError(
+                    f'{len(conflicts)} {related_model.__name__} object(s) would violate a unique constraint '
+                    f'if {o2m_accessor_name} was set to {self.model_meta.model_name}[pk={self.primary_object.pk}]'
+                )
+
+            conflict_queryset = (
+                related_model._base_manager
+                .db_manager(relation.get_using(self.primary_object))
+                .filter(pk__in=conflicts)
+                .order_by('pk')
+            )
+            conflict_objects = list(conflict_queryset) if self.keep_related_objects else [
+                related_model(pk=pk) for pk in sorted(conflicts)
+            ]
+            if relation.null:
+                if debug:
                     logger.debug(f'Setting o2m field {o2m_accessor_name} on '
-                                 f'{obj._meta.model.__name__}[pk={obj.pk}] to `None`')
+                                 f'{related_model.__name__}[pk__in={sorted(conflicts)}] to `None`')
+                conflict_queryset.update(**relation.get_null_values())
+                action = NULLED
+            else:
+                if debug:
+                    logger.debug(f'Deleting {related_model.__name__}[pk__in={sorted(conflicts)}]')
+                conflict_queryset.delete()
+                action = DELETED
+
+            for obj in conflict_objects:
+                if relation.null:
                     setattr(obj, o2m_accessor_name, None)
-                    obj.save()
-                else:
-                    logger.debug(f'Deleting {obj._meta.model.__name__}[pk={obj.pk}]')
-                    _pk = obj.pk
-                    obj.delete()
-                    obj.pk = _pk  # pk is cached and re-assigned to keep the audit trail in tact
-            self.modified_related_objects.append(obj)
+                self._record(obj, action)
 
-    def _handle_m2m_related_field(self, related_field: Field, alias_object: Model):
-        try:
-            m2m_accessor_name = related_field.get_attname()
-        except AttributeError:
-            # get_attname does not exist for reverse m2m relations
-            m2m_accessor_name = related_field.get_accessor_name()
-
-        for obj in getattr(alias_object, m2m_accessor_name).all():
-            logger.debug(f'Removing {obj._meta.model.__name__}[pk={obj.pk}] '
-                         f'from {self.model_meta.model_name}[pk={alias_object.pk}].{m2m_accessor_name}')
-            getattr(alias_object, m2m_accessor_name).remove(obj)
-            logger.debug(f'Adding {obj._meta.model.__name__}[pk={obj.pk}] '
-                         f'to {self.model_meta.model_name}[pk={self.primary_object.pk}].{m2m_accessor_name}')
-            getattr(self.primary_object, m2m_accessor_name).add(obj)
-            self.modified_related_objects.append(obj)
+        for obj in self._iterate(related_objects, self.iterator_chunk_size):
+            if debug:
+                logger.debug(f'Setting o2m field {o2m_accessor_name} on '
+                             f'{obj._meta.model.__name__}[pk={obj.pk}] to '
+                             f'{self.model_meta.model_name}[pk={self.primary_object.pk}]')
+            setattr(obj, o2m_accessor_name, self.primary_object)
+            obj.save()
+            self._record(obj, REPOINTED)
+
+    def _handle_m2m_related_field(self, relation: RelationPlan, alias_object: Model):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        m2m_accessor_name = relation.accessor_name
+        related_model = relation.related_model
+        targets = self.related_values[relation].get(relation.get_alias_values([alias_object])[0])
+        if not targets:
+            return
+
+        if self.journal is not None:
+            self._journal_m2m_related_field(self.journal, relation, alias_object)
+
+        # links are moved by the value they point at, the related objects are only loaded to be kept
+        target_field = relation.through._meta.get_field(relation.target_name).target_field
+        related_objects = {}  # type: Dict
+        if self.keep_related_objects:
+            related_objects = related_model._base_manager.db_manager(hints={'instance': self.primary_object}).in_bulk(
+                targets, field_name=target_field.name,
+            )
+
+        for target in targets:
+            obj = related_objects.get(target) or related_model(**{target_field.attname: target})
+            if debug:
+                logger.debug(f'Removing {related_model.__name__}[pk={obj.pk}] '
+                             f'from {self.model_meta.model_name}[pk={alias_object.pk}].{m2m_accessor_name}')
+            getattr(alias_object, m2m_accessor_name).remove(target)
+            if debug:
+                logger.debug(f'Adding {related_model.__name__}[pk={obj.pk}] '
+                             f'to {self.model_meta.model_name}[pk={self.primary_object.pk}].{m2m_accessor_name}')
+            getattr(self.primary_object, m2m_accessor_name).add(target)
+            self._record(obj, REPOINTED)
+
+    def _journal_m2m_related_field(self, journal: JournalRecorder, relation: RelationPlan, alias_object: Model):
+        # `remove()` deletes the links of the alias object, from both sides when symmetrical, and `add()` only creates
+        # the links the primary object does not have yet
+        through = relation.through
+        source_field = through._meta.get_field(relation.source_name)
+        target_field = through._meta.get_field(relation.target_name)
+        manager = through._base_manager.db_manager(relation.get_using(self.primary_object))
+        alias_value = getattr(alias_object, source_field.target_field.attname)
+        primary_value = getattr(self.primary_object, source_field.target_field.attname)
+
+        alias_links = Q(**{source_field.attname: alias_value})
+        if relation.symmetrical:
+            alias_links |= Q(**{target_field.attname: alias_value})
+        journal.record_delete(through, manager.filter(alias_links))
+
+        targets = manager.values_list(target_field.attname, flat=True)
+        added_targets = set(targets.filter(**{source_field.attname: alias_value}))
+        added_targets -= set(targets.filter(**{source_field.attname: primary_value}))
+        rows = [(primary_value, target) for target in added_targets]
+        if relation.symmetrical:
+            rows += [(target, primary_value) for target in added_targets]
+        journal.record_insert(through, [source_field.attname, target_field.attname], rows, manager.db)
 
-    def _handle_o2o_related_field(self, related_field: Field, alias_object: Model):
+    def _handle_o2o_related_field(self, relation: RelationPlan, alias_object: Model):
         if not self.merge_field_values:
             return
 
-        o2o_accessor_name = related_field.name
-        primary_o2o_object = getattr(self.primary_object, o2o_accessor_name, None)
-        alias_o2o_object = getattr(alias_object, o2o_accessor_name, None)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        o2o_accessor_name = relation.accessor_name
+        o2o_objects = self.related_values[relation]
+        primary_o2o_object = o2o_objects.get(self.primary_object.pk)
+        alias_o2o_object = o2o_objects.get(alias_object.pk)
 
         if primary_o2o_object is None and alias_o2o_object is not None:
-            logger.debug(f'Setting {o2o_accessor_name} on {self.model_meta.model_name}[pk={alias_object.pk}] to None')
+            if debug:
+                logger.debug(f'Setting {o2o_accessor_name} on {self.model_meta.model_name}[pk={alias_object.pk}] '
+                             f'to None')
+            if self.journal is not None and relation.field.concrete:
+                attname = relation.field.attname
+                self.journal.record_update(alias_object.__class__, [attname],
+                                           [(alias_object.pk, getattr(alias_object, attname))],
+                                           router.db_for_write(alias_object.__class__, instance=alias_object))
             setattr(alias_object, o2o_accessor_name, None)
             alias_object.save()
-            logger.debug(f'Setting {o2o_accessor_name} on {self.model_meta.model_name}[pk={self.primary_object.pk}] '
-                         f'to {alias_o2o_object._meta.model.__name__}[pk={alias_o2o_object.pk}')
+            if debug:
+                logger.debug(f'Setting {o2o_accessor_name} on '
+                             f'{self.model_meta.model_name}[pk={self.primary_object.pk}] '
+                             f'to {alias_o2o_object._meta.model.__name__}[pk={alias_o2o_object.pk}]')
             setattr(self.primary_object, o2o_accessor_name, alias_o2o_object)
-            self.modified_related_objects.append(alias_o2o_object)
+            o2o_objects[self.primary_object.pk] = o2o_objects.pop(alias_object.pk)
+            if relation.field.concrete:
+                self._mark_updated_field(relation.field.name)
+            else:
+                self._move_reverse_o2o_object(relation, alias_o2o_object)
+            self._record(alias_o2o_object, REPOINTED)
+
+    def _move_reverse_o2o_object(self, relation: RelationPlan, o2o_object: Model):
+        # the moved object is written right away, deleting the alias object would otherwise cascade to it
+        attname = relation.field.field.attname
+        using = router.db_for_write(o2o_object.__class__, instance=o2o_object)
+        queryset = o2o_object.__class__._base_manager.using(using).filter(pk=o2o_object.pk)
+        if self.journal is not None:
+            self.journal.record_update(o2o_object.__class__, [attname], list(queryset.values_list('pk', attname)),
+                                       using)
+        queryset.update(**{attname: getattr(o2o_object, attname)})
+
+    def _get_nested_instance(
+        self,
+        primary_object: Model,
+        merging_objects: FrozenSet[Tuple[str, str]],
+    ) -> 'MergedModelInstance':
+        # field strategies are named after the fields of this model, nested merges only use the default strategy
+        nested_instance = self.__class__(
+            primary_object,
+            keep_old=self.keep_old,
+            merge_field_values=self.merge_field_values,
+            raise_validation_exception=self.raise_validation_exception,
+            bulk=self.bulk,
+            send_m2m_signals=self.send_m2m_signals,
+            chunk_size=self.chunk_size,
+            chunk_sleep=self.chunk_sleep,
+            checkpoint_store=self.checkpoint_store,
+            keep_related_objects=self.keep_related_objects,
+            iterator_chunk_size=self.iterator_chunk_size,
+            take_snapshot=self.take_snapshot,
+            atomic=self.atomic,
+            default_strategy=self.default_strategy,
+            o2o_merge_depth=self.o2o_merge_depth - 1,
+            generic_foreign_keys=self.generic_foreign_keys,
+        )
+        nested_instance.merging_objects = merging_objects
+        # nested merges are undone and committed along with the merge that started them
+        nested_instance.journal = self.journal
+        nested_instance.two_phase_commit = self.two_phase_commit
+        return nested_instance
+
+    @classmethod
+    def _prefetch_relations(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        # The related rows of every alias object of the batch are read with one query per relation, grouped by alias
+        # object, so reads scale with the number of relations instead of relations times alias objects. Bulk mode
+        # already handles each one-to-many and many-to-many relation once per batch.
+        merged_model_instance = merges[0][0]
+        prefetch_o2o = merged_model_instance.merge_field_values or merged_model_instance.o2o_merge_depth > 0
+        related_values = {}  # type: Dict[RelationPlan, Dict]
+        related_conflicts = {}  # type: Dict[RelationPlan, set]
+
+        for relation in merged_model_instance.relations:
+            if relation.one_to_one and prefetch_o2o:
+                related_values[relation] = {}
+                for using, database_merges in cls._group_by_database(relation, merges).items():
+                    objs = [
+                        obj for instance, alias_objects in database_merges
+                        for obj in [instance.primary_object, *alias_objects]
+                    ]
+                    related_values[relation].update(relation.get_o2o_objects(objs, using))
+            elif not relation.one_to_one and not merged_model_instance.bulk and relation.alias_attname is not None:
+                related_values[relation] = {}
+                related_conflicts[relation] = set()
+                for using, database_merges in cls._group_by_database(relation, merges).items():
+                    database_values = relation.get_related_values(
+                        [obj for _, objs in database_merges for obj in objs], using,
+                    )
+                    related_values[relation].update(database_values)
+                    if relation.one_to_many and database_values:
+                        # conflicts are predicted for all alias objects at once instead of validating every related
+                        # object
+                        queryset, target, _, _ = cls._get_o2m_repoint_arguments(relation, database_merges, using)
+                        related_conflicts[relation].update(
+                            cls._get_unique_conflicts(relation, queryset, target).values_list('pk', flat=True)
+                        )
+
+        for instance, _ in merges:
+            instance.related_values = related_values
+            instance.related_conflicts = related_conflicts
+
+    @classmethod
+    def _get_nested_merges(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]) -> List[Tuple]:
+        # One-to-one objects of the alias objects are merged into the one-to-one object of the primary object, or
+        # of the first alias object when it is moved to the primary object. The clusters of every relation are
+        # merged in a single batch, so each level of recursion costs the same number of queries as the first.
+        merged_model_instance = merges[0][0]
+        if merged_model_instance.o2o_merge_depth <= 0:
+            return []
+
+        objs = [obj for instance, alias_objects in merges for obj in [instance.primary_object, *alias_objects]]
+        merging_objects = merged_model_instance.merging_objects | {(obj._meta.label, str(obj.pk)) for obj in objs}
+        nested_merges = []
+
+        for relation in merged_model_instance.relations:
+            if not relation.one_to_one or relation.parent_link:
+                continue
+
+            o2o_objects = merged_model_instance.related_values[relation]
+            relation_merges = []
+            for instance, alias_objects in merges:
+                if instance.primary_object.pk not in o2o_objects and not instance.merge_field_values:
+                    continue
+
+                cluster_o2o_objects = [
+                    o2o_objects[obj.pk] for obj in [instance.primary_object, *alias_objects] if obj.pk in o2o_objects
+                ]
+                if len(cluster_o2o_objects) < 2:
+                    continue
+                # objects merged by an enclosing merge are reached again through a cycle of one-to-one relations
+                if any((obj._meta.label, str(obj.pk)) in merging_objects for obj in cluster_o2o_objects):
+                    continue
+
+                nested_instance = instance._get_nested_instance(cluster_o2o_objects[0], merging_objects)
+                relation_merges.append((instance, nested_instance, cluster_o2o_objects[1:]))
+
+            if relation_merges:
+                nested_merges.append((relation, relation_merges))
+
+        return nested_merges
+
+    @staticmethod
+    def _start_nested_merges(relation: RelationPlan, relation_merges: List[Tuple]):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Merging {len(relation_merges)} cluster(s) of {relation.related_model.__name__} '
+                         f'one-to-one objects of {relation.accessor_name}')
+        for merged_model_instance, _, alias_o2o_objects in relation_merges:
+            for alias_o2o_object in alias_o2o_objects:
+                merged_model_instance._record(alias_o2o_object, MERGED)
+
+    @classmethod
+    def _merge_nested(cls, relation: RelationPlan, relation_merges: List[Tuple]):
+        cls._start_nested_merges(relation, relation_merges)
+        cls._merge_clusters([(nested_instance, alias_o2o_objects) for _, nested_instance, alias_o2o_objects in
+                             relation_merges])
+        for merged_model_instance, nested_instance, _ in relation_merges:
+            merged_model_instance.modified_related_objects.extend(nested_instance.modified_related_objects)
+
+    @classmethod
+    async def _amerge_nested(cls, relation: RelationPlan, relation_merges: List[Tuple]):
+        cls._start_nested_merges(relation, relation_merges)
+        await cls._amerge_clusters([(nested_instance, alias_o2o_objects) for _, nested_instance, alias_o2o_objects in
+                                    relation_merges])
+        for merged_model_instance, nested_instance, _ in relation_merges:
+            merged_model_instance.modified_related_objects.extend(nested_instance.modified_related_objects)
+
+    @staticmethod
+    def _target_expression(relation: RelationPlan, targets: Dict) -> Expression:
+        # Maps the value of the foreign key on every alias related object to the value of its primary object
+        field = relation.fk_field
+        output_field = field if relation.is_generic else field.target_field
+        primary_values = set(targets.values())
+        if len(primary_values) == 1:
+            return Value(primary_values.pop(), output_field=output_field)
+
+        return Case(
+            *[When(**{field.attname: alias_value}, then=Value(primary_value))
+              for alias_value, primary_value in targets.items()],
+            output_field=output_field,
+        )
+
+    @staticmethod
+    def _get_unique_conflicts(relation: RelationPlan, queryset, target: Expression):
+        # Rows that collide with a row already on their primary object, or with another row moving to the same
+        # primary object that has a lower pk
+        field = relation.fk_field
+        related_manager = relation.related_model._base_manager
+        queryset = queryset.annotate(_target=target)
+        annotations = {}
+        conflict_filter = Q()
+
+        for i, (field_names, condition) in enumerate(relation.unique_constraints):
+            lookups = {name: OuterRef(name) for name in field_names if name != field.name}
+            on_primary = related_manager.filter(**{field.attname: OuterRef('_target')}, **lookups)
+            on_alias = queryset.filter(_target=OuterRef('_target'), pk__lt=OuterRef('pk'), **lookups)
+            constraint_filter = Q(**{f'_on_primary_{i}': True}) | Q(**{f'_on_alias_{i}': True})
+
+            # rows of a conditional constraint only collide when both of them match its condition
+            if condition is not None:
+                on_primary = on_primary.filter(condition)
+                on_alias = on_alias.filter(condition)
+                constraint_filter &= condition
+
+            annotations.update({f'_on_primary_{i}': Exists(on_primary), f'_on_alias_{i}': Exists(on_alias)})
+            conflict_filter |= constraint_filter
+
+        if not annotations:
+            return queryset.none()
+
+        return queryset.annotate(**annotations).filter(conflict_filter)
+
+    @staticmethod
+    def _get_alias_map(attname: str, merges: List[Tuple['MergedModelInstance', List[Model]]]) -> Dict:
+        return {
+            getattr(alias_object, attname): merged_model_instance
+            for merged_model_instance, alias_objects in merges
+            for alias_object in alias_objects
+        }
+
+    @classmethod
+    def _bulk_handle_o2m_related_field(
+        cls,
+        relation: RelationPlan,
+        merges: List[Tuple['MergedModelInstance', List[Model]]],
+        using: Optional[str] = None,
+    ):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        queryset, target, alias_map, targets = cls._get_o2m_repoint_arguments(relation, merges, using)
+        related_model = relation.related_model
+
+        chunk_size = merges[0][0].chunk_size
+        if not chunk_size:
+            cls._repoint_o2m_related_objects(relation, queryset, target, alias_map, using)
+            return
+
+        checkpoint_store = merges[0][0].checkpoint_store
+        checkpoint_key = cls._get_checkpoint_key(relation, targets)
+        last_pk = checkpoint_store.get(checkpoint_key) if checkpoint_store else None
+        using = using or router.db_for_write(related_model)
+
+        while True:
+            chunk_queryset = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            chunk_pks = list(chunk_queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not chunk_pks:
+                break
+
+            if debug:
+                logger.debug(f'Repointing chunk of {len(chunk_pks)} {related_model.__name__} object(s) '
+                             f'[pk={chunk_pks[0]}..{chunk_pks[-1]}]')
+            # checkpoints are only written once their chunk is committed, a chunk nested in an outer transaction that
+            # is rolled back later would leave a checkpoint past rows that are still on the alias objects
+            with transaction.atomic(using=using, durable=bool(checkpoint_store)):
+                cls._repoint_o2m_related_objects(relation, queryset.filter(pk__in=chunk_pks), target, alias_map,
+                                                 using)
+
+            last_pk = chunk_pks[-1]
+            if checkpoint_store:
+                checkpoint_store.set(checkpoint_key, last_pk)
+
+            if merges[0][0].chunk_sleep:
+                time.sleep(merges[0][0].chunk_sleep)
+
+        if checkpoint_store:
+            checkpoint_store.delete(checkpoint_key)
+
+    @classmethod
+    def _get_o2m_repoint_arguments(
+        cls,
+        relation: RelationPlan,
+        merges: List[Tuple['MergedModelInstance', List[Model]]],
+        using: Optional[str] = None,
+    ):
+        # generic relations are matched on their content type and repointed through their object id field
+        alias_map = {}  # type: Dict
+        targets = {}  # type: Dict
+        for merged_model_instance, alias_objects in merges:
+            primary_value = relation.get_alias_values([merged_model_instance.primary_object])[0]
+            for alias_value in relation.get_alias_values(alias_objects):
+                alias_map[alias_value] = merged_model_instance
+                targets[alias_value] = primary_value
+        queryset, _ = relation.get_alias_rows([obj for _, alias_objects in merges for obj in alias_objects], using)
+        return queryset, cls._target_expression(relation, targets), alias_map, targets
+
+    @staticmethod
+    def _get_checkpoint_key(relation: RelationPlan, targets: Dict) -> str:
+        digest = hashlib.sha1(repr(sorted(targets.items())).encode()).hexdigest()
+        return f'{relation.field.model._meta.label}:{relation.accessor_name}:{digest}'
+
+    @staticmethod
+    def _check_unique_conflicts(relation: RelationPlan, rows: List, conflicts: set, alias_map: Dict):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        field_name = relation.remote_field_name
+        related_model = relation.related_model
+
+        if debug:
+            logger.debug(f'Repointing {len(rows) - len(conflicts)} {related_model.__name__} object(s) of '
+                         f'{len(alias_map)} alias object(s) through {field_name}, {len(conflicts)} conflict(s)')
+        if not conflicts:
+            return
+
+        if next(iter(alias_map.values())).raise_validation_exception:
+            raise ValidationError(
+                f'{len(conflicts)} {related_model.__name__} object(s) would violate a unique constraint '
+                f'if {field_name} was set to their primary object'
+            )
+
+        if debug:
+            if relation.null:
+                logger.debug(f'Setting o2m field {field_name} on '
+                             f'{related_model.__name__}[pk__in={sorted(conflicts)}] to `None`')
+            else:
+                logger.debug(f'Deleting {related_model.__name__}[pk__in={sorted(conflicts)}]')
+
+    @staticmethod
+    def _record_o2m_related_objects(
+        relation: RelationPlan,
+        rows: List,
+        objs: Optional[List[Model]],
+        conflicts: set,
+        alias_map: Dict,
+    ):
+        attname = relation.fk_field.attname
+        related_model = relation.related_model
+
+        if objs is None:
+            for pk, alias_value in rows:
+                action = REPOINTED if pk not in conflicts else NULLED if relation.null else DELETED
+                alias_map[alias_value].modified_related_objects.append(
+                    AuditRecord(related_model._meta.label, pk, action)
+                )
+            return
+
+        # Mirror the writes on the loaded instances to keep the audit trail in tact
+        for obj in objs:
+            merged_model_instance = alias_map[getattr(obj, attname)]
+            if obj.pk not in conflicts:
+                setattr(obj, relation.remote_field_name, merged_model_instance.primary_object)
+            elif relation.null:
+                setattr(obj, relation.remote_field_name, None)
+            merged_model_instance.modified_related_objects.append(obj)
+
+    @staticmethod
+    def _journal_o2m_related_objects(relation: RelationPlan, rows: List, conflicts: set, alias_map: Dict, using: str):
+        # the previous foreign key of every row is journaled by its cluster, nulled generic rows lose their content
+        # type as well
+        related_model = relation.related_model
+        attnames = [relation.fk_field.attname]
+        nulled_attnames, nulled_values = attnames, ()  # type: List[str], Tuple
+        if relation.is_generic:
+            ct_field = related_model._meta.get_field(relation.generic_foreign_key.ct_field)
+            nulled_attnames, nulled_values = [ct_field.attname, *attnames], (relation.content_type.pk,)
+
+        repointed = defaultdict(list)  # type: Dict
+        nulled = defaultdict(list)  # type: Dict
+        for pk, alias_value in rows:
+            if pk not in conflicts:
+                repointed[alias_map[alias_value]].append((pk, alias_value))
+            elif relation.null:
+                nulled[alias_map[alias_value]].append((pk, *nulled_values, alias_value))
+
+        for merged_model_instance, instance_rows in repointed.items():
+            merged_model_instance.journal.record_update(related_model, attnames, instance_rows, using)
+        for merged_model_instance, instance_rows in nulled.items():
+            merged_model_instance.journal.record_update(related_model, nulled_attnames, instance_rows, using)
+
+    @staticmethod
+    def _delete_journaled_conflicts(
+        relation: RelationPlan,
+        rows: List,
+        conflicts: set,
+        alias_map: Dict,
+        using: Optional[str] = None,
+    ):
+        # conflicting rows are deleted cluster by cluster, each journaling the rows its deletion cascades to
+        cluster_conflicts = defaultdict(list)  # type: Dict
+        for pk, alias_value in rows:
+            if pk in conflicts:
+                cluster_conflicts[alias_map[alias_value]].append(pk)
+
+        using = using or router.db_for_write(relation.related_model)
+        for merged_model_instance, pks in cluster_conflicts.items():
+            queryset = relation.related_model._base_manager.using(using).filter(pk__in=pks)
+            merged_model_instance.journal.delete(queryset, using, origin=queryset)
+
+    @classmethod
+    def _repoint_o2m_related_objects(
+        cls,
+        relation: RelationPlan,
+        queryset,
+        target: Expression,
+        alias_map: Dict,
+        using: Optional[str] = None,
+    ):
+        field = relation.fk_field
+        manager = relation.related_model._base_manager.db_manager(using)
+        journaled = next(iter(alias_map.values())).journal is not None
+
+        objs = None  # type: Optional[List[Model]]
+        if next(iter(alias_map.values())).keep_related_objects:
+            objs = list(queryset)
+            rows = [(obj.pk, getattr(obj, field.attname)) for obj in objs]
+        else:
+            rows = list(queryset.values_list('pk', field.attname))
+        if not rows:
+            return
+
+        conflicts = set(cls._get_unique_conflicts(relation, queryset, target).values_list('pk', flat=True))
+        cls._check_unique_conflicts(relation, rows, conflicts, alias_map)
+        if journaled:
+            cls._journal_o2m_related_objects(relation, rows, conflicts, alias_map,
+                                             using or router.db_for_write(relation.related_model))
+        if conflicts:
+            if relation.null:
+                manager.filter(pk__in=conflicts).update(**relation.get_null_values())
+            elif journaled:
+                cls._delete_journaled_conflicts(relation, rows, conflicts, alias_map, using)
+            else:
+                manager.filter(pk__in=conflicts).delete()
+
+        queryset.update(**{field.attname: target})
+        cls._record_o2m_related_objects(relation, rows, objs, conflicts, alias_map)
+
+    @classmethod
+    async def _arepoint_o2m_related_objects(
+        cls,
+        relation: RelationPlan,
+        queryset,
+        target: Expression,
+        alias_map: Dict,
+        using: str,
+    ):
+        field = relation.fk_field
+        manager = relation.related_model._base_manager.db_manager(using)
+
+        objs = None  # type: Optional[List[Model]]
+        if next(iter(alias_map.values())).keep_related_objects:
+            objs = [obj async for obj in queryset]
+            rows = [(obj.pk, getattr(obj, field.attname)) for obj in objs]
+        else:
+            rows = [row async for row in queryset.values_list('pk', field.attname)]
+        if not rows:
+            return
+
+        conflicts_queryset = cls._get_unique_conflicts(relation, queryset, target)
+        conflicts = {pk async for pk in conflicts_queryset.values_list('pk', flat=True)}
+        cls._check_unique_conflicts(relation, rows, conflicts, alias_map)
+        if conflicts:
+            if relation.null:
+                await manager.filter(pk__in=conflicts).aupdate(**relation.get_null_values())
+            else:
+                await manager.filter(pk__in=conflicts).adelete()
+
+        await queryset.aupdate(**{field.attname: target})
+        cls._record_o2m_related_objects(relation, rows, objs, conflicts, alias_map)
+
+    @classmethod
+    async def _abulk_handle_o2m_related_field(
+        cls,
+        relation: RelationPlan,
+        merges: List[Tuple['MergedModelInstance', List[Model]]],
+        using: str,
+    ):
+        if merges[0][0].chunk_size:
+            # chunks are committed in their own transactions, which need a synchronous connection
+            await sync_to_async(cls._bulk_handle_o2m_related_field)(relation, merges, using)
+            return
+
+        if relation.is_generic:
+            # the content type is read from the database until the ContentType cache and the merge plan hold it
+            await sync_to_async(getattr)(relation, 'content_type')
+        queryset, target, alias_map, _ = cls._get_o2m_repoint_arguments(relation, merges, using)
+        await cls._arepoint_o2m_related_objects(relation, queryset, target, alias_map, using)
+
+    def _send_m2m_changed(self, through, instance: Model, action: str, reverse: bool, model, pk_set: set):
+        if not self.send_m2m_signals or not pk_set:
+            return
+
+        m2m_changed.send(
+            sender=through,
+            action=action,
+            instance=instance,
+            reverse=reverse,
+            model=model,
+            pk_set=pk_set,
+            using=instance._state.db,
+        )
+
+    @staticmethod
+    def _get_m2m_link_changes(relation: RelationPlan, alias_map: Dict, alias_links: List[Model], existing_links: set):
+        through = relation.through
+        source_field = through._meta.get_field(relation.source_name)
+        target_field = through._meta.get_field(relation.target_name)
+
+        new_links = []
+        removed_targets = defaultdict(set)  # type: Dict
+        added_targets = defaultdict(set)  # type: Dict
+        for link in alias_links:
+            alias_value, target_value = getattr(link, source_field.attname), getattr(link, target_field.attname)
+            removed_targets[alias_value].add(target_value)
+
+            primary_value = getattr(alias_map[alias_value].primary_object, source_field.target_field.attname)
+            if (primary_value, target_value) in existing_links:
+                continue
+            existing_links.add((primary_value, target_value))
+            added_targets[primary_value].add(target_value)
+
+            new_link = through(**{
+                f.attname: getattr(link, f.attname) for f in through._meta.concrete_fields if not f.primary_key
+            })
+            setattr(new_link, source_field.attname, primary_value)
+            new_links.append(new_link)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Moving {len(alias_links)} {through.__name__} link(s) of {len(alias_map)} alias object(s), '
+                         f'{len(new_links)} new link(s)')
+
+        return new_links, removed_targets, added_targets
+
+    @staticmethod
+    def _send_bulk_m2m_changed(
+        relation: RelationPlan,
+        merges: List[Tuple['MergedModelInstance', List[Model]]],
+        action: str,
+        removed_targets: Dict,
+        added_targets: Dict,
+    ):
+        attname = relation.through._meta.get_field(relation.source_name).target_field.attname
+        for merged_model_instance, alias_objects in merges:
+            primary_object = merged_model_instance.primary_object
+            for alias_object in alias_objects:
+                merged_model_instance._send_m2m_changed(
+                    relation.through, alias_object, f'{action}_remove', relation.reverse, relation.related_model,
+                    removed_targets[getattr(alias_object, attname)],
+                )
+            merged_model_instance._send_m2m_changed(
+                relation.through, primary_object, f'{action}_add', relation.reverse, relation.related_model,
+                added_targets[getattr(primary_object, attname)],
+            )
+
+    @staticmethod
+    def _record_m2m_related_objects(
+        relation: RelationPlan,
+        alias_map: Dict,
+        alias_links: List[Model],
+        related_objects: Optional[Dict],
+    ):
+        source_field = relation.through._meta.get_field(relation.source_name)
+        target_field = relation.through._meta.get_field(relation.target_name)
+
+        for link in alias_links:
+            target_value = getattr(link, target_field.attname)
+            alias_map[getattr(link, source_field.attname)].modified_related_objects.append(
+                AuditRecord(relation.related_model._meta.label, target_value, REPOINTED)
+                if related_objects is None else related_objects[target_value]
+            )
+
+    @staticmethod
+    def _journal_m2m_links(
+        relation: RelationPlan,
+        alias_map: Dict,
+        alias_links: List[Model],
+        new_links: List[Model],
+        using: str,
+    ):
+        # the deleted links were loaded with all their columns, the new links are matched on their source and target
+        through = relation.through
+        source_field = through._meta.get_field(relation.source_name)
+        target_field = through._meta.get_field(relation.target_name)
+        primary_map = {
+            getattr(merged_model_instance.primary_object, source_field.target_field.attname): merged_model_instance
+            for merged_model_instance in alias_map.values()
+        }
+
+        deleted_links = defaultdict(list)  # type: Dict
+        for link in alias_links:
+            deleted_links[alias_map[getattr(link, source_field.attname)]].append(link)
+        added_links = defaultdict(list)  # type: Dict
+        for link in new_links:
+            source_value = getattr(link, source_field.attname)
+            added_links[primary_map[source_value]].append((source_value, getattr(link, target_field.attname)))
+
+        for merged_model_instance, links in deleted_links.items():
+            merged_model_instance.journal.record_deleted_objects(through, links)
+        for merged_model_instance, rows in added_links.items():
+            merged_model_instance.journal.record_insert(through, [source_field.attname, target_field.attname], rows,
+                                                        using)
+
+    @classmethod
+    def _bulk_handle_m2m_related_field(
+        cls,
+        relation: RelationPlan,
+        merges: List[Tuple['MergedModelInstance', List[Model]]],
+        using: Optional[str] = None,
+    ):
+        if relation.symmetrical:
+            # symmetrical links are stored twice and are left to the related manager
+            for merged_model_instance, alias_objects in merges:
+                for alias_object in alias_objects:
+                    merged_model_instance._handle_m2m_related_field(relation, alias_object)
+            return
+
+        source_field = relation.through._meta.get_field(relation.source_name)
+        target_field = relation.through._meta.get_field(relation.target_name)
+        manager = relation.through._base_manager.db_manager(using)
+
+        alias_map = cls._get_alias_map(source_field.target_field.attname, merges)
+        alias_links = list(manager.filter(**{f'{source_field.attname}__in': list(alias_map)}))
+        if not alias_links:
+            return
+
+        primary_values = {
+            getattr(merged_model_instance.primary_object, source_field.target_field.attname)
+            for merged_model_instance in alias_map.values()
+        }
+        existing_links = set(
+            manager
+            .filter(**{f'{source_field.attname}__in': primary_values})
+            .values_list(source_field.attname, target_field.attname)
+        )
+        new_links, removed_targets, added_targets = cls._get_m2m_link_changes(
+            relation, alias_map, alias_links, existing_links,
+        )
+
+        if merges[0][0].journal is not None:
+            cls._journal_m2m_links(relation, alias_map, alias_links, new_links,
+                                   using or router.db_for_write(relation.through))
+
+        cls._send_bulk_m2m_changed(relation, merges, 'pre', removed_targets, added_targets)
+        manager.bulk_create(new_links, ignore_conflicts=True)
+        manager.filter(**{f'{source_field.attname}__in': list(alias_map)}).delete()
+        cls._send_bulk_m2m_changed(relation, merges, 'post', removed_targets, added_targets)
+
+        related_objects = None
+        if merges[0][0].keep_related_objects:
+            hints = {'instance': merges[0][0].primary_object}
+            related_attname = target_field.target_field.attname
+            related_objects = {
+                getattr(obj, related_attname): obj
+                for obj in relation.related_model._base_manager.db_manager(hints=hints).filter(**{
+                    f'{related_attname}__in': {getattr(link, target_field.attname) for link in alias_links}
+                })
+            }
+        cls._record_m2m_related_objects(relation, alias_map, alias_links, related_objects)
+
+    @classmethod
+    async def _abulk_handle_m2m_related_field(
+        cls,
+        relation: RelationPlan,
+        merges: List[Tuple['MergedModelInstance', List[Model]]],
+        using: str,
+    ):
+        if relation.symmetrical:
+            await sync_to_async(cls._bulk_handle_m2m_related_field)(relation, merges, using)
+            return
+
+        source_field = relation.through._meta.get_field(relation.source_name)
+        target_field = relation.through._meta.get_field(relation.target_name)
+        manager = relation.through._base_manager.db_manager(using)
+        send_m2m_signals = merges[0][0].send_m2m_signals
+
+        alias_map = cls._get_alias_map(source_field.target_field.attname, merges)
+        alias_links = [link async for link in manager.filter(**{f'{source_field.attname}__in': list(alias_map)})]
+        if not alias_links:
+            return
+
+        primary_values = {
+            getattr(merged_model_instance.primary_object, source_field.target_field.attname)
+            for merged_model_instance in alias_map.values()
+        }
+        existing_links = {
+            link async for link in manager
+            .filter(**{f'{source_field.attname}__in': primary_values})
+            .values_list(source_field.attname, target_field.attname)
+        }
+        new_links, removed_targets, added_targets = cls._get_m2m_link_changes(
+            relation, alias_map, alias_links, existing_links,
+        )
+
+        # receivers are synchronous
+        if send_m2m_signals:
+            await sync_to_async(cls._send_bulk_m2m_changed)(relation, merges, 'pre', removed_targets, added_targets)
+        await manager.abulk_create(new_links, ignore_conflicts=True)
+        await manager.filter(**{f'{source_field.attname}__in': list(alias_map)}).adelete()
+        if send_m2m_signals:
+            await sync_to_async(cls._send_bulk_m2m_changed)(relation, merges, 'post', removed_targets, added_targets)
+
+        related_objects = None
+        if merges[0][0].keep_related_objects:
+            hints = {'instance': merges[0][0].primary_object}
+            related_attname = target_field.target_field.attname
+            related_objects = {
+                getattr(obj, related_attname): obj
+                async for obj in relation.related_model._base_manager.db_manager(hints=hints).filter(**{
+                    f'{related_attname}__in': {getattr(link, target_field.attname) for link in alias_links}
+                })
+            }
+        cls._record_m2m_related_objects(relation, alias_map, alias_links, related_objects)
+
+    @staticmethod
+    def _validate_clusters(merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        model = merges[0][0].primary_object.__class__
+        clustered_pks = set()  # type: set
+
+        for merged_model_instance, alias_objects in merges:
+            if not isinstance(merged_model_instance.primary_object, model):
+                raise TypeError('Only models of the same class can be merged')
+
+            for alias_object in alias_objects:
+                merged_model_instance._validate_alias_object(alias_object)
+
+            pks = {merged_model_instance.primary_object.pk} | {alias_object.pk for alias_object in alias_objects}
+            if not clustered_pks.isdisjoint(pks):
+                raise ValueError('An object can only be part of one cluster')
+            clustered_pks |= pks
+
+    @classmethod
+    def _merge_clusters(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        cls._validate_clusters(merges)
+        cls._share_metrics(merges)
+        merged_model_instance = merges[0][0]
+
+        # Nested merges are committed by the merge that started them. A merge only owns its two-phase commit while it
+        # runs, so the instance can merge again afterwards.
+        two_phase_commit = None  # type: Optional[TwoPhaseCommit]
+        if not merged_model_instance.merging_objects:
+            # chunks of a chunked merge are committed on their own unless the merge is atomic
+            two_phase_commit = TwoPhaseCommit(merged_model_instance.atomic or not merged_model_instance.chunk_size)
+            for instance, _ in merges:
+                instance.two_phase_commit = two_phase_commit
+                # every merge is journaled under its own merge id, `merge_id` keeps the one of the last merge
+                if instance.journal is not None:
+                    instance.journal = JournalRecorder(instance.primary_object)
+
+        try:
+            with merged_model_instance._atomic():
+                if merged_model_instance.atomic:
+                    with merged_model_instance._measure('lock'):
+                        cls._lock_clusters(merges)
+                cls._apply_merge_clusters(merges)
+                # the other databases commit first, so the transaction of this one is still rolled back if they fail
+                if two_phase_commit is not None:
+                    two_phase_commit.commit()
+        except BaseException:
+            if two_phase_commit is not None:
+                two_phase_commit.rollback()
+            raise
+        finally:
+            if two_phase_commit is not None:
+                for instance, _ in merges:
+                    instance.two_phase_commit = None
+
+        cls._send_metrics(merges)
+
+    @staticmethod
+    def _group_by_database(
+        relation: RelationPlan,
+        merges: List[Tuple['MergedModelInstance', List[Model]]],
+    ) -> Dict[str, List[Tuple['MergedModelInstance', List[Model]]]]:
+        # clusters are routed by their primary object, which the related rows of the alias objects are moved to
+        databases = defaultdict(list)  # type: Dict[str, List[Tuple[MergedModelInstance, List[Model]]]]
+        for merged_model_instance, alias_objects in merges:
+            databases[relation.get_using(merged_model_instance.primary_object)].append(
+                (merged_model_instance, alias_objects)
+            )
+        return databases
+
+    @staticmethod
+    def _lock_related_rows(relation: RelationPlan, merges: List[Tuple['MergedModelInstance', List[Model]]], using: str):
+        alias_objects = [alias_object for _, cluster_alias_objects in merges for alias_object in cluster_alias_objects]
+        queryset, _ = relation.get_alias_rows(alias_objects, using)
+        locked = list(queryset.select_for_update().order_by('pk').values_list('pk'))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Locked {len(locked)} {queryset.model.__name__} object(s) of {relation.accessor_name} '
+                         f'on {using}')
+
+    @classmethod
+    def _lock_clusters(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        # Every merge locks the clustered objects first and then the rows of each relation, all in pk order, so
+        # concurrent merges acquire their locks in the same order instead of deadlocking. Rows routed to other
+        # databases are locked by their participant, in its own transaction.
+        merged_model_instance = merges[0][0]
+        model = merged_model_instance.primary_object.__class__
+        using = merged_model_instance.using
+        pks = [instance.primary_object.pk for instance, _ in merges]
+        pks += [alias_object.pk for _, alias_objects in merges for alias_object in alias_objects]
+
+        locked = list(
+            model._base_manager.using(using).select_for_update().filter(pk__in=pks).order_by('pk').values_list('pk')
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Locked {len(locked)} {model.__name__} object(s)')
+
+        for relation in merged_model_instance.relations:
+            if relation.alias_attname is None:
+                continue
+            relation_merges = cls._group_by_database(relation, merges).get(using)
+            if relation_merges:
+                cls._lock_related_rows(relation, relation_merges, using)
+
+    def _atomic(self):
+        if not self.atomic:
+            return nullcontext()
+        return transaction.atomic(using=self.using)
+
+    @classmethod
+    def _bulk_handle_related_field(
+        cls,
+        relation: RelationPlan,
+        merges: List[Tuple['MergedModelInstance', List[Model]]],
+        using: str,
+    ):
+        with merges[0][0]._measure(relation.accessor_name, using):
+            if relation.one_to_many:
+                cls._bulk_handle_o2m_related_field(relation, merges, using)
+            elif relation.many_to_many:
+                cls._bulk_handle_m2m_related_field(relation, merges, using)
+
+    @classmethod
+    def _bulk_handle_relations(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        # Relations are rewritten on the database their router picks for each cluster. The rewrites routed to other
+        # databases than the one of the merged model run concurrently, one participant per database, and are
+        # prepared before any alias object is deleted.
+        merged_model_instance = merges[0][0]
+        two_phase_commit = merged_model_instance.two_phase_commit
+        using = merged_model_instance.using
+        local_relations = []
+
+        for relation in merged_model_instance.relations:
+            if not relation.one_to_many and not relation.many_to_many:
+                continue
+
+            for relation_using, relation_merges in cls._group_by_database(relation, merges).items():
+                if relation_using == using or two_phase_commit is None:
+                    local_relations.append((relation, relation_merges, relation_using))
+                    continue
+
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f'Rewriting {relation.accessor_name} of {len(relation_merges)} cluster(s) '
+                                 f'on {relation_using}')
+                if merged_model_instance.atomic:
+                    two_phase_commit.submit(relation_using, cls._lock_related_rows, relation, relation_merges,
+                                            relation_using)
+                two_phase_commit.submit(relation_using, cls._bulk_handle_related_field, relation, relation_merges,
+                                        relation_using)
+
+        for relation, relation_merges, relation_using in local_relations:
+            cls._bulk_handle_related_field(relation, relation_merges, relation_using)
+
+        if two_phase_commit is not None:
+            two_phase_commit.prepare()
+
+    @classmethod
+    def _uses_other_databases(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]) -> bool:
+        merged_model_instance = merges[0][0]
+        return any(
+            using != merged_model_instance.using
+            for relation in merged_model_instance.relations if relation.one_to_many or relation.many_to_many
+            for using in cls._group_by_database(relation, merges)
+        )
+
+    @classmethod
+    def _apply_merge_clusters(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        measure = merges[0][0]._measure
+        with measure('fields'):
+            alias_values = cls._fetch_alias_values(merges)
+        with measure('prefetch'):
+            cls._prefetch_relations(merges)
+        nested_merges = cls._get_nested_merges(merges)
+
+        with measure('snapshot'):
+            for merged_model_instance, alias_objects in merges:
+                if merged_model_instance.take_snapshot:
+                    merged_model_instance._take_snapshot(alias_objects)
+                if merged_model_instance.journal is not None:
+                    merged_model_instance._start_journal(merged_model_instance.journal, alias_objects)
+
+        if merges[0][0].bulk:
+            cls._bulk_handle_relations(merges)
+
+        # reverse one-to-one objects are deleted along with the alias objects, so they are merged first
+        for relation, relation_merges in nested_merges:
+            if not relation.field.concrete:
+                with measure(relation.accessor_name):
+                    cls._merge_nested(relation, relation_merges)
+
+        for merged_model_instance, alias_objects in merges:
+            # rows are picked before deleted alias objects lose their pk
+            alias_rows = [alias_values[obj.pk] for obj in alias_objects if obj.pk in alias_values]
+            # alias objects are not isolated from each other, the bulk rewrites already moved the rows of all of them
+            for alias_object in alias_objects:
+                merged_model_instance._merge(alias_object)
+            with measure('fields'):
+                merged_model_instance._merge_field_values(alias_rows)
+            with measure('save'):
+                merged_model_instance._save_primary_object()
+
+        # deleting a forward one-to-one object would cascade to the alias objects still pointing at it
+        for relation, relation_merges in nested_merges:
+            if relation.field.concrete:
+                with measure(relation.accessor_name):
+                    cls._merge_nested(relation, relation_merges)
+
+        # nested merges are journaled with the merge that started them
+        if merges[0][0].journal is not None and not merges[0][0].merging_objects:
+            with measure('journal'):
+                save_journals([merged_model_instance.journal for merged_model_instance, _ in merges
+                               if merged_model_instance.journal is not None])
+
+    @classmethod
+    async def _amerge_clusters(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        if merges[0][0].atomic or merges[0][0].journal is not None or cls._uses_other_databases(merges):
+            # transactions are bound to a synchronous connection, and so are the collectors of journaled deletes and
+            # the participants of other databases
+            await sync_to_async(cls._merge_clusters)(merges)
+            return
+
+        cls._validate_clusters(merges)
+        cls._share_metrics(merges)
+        ameasure = merges[0][0]._ameasure
+        async with ameasure('fields'):
+            alias_values = await cls._afetch_alias_values(merges)
+        async with ameasure('prefetch'):
+            await sync_to_async(cls._prefetch_relations)(merges)
+        nested_merges = await sync_to_async(cls._get_nested_merges)(merges)
+
+        async with ameasure('snapshot'):
+            for merged_model_instance, alias_objects in merges:
+                if merged_model_instance.take_snapshot:
+                    await sync_to_async(merged_model_instance._take_snapshot)(alias_objects)
+
+        if merges[0][0].bulk:
+            # relations are independent of each other, their statements interleave on the connection. Every cluster
+            # is routed to the database of the merged model, see `_uses_other_databases`.
+            handlers = []
+            for relation in merges[0][0].relations:
+                using = relation.get_using(merges[0][0].primary_object)
+                if relation.one_to_many:
+                    handlers.append((relation, cls._abulk_handle_o2m_related_field(relation, merges, using)))
+                elif relation.many_to_many:
+                    handlers.append((relation, cls._abulk_handle_m2m_related_field(relation, merges, using)))
+
+            if merges[0][0].metrics is None:
+                await asyncio.gather(*[handler for _, handler in handlers])
+            else:
+                # measured handlers run one after another so that statements are attributed to their relation
+                for relation, handler in handlers:
+                    async with ameasure(relation.accessor_name):
+                        await handler
+
+        for relation, relation_merges in nested_merges:
+            if not relation.field.concrete:
+                async with ameasure(relation.accessor_name):
+                    await cls._amerge_nested(relation, relation_merges)
+
+        for merged_model_instance, alias_objects in merges:
+            alias_rows = [alias_values[obj.pk] for obj in alias_objects if obj.pk in alias_values]
+            for alias_object in alias_objects:
+                await merged_model_instance._amerge(alias_object)
+            async with ameasure('fields'):
+                merged_model_instance._merge_field_values(alias_rows)
+            async with ameasure('save'):
+                await merged_model_instance._asave_primary_object()
+
+        for relation, relation_merges in nested_merges:
+            if relation.field.concrete:
+                async with ameasure(relation.accessor_name):
+                    await cls._amerge_nested(relation, relation_merges)
+
+        cls._send_metrics(merges)
+
+    @classmethod
+    def merge_many(
+        cls,
+        clusters: Iterable[Tuple[Model, List[Model]]],
+        batch_size=1000,
+        **kwargs,
+    ) -> List[Tuple[Model, List[Model]]]:
+        debug = logger.isEnabledFor(logging.DEBUG)
+        kwargs.setdefault('bulk', True)
+        clusters = iter(clusters)
+        audit_trails = []  # type: List
+
+        while True:
+            merges = [
+                (cls(primary_object, **kwargs), list(alias_objects))
+                for primary_object, alias_objects in islice(clusters, batch_size)
+            ]
+            if not merges:
+                break
+
+            if debug:
+                logger.debug(f'Merging a batch of {len(merges)} {merges[0][0].model_meta.model_name} cluster(s)')
+            cls._merge_clusters(merges)
+            audit_trails.extend(
+                (merged_model_instance.primary_object, merged_model_instance.modified_related_objects)
+                for merged_model_instance, _ in merges
+            )
+
+        return audit_trails
+
+    def _plan_o2m_related_field(self, relation: RelationPlan, alias_objects: List[Model]) -> RelationReport:
+        report = RelationReport('one_to_many', relation.accessor_name, relation.related_model.__name__)
+        queryset, _ = relation.get_alias_rows(alias_objects, relation.get_using(self.primary_object))
+        total = queryset.count()
+        target = self._get_o2m_target(relation)
+        conflicts = self._get_unique_conflicts(relation, queryset, target).count() if total else 0
+
+        if not total:
+            # the related rows are still read once, in bulk mode or by the prefetch
+            report.statements = 1 if self.bulk or relation.alias_attname is not None else 0
+            return report
+
+        report.repointed = total - conflicts
+        if relation.null:
+            report.nulled = conflicts
+        else:
+            report.deleted = conflicts
+
+        # conflicts are only looked up for relations with unique constraints
+        conflict_lookups = 1 if relation.unique_constraints else 0
+        if self.bulk:
+            report.statements = 2 + conflict_lookups + (1 if conflicts else 0)
+        else:
+            # the rows and conflicts of all alias objects are prefetched, then per alias a chunked select and the
+            # conflicting rows at once, and a save per repointed object
+            report.statements = (
+                1 + conflict_lookups + len(alias_objects) + report.repointed + (len(alias_objects) if conflicts else 0)
+            )
+
+        return report
+
+    def _plan_m2m_related_field(self, relation: RelationPlan, alias_objects: List[Model]) -> RelationReport:
+        report = RelationReport('many_to_many', relation.accessor_name, relation.related_model.__name__)
+        source_field = relation.through._meta.get_field(relation.source_name)
+        target_field = relation.through._meta.get_field(relation.target_name)
+        manager = relation.through._base_manager.db_manager(relation.get_using(self.primary_object))
+
+        alias_values = [getattr(alias_object, source_field.target_field.attname) for alias_object in alias_objects]
+        primary_value = getattr(self.primary_object, source_field.target_field.attname)
+        alias_links = manager.filter(**{f'{source_field.attname}__in': alias_values})
+
+        total = alias_links.count()
+        if not total:
+            report.statements = 1 if self.bulk or relation.alias_attname is not None else 0
+            return report
+
+        primary_targets = manager.filter(**{source_field.attname: primary_value}).values(target_field.attname)
+        report.repointed = (
+            alias_links
+            .exclude(**{f'{target_field.attname}__in': primary_targets})
+            .values(target_field.attname)
+            .distinct()
+            .count()
+        )
+        report.deleted = total - report.repointed
+
+        if self.bulk and not relation.symmetrical:
+            report.statements = 4
+        else:
+            # the links are prefetched, then every link is removed and added, with a SELECT more per link on databases
+            # that cannot ignore conflicts
+            report.statements = 1 + 2 * total
+
+        return report
+
+    def _plan_o2o_related_field(self, relation: RelationPlan, alias_objects: List[Model]) -> RelationReport:
+        report = RelationReport('one_to_one', relation.accessor_name, relation.related_model.__name__)
+        # the one-to-one objects of all alias objects are prefetched with one query, see `_prefetch_relations`
+        report.statements = 1 if self.merge_field_values or self.o2o_merge_depth > 0 else 0
+
+        if not self.merge_field_values:
+            return report
+
+        if relation.field.concrete:
+            has_primary_o2o_object = getattr(self.primary_object, relation.field.attname) is not None
+            has_alias_o2o_object = any(getattr(alias_object, relation.field.attname) is not None
+                                       for alias_object in alias_objects)
+        else:
+            manager = relation.related_model._base_manager.db_manager(hints={'instance': self.primary_object})
+            field = relation.field.field
+            has_primary_o2o_object = manager.filter(**{field.name: self.primary_object}).count() > 0
+            has_alias_o2o_object = manager.filter(**{f'{field.name}__in': alias_objects}).count() > 0
+
+        if not has_primary_o2o_object and has_alias_o2o_object:
+            report.repointed = 1
+            # the alias object is saved, a reverse one-to-one object is also moved with its own update
+            report.statements += 1 if relation.field.concrete else 2
+
+        return report
+
+    @classmethod
+    def plan(cls, primary_object: Model, alias_objects: List[Model], **kwargs) -> MergeReport:
+        merged_model_instance = cls(primary_object, **kwargs)
+        for alias_object in alias_objects:
+            merged_model_instance._validate_alias_object(alias_object)
+
+        model_meta = merged_model_instance.model_meta
+        alias_pks = [alias_object.pk for alias_object in alias_objects]
+        report = MergeReport(model_meta.model_name, primary_object.pk, alias_pks)
+
+        for relation in merged_model_instance.relations:
+            if relation.one_to_many:
+                report.relations.append(merged_model_instance._plan_o2m_related_field(relation, alias_objects))
+            elif relation.one_to_one:
+                relation_report = merged_model_instance._plan_o2o_related_field(relation, alias_objects)
+                report.relations.append(relation_report)
+                if relation.field.concrete and relation_report.repointed:
+                    report.updated_fields.append(relation.field.name)
+            elif relation.many_to_many:
+                report.relations.append(merged_model_instance._plan_m2m_related_field(relation, alias_objects))
+
+        if merged_model_instance.merge_field_values:
+            alias_values = cls._fetch_alias_values([(merged_model_instance, alias_objects)])
+            alias_rows = [alias_values[obj.pk] for obj in alias_objects if obj.pk in alias_values]
+            report.updated_fields += [
+                field.name for field in merged_model_instance._resolve_field_values(alias_rows)
+            ]
+
+        # the field values of the alias objects are read with one query, and the primary object is saved once, to
+        # every table of its inheritance chain holding an updated field
+        report.statements = 1 if merged_model_instance.merge_field_values else 0
+        report.statements += len({
+            field.model._meta.concrete_model
+            for field in model_meta.editable_fields
+            if field.name in report.updated_fields
+        })
+
+        if not merged_model_instance.keep_old:
+            report.deleted_aliases = len(alias_objects)
+            report.statements += len(alias_objects) * cls._plan_delete_statements(primary_object.__class__)
+
+        return report
+
+    @staticmethod
+    def _plan_delete_statements(model) -> int:
+        # The collector of every deleted alias object reads or fast deletes the rows of each relation it cascades
+        # to, and of each generic relation, then deletes a row from every table of the inheritance chain. Rows
+        # reached through those relations can cascade further, which is not counted.
+        options = model._meta
+        relations = [
+            related for related in get_candidate_relations_to_delete(options)
+            if related.field.remote_field.on_delete is not DO_NOTHING
+        ]
+        generic_relations = [field for field in options.private_fields if hasattr(field, 'bulk_related_objects')]
+        return len(relations) + len(generic_relations) + len(options.get_parent_list()) + 1
+
+    def merge_aliases(self, alias_objects: List[Model]):
+        self._merge_clusters([(self, alias_objects)])
 
     def merge(self, alias_object: Model):
-        primary_object = self.primary_object
+        self.merge_aliases([alias_object])
 
-        if not isinstance(alias_object, primary_object.__class__):
+    async def amerge_aliases(self, alias_objects: List[Model]):
+        await self._amerge_clusters([(self, alias_objects)])
+
+    async def amerge(self, alias_object: Model):
+        await self.amerge_aliases([alias_object])
+
+    def _validate_alias_object(self, alias_object: Model):
+        if not isinstance(alias_object, self.primary_object.__class__):
             raise TypeError('Only models of the same class can be merged')
 
-        if primary_object.pk == alias_object.pk:
+        if self.primary_object.pk == alias_object.pk:
             raise ValueError('Cannot deduplicate an object on itself')
 
-        logger.debug(f'Merging {self.model_meta.model_name}[pk={alias_object.pk}]')
-        model_meta = ModelMeta(primary_object)
-
-        for related_field in model_meta.related_fields:
-            if related_field.one_to_many:
-                self._handle_o2m_related_field(related_field, alias_object)
-            elif related_field.one_to_one:
-                self._handle_o2o_related_field(related_field, alias_object)
-            elif related_field.many_to_many:
-                self._handle_m2m_related_field(related_field, alias_object)
-
-        if self.merge_field_values:
-            # This step can lead to validation errors if `field` has a `unique or` `unique_together` constraint.
-            for field in model_meta.editable_fields:
-                primary_value = getattr(primary_object, field.name)
-                alias_value = getattr(alias_object, field.name)
-
-                logger.debug(f'Primary {field.name} has value: {primary_value}, '
-                             f'Alias {field.name} has value: {alias_value}')
-                if primary_value in field.empty_values and alias_value not in field.empty_values:
-                    logger.debug(f'Setting primary {field.name} to alias value: {alias_value}')
-                    setattr(primary_object, field.name, alias_value)
+    def _merge(self, alias_object: Model):
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        if debug:
+            logger.debug(f'Merging {self.model_meta.model_name}[pk={alias_object.pk}]')
+
+        for relation in self.relations:
+            # one-to-one handlers write the merged objects, the other handlers write the rows of the relation
+            using = None if relation.one_to_one else relation.get_using(self.primary_object)
+            with self._measure(relation.accessor_name, using):
+                if relation.one_to_many:
+                    if not self.bulk:
+                        self._handle_o2m_related_field(relation, alias_object)
+                elif relation.one_to_one:
+                    self._handle_o2o_related_field(relation, alias_object)
+                elif relation.many_to_many:
+                    if not self.bulk:
+                        self._handle_m2m_related_field(relation, alias_object)
 
         if not self.keep_old:
-            logger.debug(f'Deleting alias object {self.model_meta.model_name}[pk={alias_object.pk}]')
-            alias_object.delete()
+            if debug:
+                logger.debug(f'Deleting alias object {self.model_meta.model_name}[pk={alias_object.pk}]')
+            with self._measure('delete'):
+                if self.journal is None:
+                    alias_object.delete()
+                else:
+                    using = router.db_for_write(alias_object.__class__, instance=alias_object)
+                    self.journal.delete([alias_object], using, origin=alias_object)
+
+    async def _amerge(self, alias_object: Model):
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        if debug:
+            logger.debug(f'Merging {self.model_meta.model_name}[pk={alias_object.pk}]')
+
+        for relation in self.relations:
+            async with self._ameasure(relation.accessor_name):
+                if relation.one_to_many:
+                    if not self.bulk:
+                        await sync_to_async(self._handle_o2m_related_field)(relation, alias_object)
+                elif relation.one_to_one:
+                    # related objects are loaded lazily through the accessor
+                    await sync_to_async(self._handle_o2o_related_field)(relation, alias_object)
+                elif relation.many_to_many:
+                    if not self.bulk:
+                        await sync_to_async(self._handle_m2m_related_field)(relation, alias_object)
+
+        if not self.keep_old:
+            if debug:
+                logger.debug(f'Deleting alias object {self.model_meta.model_name}[pk={alias_object.pk}]')
+            async with self._ameasure('delete'):
+                await alias_object.adelete()
+
+    @staticmethod
+    def _get_alias_values_queryset(merges: List[Tuple['MergedModelInstance', List[Model]]]):
+        merged_model_instance = merges[0][0]
+        if not merged_model_instance.merge_field_values:
+            return None
+
+        model = merged_model_instance.primary_object.__class__
+        manager = model._base_manager.db_manager(hints={'instance': merged_model_instance.primary_object})
+        pks = [alias_object.pk for _, alias_objects in merges for alias_object in alias_objects]
+        return manager.filter(pk__in=pks).values(*merged_model_instance.model_meta.concrete_attnames)
+
+    @classmethod
+    def _fetch_alias_values(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]) -> Dict:
+        # the field values of every alias object of every cluster are read with a single query
+        queryset = cls._get_alias_values_queryset(merges)
+        if queryset is None:
+            return {}
+
+        pk_attname = queryset.model._meta.pk.attname
+        return {row[pk_attname]: row for row in queryset}
+
+    @classmethod
+    async def _afetch_alias_values(cls, merges: List[Tuple['MergedModelInstance', List[Model]]]) -> Dict:
+        queryset = cls._get_alias_values_queryset(merges)
+        if queryset is None:
+            return {}
+
+        pk_attname = queryset.model._meta.pk.attname
+        return {row[pk_attname]: row async for row in queryset}
+
+    def _resolve_field_values(self, alias_rows: List[Dict]) -> Dict[Field, Any]:
+        primary_row = {attname: getattr(self.primary_object, attname) for attname in self.model_meta.concrete_attnames}
+        return resolve_field_values(
+            self.model_meta.mergeable_fields, [primary_row, *alias_rows], self.field_strategies, self.default_strategy,
+        )
+
+    def _merge_field_values(self, alias_rows: List[Dict]):
+        if not self.merge_field_values:
+            return
+
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for field, value in self._resolve_field_values(alias_rows).items():
+            if debug:
+                logger.debug(f'Setting primary {field.name} from {getattr(self.primary_object, field.attname)} '
+                             f'to alias value: {value}')
+            setattr(self.primary_object, field.attname, value)
+            self._mark_updated_field(field.name)
+
+    def _start_journal(self, journal: JournalRecorder, alias_objects: List[Model]):
+        # the pre-images of the primary object are read before any handler sets its fields
+        self.primary_values = {
+            attname: getattr(self.primary_object, attname) for attname in self.model_meta.concrete_attnames
+        }
+        if not self.merging_objects:
+            journal.alias_pks = [alias_object.pk for alias_object in alias_objects]
+
+    def _take_snapshot(self, alias_objects: List[Model]):
+        self.snapshot = serialize('json', [self.primary_object, *alias_objects])
+        snapshot_logger.info(self.snapshot)
+
+    def _mark_updated_field(self, field_name: str):
+        if field_name not in self.updated_fields:
+            self.updated_fields.append(field_name)
+
+    def _save_primary_object(self):
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if not self.updated_fields:
+            if debug:
+                logger.debug(f'No fields changed on {self.model_meta.model_name}[pk={self.primary_object.pk}]')
+            return
+
+        if debug:
+            logger.debug(f'Saving {self.model_meta.model_name}[pk={self.primary_object.pk}] '
+                         f'with update_fields={self.updated_fields}')
+        if self.journal is not None:
+            attnames = [self.primary_object._meta.get_field(name).attname for name in self.updated_fields]
+            self.journal.record_update(self.primary_object.__class__, attnames,
+                                       [(self.primary_object.pk, *[self.primary_values[a] for a in attnames])],
+                                       self.using)
+        self.primary_object.save(update_fields=self.updated_fields)
+        self.updated_fields = []
+
+    async def _asave_primary_object(self):
+        if not self.updated_fields:
+            return
 
-        primary_object.save()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f'Saving {self.model_meta.model_name}[pk={self.primary_object.pk}] '
+                         f'with update_fields={self.updated_fields}')
+        await self.primary_object.asave(update_fields=self.updated_fields)
+        self.updated_fields = []
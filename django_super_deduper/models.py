@@ -1,25 +1,306 @@
-from typing import List
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
 
-from django.db.models import Field, Model
+from django.apps import apps
+from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
+from django.contrib.contenttypes.models import ContentType
+from django.core.signals import setting_changed
+from django.db import router
+from django.db.models import Field, ManyToManyField, Model, Q, QuerySet, UniqueConstraint
+from django.db.models.signals import class_prepared, post_migrate
+
+_merge_plans = {}  # type: dict
+
+
+class RelationPlan(object):
+
+    def __init__(self, field: Field) -> None:
+        self.field = field
+        self.related_model = field.related_model
+        self.one_to_many = field.one_to_many
+        self.one_to_one = field.one_to_one
+        self.many_to_many = field.many_to_many
+        self.remote_field = None  # type: Field
+        self.generic_foreign_key = None  # type: GenericForeignKey
+        self.unique_field_sets = []  # type: List[Tuple[str, ...]]
+        self.conditional_unique_field_sets = []  # type: List[Tuple[Tuple[str, ...], Q]]
+        self.null = False
+        self._content_type = None  # type: Optional[ContentType]
+        # multi-table inheritance links share their row with the merged object
+        self.parent_link = field.one_to_one and (field.remote_field if field.concrete else field).parent_link
+
+        if isinstance(field, GenericRelation):
+            private_fields = self.related_model._meta.private_fields
+            self.generic_foreign_key = [f for f in private_fields if field._is_matching_generic_foreign_key(f)][0]
+            self.accessor_name = field.get_attname()
+            self.remote_field_name = self.generic_foreign_key.name
+            fk_field = self.related_model._meta.get_field(self.generic_foreign_key.fk_field)
+            self.null = fk_field.null
+            self.unique_field_sets = ModelMeta.unique_field_sets(fk_field)
+            self.conditional_unique_field_sets = ModelMeta.conditional_unique_field_sets(fk_field)
+        elif self.one_to_many:
+            self.remote_field = field.field
+            self.accessor_name = field.get_accessor_name()
+            self.remote_field_name = field.field.name
+            self.null = field.field.null
+            self.unique_field_sets = ModelMeta.unique_field_sets(field.field)
+            self.conditional_unique_field_sets = ModelMeta.conditional_unique_field_sets(field.field)
+        elif self.many_to_many:
+            if isinstance(field, ManyToManyField):
+                self.accessor_name = field.get_attname()
+                self.m2m_field = field
+                self.source_name, self.target_name = field.m2m_field_name(), field.m2m_reverse_field_name()
+                self.reverse = False
+            else:
+                # reverse m2m relations are described from the side of the model declaring the field
+                self.accessor_name = field.get_accessor_name()
+                self.m2m_field = field.field
+                self.source_name, self.target_name = field.field.m2m_reverse_field_name(), field.field.m2m_field_name()
+                self.reverse = True
+            self.through = self.m2m_field.remote_field.through
+            self.symmetrical = self.m2m_field.remote_field.symmetrical and not self.reverse
+        else:
+            self.accessor_name = field.name
+
+        # attname on the merged model that related rows point at, forward one-to-one fields only touch the primary
+        self.alias_attname = None  # type: Optional[str]
+        if self.is_generic:
+            self.alias_attname = field.model._meta.pk.attname
+        elif self.many_to_many:
+            self.alias_attname = self.through._meta.get_field(self.source_name).target_field.attname
+        elif self.one_to_many or not field.concrete:
+            self.alias_attname = field.field.target_field.attname
+
+    @classmethod
+    def for_generic_foreign_key(cls, model, generic_foreign_key: GenericForeignKey) -> 'RelationPlan':
+        # an unbound GenericRelation describes a generic foreign key that `model` does not declare a relation for
+        field = GenericRelation(
+            generic_foreign_key.model,
+            content_type_field=generic_foreign_key.ct_field,
+            object_id_field=generic_foreign_key.fk_field,
+            for_concrete_model=generic_foreign_key.for_concrete_model,
+        )
+        field.set_attributes_from_name(f'{generic_foreign_key.model._meta.model_name}_{generic_foreign_key.name}')
+        field.model = model
+        return cls(field)
+
+    @property
+    def is_generic(self) -> bool:
+        return self.generic_foreign_key is not None
+
+    @property
+    def content_type(self) -> ContentType:
+        # plans are dropped after migrations, so the content type cannot go stale
+        if self._content_type is None:
+            self._content_type = self.field.get_content_type()
+        return self._content_type
+
+    def get_null_values(self) -> Dict:
+        if self.is_generic:
+            return {self.generic_foreign_key.ct_field: None, self.generic_foreign_key.fk_field: None}
+        return {self.remote_field.name: None}
+
+    @property
+    def fk_field(self) -> Field:
+        # the column of the related model that points at the merged model
+        if self.is_generic:
+            return self.related_model._meta.get_field(self.generic_foreign_key.fk_field)
+        return self.remote_field
+
+    @property
+    def unique_constraints(self) -> List[Tuple[Tuple[str, ...], Optional[Q]]]:
+        return [(field_names, None) for field_names in self.unique_field_sets] + self.conditional_unique_field_sets
+
+    @property
+    def write_model(self):
+        # many-to-many relations are rewritten through their through table
+        return self.through if self.many_to_many else self.related_model
+
+    def get_using(self, instance: Model) -> str:
+        # routers get the object the rows belong to as a hint, so related rows can be sharded by it
+        return router.db_for_write(self.write_model, instance=instance)
+
+    def get_alias_values(self, objs: List[Model]) -> List:
+        return [getattr(obj, self.alias_attname) for obj in objs] if self.alias_attname else []
+
+    def get_alias_rows(self, alias_objects: List[Model], using: Optional[str] = None) -> Tuple[QuerySet, List[str]]:
+        # rows a merge of `alias_objects` rewrites, and the attnames pointing at them
+        alias_values = self.get_alias_values(alias_objects)
+        if self.is_generic:
+            fk_field = self.generic_foreign_key.fk_field
+            queryset = self.related_model._base_manager.db_manager(using).filter(**{
+                self.generic_foreign_key.ct_field: self.content_type,
+                f'{fk_field}__in': alias_values,
+            })
+            return queryset, [fk_field]
+        elif self.many_to_many:
+            options = self.through._meta
+            attnames = [options.get_field(self.source_name).attname]
+            if self.symmetrical:
+                attnames.append(options.get_field(self.target_name).attname)
+            lookup = Q()
+            for attname in attnames:
+                lookup |= Q(**{f'{attname}__in': alias_values})
+            return self.through._base_manager.db_manager(using).filter(lookup), attnames
+        attname = self.field.field.attname
+        return self.related_model._base_manager.db_manager(using).filter(**{f'{attname}__in': alias_values}), [attname]
+
+    def get_related_values(self, alias_objects: List[Model], using: Optional[str] = None) -> Dict[Any, List]:
+        # The pks of the rows of each of `alias_objects`, keyed by the value pointing at it, with a single query:
+        # the related rows of one-to-many relations, and the linked objects of many-to-many relations
+        if self.many_to_many:
+            options = self.through._meta
+            source_attname = options.get_field(self.source_name).attname
+            target_attname = options.get_field(self.target_name).attname
+            rows = (
+                self.through._base_manager
+                .db_manager(using)
+                .filter(**{f'{source_attname}__in': self.get_alias_values(alias_objects)})
+                .order_by(target_attname)
+                .values_list(source_attname, target_attname)
+            )
+        else:
+            queryset, (attname, ) = self.get_alias_rows(alias_objects, using)
+            rows = queryset.order_by('pk').values_list(attname, 'pk')
+
+        related_values = defaultdict(list)  # type: Dict[Any, List]
+        for alias_value, value in rows:
+            related_values[alias_value].append(value)
+        return related_values
+
+    def get_o2o_objects(self, objs: List[Model], using: Optional[str] = None) -> Dict:
+        # the one-to-one related object of each of `objs` that has one, keyed by their pk, with a single query
+        if self.field.concrete:
+            attname = self.field.target_field.attname
+            values = {obj.pk: getattr(obj, self.field.attname) for obj in objs}
+            queryset = self.related_model._base_manager.db_manager(using).filter(**{
+                f'{attname}__in': [value for value in values.values() if value is not None],
+            })
+            related_objects = {getattr(related_object, attname): related_object for related_object in queryset}
+            return {pk: related_objects[value] for pk, value in values.items() if value in related_objects}
+
+        pks = dict(zip(self.get_alias_values(objs), [obj.pk for obj in objs]))
+        queryset, (attname, ) = self.get_alias_rows(objs, using)
+        return {pks[getattr(related_object, attname)]: related_object for related_object in queryset}
+
+
+class MergePlan(object):
+
+    def __init__(self, model) -> None:
+        options = model._meta
+        self.model_name = model.__name__
+        self.model = model
+        self.relations = [RelationPlan(f) for f in options.get_fields() if ModelMeta.is_related_field(f)]
+        self._undeclared_generic_relations = None  # type: Optional[List[RelationPlan]]
+        self.editable_fields = [f for f in options.fields if f.editable]
+        self.concrete_attnames = [f.attname for f in options.concrete_fields]
+        # related one-to-one fields are moved by their relation handler
+        self.mergeable_fields = [
+            f for f in self.editable_fields
+            if not f.primary_key and not (f.one_to_one and ModelMeta.is_related_field(f))
+        ]
+
+    @property
+    def undeclared_generic_relations(self) -> List[RelationPlan]:
+        # generic foreign keys of every installed model that can point at this model without a GenericRelation
+        if self._undeclared_generic_relations is None:
+            declared = [relation.field for relation in self.relations if relation.is_generic]
+            self._undeclared_generic_relations = [
+                RelationPlan.for_generic_foreign_key(self.model, f)
+                for related_model in apps.get_models() if related_model._meta.managed
+                for f in related_model._meta.private_fields
+                if isinstance(f, GenericForeignKey) and f.model is related_model
+                and not any(field.related_model is related_model and field._is_matching_generic_foreign_key(f)
+                            for field in declared)
+            ]
+        return self._undeclared_generic_relations
+
+
+def get_merge_plan(model) -> MergePlan:
+    try:
+        return _merge_plans[model]
+    except KeyError:
+        return _merge_plans.setdefault(model, MergePlan(model))
+
+
+def clear_merge_plans(**kwargs):
+    _merge_plans.clear()
+
+
+def _clear_merge_plans_on_installed_apps_change(setting, **kwargs):
+    if setting == 'INSTALLED_APPS':
+        clear_merge_plans()
+
+
+# Any new model class may add reverse relations to a model that already has a plan
+class_prepared.connect(clear_merge_plans, dispatch_uid='django_super_deduper.clear_merge_plans')
+# Plans cache content types, which migrations can recreate
+post_migrate.connect(clear_merge_plans, dispatch_uid='django_super_deduper.clear_merge_plans_after_migrate')
+setting_changed.connect(
+    _clear_merge_plans_on_installed_apps_change,
+    dispatch_uid='django_super_deduper.clear_merge_plans_on_installed_apps_change',
+)
 
 
 class ModelMeta(object):
 
     def __init__(self, instance: Model) -> None:
         self.options = instance._meta
+        self.merge_plan = get_merge_plan(self.options.model)
 
     @staticmethod
     def is_related_field(field: Field):
         return (field.one_to_many or field.one_to_one or field.many_to_many) and field.related_model._meta.managed
 
+    @staticmethod
+    def unique_field_sets(field: Field) -> List[Tuple[str, ...]]:
+        options = field.model._meta
+        field_sets = [(field.name, )] if field.unique else []  # type: List[Tuple[str, ...]]
+
+        for unique_together in options.unique_together:
+            if field.name in unique_together:
+                field_sets.append(tuple(unique_together))
+
+        for constraint in getattr(options, 'total_unique_constraints', []):
+            if field.name in constraint.fields:
+                field_sets.append(tuple(constraint.fields))
+
+        return field_sets
+
+    @staticmethod
+    def conditional_unique_field_sets(field: Field) -> List[Tuple[Tuple[str, ...], Q]]:
+        return [
+            (tuple(constraint.fields), constraint.condition)
+            for constraint in field.model._meta.constraints
+            if isinstance(constraint, UniqueConstraint) and constraint.condition is not None
+            and field.name in constraint.fields
+        ]
+
+    @property
+    def relations(self) -> List[RelationPlan]:
+        return self.merge_plan.relations
+
+    def get_relations(self, generic_foreign_keys=False) -> List[RelationPlan]:
+        if not generic_foreign_keys:
+            return self.merge_plan.relations
+        return self.merge_plan.relations + self.merge_plan.undeclared_generic_relations
+
     @property
     def related_fields(self) -> List[Field]:
-        return [f for f in self.options.get_fields() if ModelMeta.is_related_field(f)]
+        return [relation.field for relation in self.merge_plan.relations]
 
     @property
     def editable_fields(self) -> List[Field]:
-        return [f for f in self.options.fields if f.editable]
+        return self.merge_plan.editable_fields
+
+    @property
+    def mergeable_fields(self) -> List[Field]:
+        return self.merge_plan.mergeable_fields
+
+    @property
+    def concrete_attnames(self) -> List[str]:
+        return self.merge_plan.concrete_attnames
 
     @property
     def model_name(self) -> str:
-        return self.options.model.__name__
+        return self.merge_plan.model_name
@@ -0,0 +1,125 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+
+REPOINTED = 'repointed'
+NULLED = 'nulled'
+DELETED = 'deleted'
+MERGED = 'merged'
+
+
+class AuditRecord(NamedTuple):
+    model: str
+    pk: Any
+    action: str
+
+
+class RelationReport(object):
+
+    def __init__(
+        self,
+        kind: str,
+        accessor_name: str,
+        related_model: str,
+        repointed=0,
+        nulled=0,
+        deleted=0,
+        statements=0,
+    ) -> None:
+        self.kind = kind
+        self.accessor_name = accessor_name
+        self.related_model = related_model
+        self.repointed = repointed
+        self.nulled = nulled
+        self.deleted = deleted
+        self.statements = statements
+
+    @property
+    def conflicts(self) -> int:
+        return self.nulled + self.deleted
+
+    def to_dict(self) -> Dict:
+        return {
+            'kind': self.kind,
+            'accessor_name': self.accessor_name,
+            'related_model': self.related_model,
+            'repointed': self.repointed,
+            'nulled': self.nulled,
+            'deleted': self.deleted,
+            'conflicts': self.conflicts,
+            'statements': self.statements,
+        }
+
+
+class MergeReport(object):
+
+    def __init__(self, model_name: str, primary_pk, alias_pks: List) -> None:
+        self.model_name = model_name
+        self.primary_pk = primary_pk
+        self.alias_pks = alias_pks
+        self.relations = []  # type: List[RelationReport]
+        self.updated_fields = []  # type: List[str]
+        self.deleted_aliases = 0
+        self.statements = 0
+
+    @property
+    def repointed(self) -> int:
+        return sum(relation.repointed for relation in self.relations)
+
+    @property
+    def conflicts(self) -> int:
+        return sum(relation.conflicts for relation in self.relations)
+
+    @property
+    def estimated_statements(self) -> int:
+        return self.statements + sum(relation.statements for relation in self.relations)
+
+    def to_dict(self) -> Dict:
+        return {
+            'model_name': self.model_name,
+            'primary_pk': self.primary_pk,
+            'alias_pks': self.alias_pks,
+            'relations': [relation.to_dict() for relation in self.relations],
+            'updated_fields': self.updated_fields,
+            'deleted_aliases': self.deleted_aliases,
+            'repointed': self.repointed,
+            'conflicts': self.conflicts,
+            'estimated_statements': self.estimated_statements,
+        }
+
+
+class ClusterResult(NamedTuple):
+    primary_pk: Any
+    alias_pks: List
+    elapsed: float
+    error: Optional[str] = None
+
+
+class ExecutionReport(object):
+
+    def __init__(self, model_name: str, waves: int) -> None:
+        self.model_name = model_name
+        self.waves = waves
+        self.results = []  # type: List[ClusterResult]
+        self.elapsed = 0.0
+
+    @property
+    def merged(self) -> int:
+        return len([result for result in self.results if result.error is None])
+
+    @property
+    def failures(self) -> List[ClusterResult]:
+        return [result for result in self.results if result.error is not None]
+
+    @property
+    def throughput(self) -> float:
+        # merged clusters per second
+        return self.merged / self.elapsed if self.elapsed else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'model_name': self.model_name,
+            'waves': self.waves,
+            'merged': self.merged,
+            'failures': [result._asdict() for result in self.failures],
+            'elapsed': self.elapsed,
+            'throughput': self.throughput,
+        }
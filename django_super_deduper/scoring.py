@@ -0,0 +1,302 @@
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from itertools import groupby
+from typing import Callable, Dict, FrozenSet, Hashable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.db.models import Model
+
+from django_super_deduper.discover import BlockingKey, get_blocked_queryset
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+EDIT_DISTANCE = 'edit_distance'
+JACCARD = 'jaccard'
+TRIGRAM = 'trigram'
+
+_non_word_characters = re.compile(r'[^\w\s]+')
+
+# candidate pairs are scored in batches of at most this many pairs
+PAIR_BATCH_SIZE = 10000
+
+
+class Features(NamedTuple):
+    text: str
+    tokens: FrozenSet[str]
+    trigrams: FrozenSet[str]
+
+
+def normalize(value) -> str:
+    return ' '.join(_non_word_characters.sub('', str(value).lower()).split())
+
+
+def _get_padded_trigrams(text: str) -> List[str]:
+    padded = f'  {text} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def get_features(value) -> Optional[Features]:
+    text = normalize(value) if value is not None else ''
+    if not text:
+        return None
+    return Features(text, frozenset(text.split()), frozenset(_get_padded_trigrams(text)))
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    return len(a & b) / len(a | b)
+
+
+def edit_distance_similarity(a: Features, b: Features, minimum=0.0) -> float:
+    # Below `minimum` the similarity is only bounded: the distance stops being computed once it is too large, which
+    # the difference of the lengths alone can tell
+    s, t = a.text, b.text
+    if len(s) < len(t):
+        s, t = t, s
+    max_distance = (1 - minimum) * len(s) + 1e-9
+    if len(s) - len(t) > max_distance:
+        return 1 - (len(s) - len(t)) / len(s)
+
+    previous = list(range(len(t) + 1))
+    for i, s_char in enumerate(s, 1):
+        current = [i]
+        for j, t_char in enumerate(t, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (s_char != t_char)))
+        previous = current
+        # the smallest distance of a row never decreases in the next ones
+        if min(previous) > max_distance:
+            return 1 - min(previous) / len(s)
+    return 1 - previous[-1] / len(s)
+
+
+def jaccard_similarity(a: Features, b: Features) -> float:
+    return _jaccard(a.tokens, b.tokens)
+
+
+def trigram_similarity(a: Features, b: Features) -> float:
+    return _jaccard(a.trigrams, b.trigrams)
+
+
+SIMILARITY_FUNCTIONS = {
+    EDIT_DISTANCE: edit_distance_similarity,
+    JACCARD: jaccard_similarity,
+    TRIGRAM: trigram_similarity,
+}
+
+# Upper bounds of the similarity functions that only look at the sizes of the values
+SIMILARITY_BOUNDS = {
+    EDIT_DISTANCE: lambda a, b: 1 - abs(len(a.text) - len(b.text)) / max(len(a.text), len(b.text)),
+    JACCARD: lambda a, b: min(len(a.tokens), len(b.tokens)) / max(len(a.tokens), len(b.tokens)),
+    TRIGRAM: lambda a, b: min(len(a.trigrams), len(b.trigrams)) / max(len(a.trigrams), len(b.trigrams)),
+}  # type: Dict[str, Callable[[Features, Features], float]]
+
+
+def get_signature(metric: str, features: Features, threshold: float) -> Tuple[FrozenSet[Hashable], int]:
+    # The elements of a value, and how many of them it shares with any value it is at least `threshold` similar to
+    if metric == EDIT_DISTANCE:
+        # Trigrams are numbered by occurrence to be counted as a multiset. Every edit changes at most 3 of the
+        # len + 1 padded trigrams and a similar value is at most (1 - threshold) * len edits away, which bounds
+        # nothing below a threshold of 2/3.
+        counts = Counter()  # type: Counter
+        elements = frozenset()  # type: FrozenSet[Hashable]
+        for trigram in _get_padded_trigrams(features.text):
+            elements |= {(trigram, counts[trigram])}
+            counts[trigram] += 1
+        overlap = 1 + len(features.text) * (3 * threshold - 2)
+        return elements, math.ceil(overlap - 1e-9) if threshold > 2 / 3 else 0
+
+    # The intersection of two sets with a jaccard index of at least `threshold` holds that share of either of them
+    elements = features.tokens if metric == JACCARD else features.trigrams
+    return elements, math.ceil(threshold * len(elements) - 1e-9)
+
+
+class SimilarityScorer(object):
+
+    def __init__(
+        self,
+        weights: Dict[str, float],
+        threshold=0.8,
+        metrics: Optional[Dict[str, str]] = None,
+        default_metric=TRIGRAM,
+    ) -> None:
+        metrics = metrics or {}
+        self.weights = weights
+        self.threshold = threshold
+        self.metrics = {field_name: metrics.get(field_name, default_metric) for field_name in weights}
+        self.similarity_functions = {
+            field_name: SIMILARITY_FUNCTIONS[metric] for field_name, metric in self.metrics.items()
+        }
+        self.similarity_bounds = {field_name: SIMILARITY_BOUNDS[metric] for field_name, metric in self.metrics.items()}
+
+    def score(self, a: Sequence[Optional[Features]], b: Sequence[Optional[Features]]) -> float:
+        return self._weighted_score(a, b, self.similarity_functions)
+
+    def _weighted_score(
+        self,
+        a: Sequence[Optional[Features]],
+        b: Sequence[Optional[Features]],
+        functions: Dict[str, Callable],
+    ) -> float:
+        total = weight_sum = 0.0
+        for field_name, a_features, b_features in zip(self.weights, a, b):
+            # Fields that are blank on both sides say nothing about the pair
+            if a_features is None and b_features is None:
+                continue
+            weight = self.weights[field_name]
+            weight_sum += weight
+            if a_features is not None and b_features is not None:
+                total += weight * functions[field_name](a_features, b_features)
+        return total / weight_sum if weight_sum else 0.0
+
+    def _get_candidates(self, rows: List[Tuple[Optional[Features], ...]]) -> Iterator[Tuple[int, List[int]]]:
+        # A weighted score only reaches the threshold when the similarity of one of the fields does, which requires
+        # the values to share a minimum number of elements. Two such values share one of the rarest elements of each
+        # of them (prefix filtering), so every row is only compared with the earlier rows sharing one of those in a
+        # field. Values too short for a minimum overlap are compared with every value of the field.
+        metrics = list(self.metrics.values())
+        signatures = [
+            [get_signature(metric, features, self.threshold) if features is not None else None
+             for metric, features in zip(metrics, row)]
+            for row in rows
+        ]
+        frequencies = defaultdict(Counter)  # type: Dict[int, Counter]
+        for row_signatures in signatures:
+            for column, signature in enumerate(row_signatures):
+                if signature is not None:
+                    frequencies[column].update(signature[0])
+
+        index = defaultdict(list)  # type: Dict[Tuple[int, Hashable], List[int]]
+        present = defaultdict(list)  # type: Dict[int, List[int]]
+        unfiltered = defaultdict(list)  # type: Dict[int, List[int]]
+        for i, row_signatures in enumerate(signatures):
+            candidates = set()  # type: set
+            for column, signature in enumerate(row_signatures):
+                if signature is None:
+                    continue
+                elements, overlap = signature
+                if overlap <= 0:
+                    candidates.update(present[column])
+                    unfiltered[column].append(i)
+                else:
+                    frequency = frequencies[column]
+                    rarest = sorted(elements, key=lambda element: (frequency[element], element))
+                    candidates.update(unfiltered[column])
+                    for element in rarest[:len(elements) - overlap + 1]:
+                        candidates.update(index[column, element])
+                        index[column, element].append(i)
+                present[column].append(i)
+            yield i, sorted(candidates)
+
+    def _match_pairs(
+        self,
+        rows: List[Tuple[Optional[Features], ...]],
+        pairs: List[Tuple[int, int]],
+    ) -> List[Tuple[int, int]]:
+        # The pairs are scored one field at a time, edit distances last. Fields that are not scored yet count with the
+        # bound of their similarity by the sizes of the values, so a pair is dropped as soon as its bound falls below
+        # the threshold, and an edit distance stops once the pair cannot afford it.
+        weights = list(self.weights.values())
+        metrics = list(self.metrics.values())
+        functions = list(self.similarity_functions.values())
+        bounds = list(self.similarity_bounds.values())
+        columns = sorted(range(len(weights)), key=lambda column: metrics[column] == EDIT_DISTANCE)
+
+        scored = []
+        for i, j in pairs:
+            similarities = [
+                bound(a, b) if a is not None and b is not None else 0.0
+                for bound, a, b in zip(bounds, rows[i], rows[j])
+            ]
+            # fields that are blank on both sides say nothing about the pair, as in `score`
+            weight_sum = sum(w for w, a, b in zip(weights, rows[i], rows[j]) if a is not None or b is not None)
+            scored.append((i, j, similarities, weight_sum))
+
+        for column in columns:
+            weight, function = weights[column], functions[column]
+            remaining = []
+            for i, j, similarities, weight_sum in scored:
+                required = self.threshold * weight_sum - 1e-9
+                a, b = rows[i][column], rows[j][column]
+                if a is not None and b is not None:
+                    if metrics[column] == EDIT_DISTANCE and weight:
+                        others = sum(w * s for w, s in zip(weights, similarities)) - weight * similarities[column]
+                        similarities[column] = edit_distance_similarity(a, b, (required - others) / weight)
+                    else:
+                        similarities[column] = function(a, b)
+                if sum(w * s for w, s in zip(weights, similarities)) >= required:
+                    remaining.append((i, j, similarities, weight_sum))
+            scored = remaining
+
+        return [
+            (i, j) for i, j, similarities, weight_sum in scored
+            if weight_sum and sum(w * s for w, s in zip(weights, similarities)) / weight_sum >= self.threshold
+        ]
+
+    def cluster_rows(self, rows: List[Tuple[Optional[Features], ...]]) -> List[List[int]]:
+        parents = list(range(len(rows)))
+
+        def find(i: int) -> int:
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+
+        def match(pairs: List[Tuple[int, int]]):
+            # Pairs already clustered by an earlier batch are not scored again
+            for i, j in self._match_pairs(rows, [(i, j) for i, j in pairs if find(i) != find(j)]):
+                root_i, root_j = find(i), find(j)
+                if root_i != root_j:
+                    # The earliest row in the block stays the root, and so becomes the primary
+                    parents[max(root_i, root_j)] = min(root_i, root_j)
+
+        pairs = []  # type: List[Tuple[int, int]]
+        for i, candidates in self._get_candidates(rows):
+            pairs.extend((i, j) for j in candidates)
+            if len(pairs) >= PAIR_BATCH_SIZE:
+                match(pairs)
+                pairs = []
+        match(pairs)
+
+        clusters = defaultdict(list)  # type: dict
+        for i in range(len(rows)):
+            clusters[find(i)].append(i)
+        return [cluster for cluster in clusters.values() if len(cluster) > 1]
+
+    def find_clusters(
+        self,
+        model_or_queryset,
+        blocking_keys: Sequence[BlockingKey] = (),
+        order_by: Sequence[str] = ('pk', ),
+        chunk_size=2000,
+        max_block_size: Optional[int] = 10000,
+    ) -> Iterator[Tuple[Model, List[Model]]]:
+        queryset, key_names = get_blocked_queryset(model_or_queryset, blocking_keys, order_by)
+        field_names = list(self.weights)
+        debug = logger.isEnabledFor(logging.DEBUG)
+
+        blocks = groupby(
+            queryset.values_list('pk', *key_names, *field_names).iterator(chunk_size=chunk_size),
+            key=lambda row: row[1:len(key_names) + 1],
+        )
+        for blocking_key, block in blocks:
+            pks = []
+            rows = []  # type: List[Tuple[Optional[Features], ...]]
+            for row in block:
+                # without blocking keys the whole table is a single block
+                if max_block_size is not None and len(rows) == max_block_size:
+                    raise ValueError(f'Block {blocking_key} has more than {max_block_size} rows, pass blocking_keys '
+                                     f'that split it or a larger max_block_size')
+                pks.append(row[0])
+                rows.append(tuple(get_features(value) for value in row[len(key_names) + 1:]))
+
+            clusters = self.cluster_rows(rows)
+            if debug:
+                logger.debug(f'Scored {len(rows)} {queryset.model.__name__} row(s) in block {blocking_key}, '
+                             f'found {len(clusters)} cluster(s)')
+            if not clusters:
+                continue
+
+            objs = queryset.model._base_manager.in_bulk([pks[i] for cluster in clusters for i in cluster])
+            for cluster in clusters:
+                yield objs[pks[cluster[0]]], [objs[pks[i]] for i in cluster[1:]]
@@ -0,0 +1,73 @@
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from django.db.models import Field
+
+Row = Dict[str, Any]
+Strategy = Callable[[Field, List[Row]], Any]
+
+
+def coalesce(field: Field, rows: List[Row]):
+    return rows[0][field.attname]
+
+
+def most_frequent(field: Field, rows: List[Row]):
+    values = [row[field.attname] for row in rows]
+    counts = Counter(values)
+    return max(values, key=counts.__getitem__)
+
+
+def longest(field: Field, rows: List[Row]):
+    return max((row[field.attname] for row in rows), key=lambda value: len(str(value)))
+
+
+def maximum(field: Field, rows: List[Row]):
+    return max(row[field.attname] for row in rows)
+
+
+def minimum(field: Field, rows: List[Row]):
+    return min(row[field.attname] for row in rows)
+
+
+class Prioritized(object):
+    # Takes the value of the first row ordered by `order_by` attnames, e.g. Prioritized('-modified', 'id')
+
+    def __init__(self, *order_by: str) -> None:
+        self.order_by = order_by
+
+    def __call__(self, field: Field, rows: List[Row]):
+        for name in reversed(self.order_by):
+            attname = name.lstrip('-')
+            # rows without a value for `attname` always come last
+            present = [row for row in rows if row[attname] is not None]
+            present.sort(key=lambda row: row[attname], reverse=name.startswith('-'))
+            rows = present + [row for row in rows if row[attname] is None]
+        return rows[0][field.attname]
+
+
+class MostRecent(Prioritized):
+
+    def __init__(self, attname: str) -> None:
+        super().__init__(f'-{attname}')
+
+
+def resolve_field_values(
+    fields: List[Field],
+    rows: List[Row],
+    field_strategies: Optional[Dict[str, Strategy]] = None,
+    default_strategy: Strategy = coalesce,
+) -> Dict[Field, Any]:
+    # `rows` holds the primary object first, followed by the alias objects, returns the values that change
+    field_strategies = field_strategies or {}
+    values = {}
+
+    for field in fields:
+        candidate_rows = [row for row in rows if row[field.attname] not in field.empty_values]
+        if not candidate_rows:
+            continue
+
+        value = field_strategies.get(field.name, default_strategy)(field, candidate_rows)
+        if value != rows[0][field.attname]:
+            values[field] = value
+
+    return values
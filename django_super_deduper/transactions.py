@@ -0,0 +1,152 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Callable, Dict, List
+
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+class PartialCommitError(Exception):
+    # A database failed to commit after others already had, the committed writes need to be repaired by hand
+
+    def __init__(self, committed: List[str], failed: Dict[str, BaseException]) -> None:
+        self.committed = committed
+        self.failed = failed
+        super().__init__(f'Committed {", ".join(committed)} but failed to commit {", ".join(failed)}')
+
+
+class _Rollback(Exception):
+    pass
+
+
+class DatabaseParticipant(object):
+    # A thread with its own connection to one database, running the work submitted to it in order inside a single
+    # transaction that stays open until it is committed or rolled back
+
+    def __init__(self, using: str, atomic=True) -> None:
+        self.using = using
+        self.atomic = atomic
+        self.futures = []  # type: List[Future]
+        self.outcome = Future()  # type: Future
+        self._commit = False
+        self._queue = queue.Queue()  # type: queue.Queue
+        self._thread = threading.Thread(target=self._run, name=f'{__name__}[{using}]', daemon=True)
+        self._thread.start()
+
+    def submit(self, func: Callable, *args) -> Future:
+        future = Future()  # type: Future
+        self.futures.append(future)
+        self._queue.put((future, func, args))
+        return future
+
+    def _work(self) -> bool:
+        # work submitted after a failure is skipped, the transaction is only rolled back
+        failed = False
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return self._commit and not failed
+
+            future, func, args = item
+            if failed:
+                future.cancel()
+                continue
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                failed = True
+                future.set_exception(e)
+
+    def _run(self):
+        try:
+            with transaction.atomic(using=self.using) if self.atomic else nullcontext():
+                if not self._work():
+                    raise _Rollback
+        except _Rollback:
+            self.outcome.set_result(False)
+        except BaseException as e:
+            self.outcome.set_exception(e)
+        else:
+            self.outcome.set_result(True)
+        finally:
+            connections[self.using].close()
+
+    def prepare(self):
+        for future in self.futures:
+            future.result()
+
+    def finish(self, commit: bool) -> bool:
+        self._commit = commit
+        self._queue.put(None)
+        return self.outcome.result()
+
+
+class TwoPhaseCommit(object):
+    # Best-effort two-phase commit of the writes of a merge routed to other databases than the one of the merged
+    # model. Each database runs its writes concurrently in a participant, which keeps its transaction open once they
+    # succeed. Participants are only committed, one after another, once every one of them succeeded and the caller
+    # finished its own writes; otherwise they are all rolled back. Databases cannot promise to commit, so a commit
+    # failing after another one succeeded still raises `PartialCommitError`.
+
+    def __init__(self, atomic=True) -> None:
+        self.atomic = atomic
+        self.participants = {}  # type: Dict[str, DatabaseParticipant]
+
+    def submit(self, using: str, func: Callable, *args) -> Future:
+        if using not in self.participants:
+            self.participants[using] = DatabaseParticipant(using, self.atomic)
+        return self.participants[using].submit(func, *args)
+
+    def prepare(self):
+        errors = []
+        for participant in self.participants.values():
+            try:
+                participant.prepare()
+            except Exception as e:
+                errors.append(e)
+
+        if errors:
+            self.rollback()
+            raise errors[0]
+
+    def commit(self) -> None:
+        self.prepare()
+        debug = logger.isEnabledFor(logging.DEBUG)
+        participants, self.participants = self.participants, {}
+        committed = []  # type: List[str]
+        failed = {}  # type: Dict[str, BaseException]
+
+        for using, participant in participants.items():
+            if failed:
+                participant.finish(False)
+                continue
+            try:
+                participant.finish(True)
+            except Exception as e:
+                logger.error(f'Committing the merge on {using} failed: {e}')
+                failed[using] = e
+            else:
+                if debug:
+                    logger.debug(f'Committed the merge on {using}')
+                committed.append(using)
+
+        if failed and committed:
+            raise PartialCommitError(committed, failed)
+        elif failed:
+            raise next(iter(failed.values()))
+
+    def rollback(self):
+        participants, self.participants = self.participants, {}
+        for using, participant in participants.items():
+            try:
+                participant.finish(False)
+            except Exception as e:
+                logger.error(f'Rolling back the merge on {using} failed: {e}')
+            else:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f'Rolled back the merge on {using}')
@@ -14,15 +14,23 @@ setup(
     url='https://github.com/mighty-justice/django-super-deduper',
     long_description=long_description,
     classifiers=[
-        'Framework :: Django :: 1.11',
+        'Framework :: Django :: 4.2',
+        'Framework :: Django :: 5.0',
+        'Framework :: Django :: 5.1',
+        'Framework :: Django :: 5.2',
         'License :: OSI Approved :: MIT License',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
+        'Programming Language :: Python :: 3.12',
     ],
+    python_requires='>=3.8',
 
-    packages=find_packages(exclude=['tests']),
+    packages=find_packages(exclude=['benchmarks', 'tests']),
     include_package_data=True,
 
-    install_requires=['django>=1.11'],
+    install_requires=['django>=4.2'],
 
     test_suite='tests',
 )
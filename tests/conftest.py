@@ -1,3 +1,7 @@
+import os
+import tempfile
+
+import django
 from django.conf import settings
 
 
@@ -5,12 +9,27 @@ def pytest_configure():
     settings.configure(
         DATABASES={
             'default': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': ':memory:',
+                # Worker threads of `ParallelMergeExecutor` write concurrently, which an in-memory database shared
+                # between connections rejects with table locks instead of waiting. Transactions take the write lock
+                # when they begin, a transaction that read first could not wait for it without deadlocking. Every
+                # run, and every xdist worker, gets its own file.
+                'TEST': {
+                    'NAME': os.path.join(tempfile.gettempdir(), f'django_super_deduper_test_{os.getpid()}.sqlite3'),
+                },
+                'OPTIONS': {'transaction_mode': 'IMMEDIATE'} if django.VERSION >= (5, 1) else {},
+            },
+            'shard': {
                 'ENGINE': 'django.db.backends.sqlite3',
                 'NAME': ':memory:'
-            }
+            },
         },
         INSTALLED_APPS=(
             'django.contrib.contenttypes',
+            'django_super_deduper',
+            'django_super_deduper.index',
+            'django_super_deduper.journal',
             'tests',
         ),
         LOGGING={
@@ -2,7 +2,21 @@ from datetime import date
 
 from factory import DjangoModelFactory, Faker, SubFactory, fuzzy, post_generation
 
-from tests.models import Article, EarningsReport, NewsAgency, Place, Publication, Reporter, Restaurant, Waiter
+from tests.models import (
+    Article,
+    Coupon,
+    Customer,
+    EarningsReport,
+    Editorship,
+    NewsAgency,
+    Order,
+    Place,
+    Publication,
+    Reporter,
+    Reservation,
+    Restaurant,
+    Waiter,
+)
 
 
 class PlaceFactory(DjangoModelFactory):
@@ -39,6 +53,14 @@ class EarningsReportFactory(DjangoModelFactory):
         model = EarningsReport
 
 
+class ReservationFactory(DjangoModelFactory):
+    restaurant = SubFactory(RestaurantFactory)
+    table = fuzzy.FuzzyInteger(1, 50)
+
+    class Meta:
+        model = Reservation
+
+
 class NewsAgencyFactory(DjangoModelFactory):
     website = Faker('url')
 
@@ -84,3 +106,34 @@ class ArticleFactory(DjangoModelFactory):
             return
 
         self.publications.add(*PublicationFactory.create_batch(extracted))
+
+
+class EditorshipFactory(DjangoModelFactory):
+    publication = SubFactory(PublicationFactory)
+    reporter = SubFactory(ReporterFactory)
+    since = fuzzy.FuzzyDate(date(2000, 1, 1))
+
+    class Meta:
+        model = Editorship
+
+
+class CustomerFactory(DjangoModelFactory):
+    name = Faker('name')
+
+    class Meta:
+        model = Customer
+
+
+class OrderFactory(DjangoModelFactory):
+    customer = SubFactory(CustomerFactory)
+    number = Faker('numerify', text='#####')
+
+    class Meta:
+        model = Order
+
+
+class CouponFactory(DjangoModelFactory):
+    code = Faker('bothify', text='????-####')
+
+    class Meta:
+        model = Coupon
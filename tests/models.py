@@ -47,6 +47,24 @@ class EarningsReport(models.Model):
         return f'{self.restaurant}, {self.date}: {self.amount}'
 
 
+class Reservation(models.Model):
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    table = models.PositiveIntegerField()
+    cancelled = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['restaurant', 'table'],
+                condition=models.Q(cancelled=False),
+                name='unique_active_reservation',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.restaurant}, table {self.table}'
+
+
 class MaterializedReport(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.DO_NOTHING)
 
@@ -73,16 +91,30 @@ class Reporter(models.Model):
 
 class Publication(models.Model):
     title = models.CharField(max_length=30)
+    editors = models.ManyToManyField(Reporter, through='Editorship')
 
     def __str__(self):
         return self.title
 
 
+class Editorship(models.Model):
+    publication = models.ForeignKey(Publication, on_delete=models.CASCADE)
+    reporter = models.ForeignKey(Reporter, on_delete=models.CASCADE)
+    since = models.DateField(null=True)
+
+    class Meta:
+        unique_together = ('publication', 'reporter', )
+
+    def __str__(self):
+        return f'{self.reporter} edits {self.publication} since {self.since}'
+
+
 class Article(models.Model):
     headline = models.CharField(max_length=100)
     pub_date = models.DateField(auto_now_add=True)
     publications = models.ManyToManyField(Publication)
     reporter = models.ForeignKey(Reporter, on_delete=models.CASCADE, null=True)
+    editor = models.ForeignKey(Reporter, on_delete=models.SET_NULL, null=True, related_name='edited_articles')
     tags = GenericRelation('TaggedItem')
 
     def __str__(self):
@@ -97,3 +129,41 @@ class TaggedItem(models.Model):
 
     def __str__(self):
         return self.tag
+
+
+class Customer(models.Model):
+    name = models.CharField(max_length=50)
+
+    def __str__(self):
+        return self.name
+
+
+# Orders, coupons and redemptions can be routed to another database than customers, see `tests.routers`
+class Order(models.Model):
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, db_constraint=False)
+    number = models.CharField(max_length=20)
+
+    class Meta:
+        unique_together = ('customer', 'number', )
+
+    def __str__(self):
+        return self.number
+
+
+class Coupon(models.Model):
+    code = models.CharField(max_length=20)
+    customers = models.ManyToManyField(Customer, through='Redemption', related_name='coupons')
+
+    def __str__(self):
+        return self.code
+
+
+class Redemption(models.Model):
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE, db_constraint=False)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, db_constraint=False)
+
+    class Meta:
+        unique_together = ('coupon', 'customer', )
+
+    def __str__(self):
+        return f'{self.customer} redeemed {self.coupon}'
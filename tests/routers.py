@@ -0,0 +1,14 @@
+SHARDED_MODELS = ('order', 'coupon', 'redemption')
+
+
+class ShardRouter(object):
+    # orders and coupons of customers live on the `shard` database
+
+    def db_for_read(self, model, **hints):
+        return 'shard' if model._meta.model_name in SHARDED_MODELS else 'default'
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -0,0 +1,83 @@
+import json
+
+from django.core.management import CommandError, call_command
+
+import pytest
+
+from django_super_deduper.management.commands.super_dedupe import ClusterRow, Command
+from tests.factories import NewsAgencyFactory, ReporterFactory
+from tests.models import NewsAgency, Reporter
+
+
+def read_jsonl(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.django_db
+class SuperDedupeCommandTest(object):
+
+    def test_merge_csv_clusters(self, tmp_path, capsys):
+        agencies = NewsAgencyFactory.create_batch(5)
+        reporter = ReporterFactory.create(news_agency=agencies[1])
+        path = tmp_path / 'clusters.csv'
+        path.write_text(
+            'model,primary_pk,alias_pks\n'
+            f'tests.NewsAgency,{agencies[0].pk},{agencies[1].pk},{agencies[2].pk}\n'
+            f'tests.NewsAgency,{agencies[3].pk},{agencies[4].pk}\n'
+        )
+        audit_log = tmp_path / 'audit.jsonl'
+
+        call_command('super_dedupe', str(path), '--delete-aliases', '--audit-log', str(audit_log),
+                     '--transaction-size', '1')
+
+        assert set(NewsAgency.objects.all()) == {agencies[0], agencies[3]}
+        assert Reporter.objects.get(pk=reporter.pk).news_agency == agencies[0]
+        assert read_jsonl(audit_log) == [
+            {
+                'model': 'tests.NewsAgency',
+                'primary_pk': str(agencies[0].pk),
+                'alias_pks': [str(agencies[1].pk), str(agencies[2].pk)],
+                'audit_trail': [{'model': 'tests.Reporter', 'pk': reporter.pk, 'action': 'repointed'}],
+            },
+            {
+                'model': 'tests.NewsAgency',
+                'primary_pk': str(agencies[3].pk),
+                'alias_pks': [str(agencies[4].pk)],
+                'audit_trail': [],
+            },
+        ]
+        assert 'Merged 2 cluster(s), 0 failed' in capsys.readouterr().out
+
+    def test_failed_clusters_can_be_resubmitted(self, tmp_path):
+        agencies = NewsAgencyFactory.create_batch(4)
+        path = tmp_path / 'clusters.jsonl'
+        path.write_text('\n'.join(json.dumps(line) for line in [
+            {'model': 'tests.NewsAgency', 'primary_pk': agencies[0].pk, 'alias_pks': [agencies[1].pk]},
+            {'model': 'tests.NewsAgency', 'primary_pk': agencies[2].pk, 'alias_pks': [agencies[2].pk]},
+            {'model': 'tests.NewsAgency', 'primary_pk': agencies[3].pk, 'alias_pks': [0]},
+            {'model': 'tests.Missing', 'primary_pk': 1, 'alias_pks': [2]},
+        ]))
+        failures = tmp_path / 'failures.jsonl'
+
+        call_command('super_dedupe', str(path), '--delete-aliases', '--failures', str(failures))
+
+        assert not NewsAgency.objects.filter(pk=agencies[1].pk).exists()
+        assert [(line['primary_pk'], line['error'].split(':')[0]) for line in read_jsonl(failures)] == [
+            (agencies[3].pk, 'DoesNotExist'),
+            (agencies[2].pk, 'ValueError'),
+            (1, 'LookupError'),
+        ]
+
+        resubmitted_failures = tmp_path / 'resubmitted_failures.jsonl'
+        call_command('super_dedupe', str(failures), '--failures', str(resubmitted_failures))
+        assert len(read_jsonl(resubmitted_failures)) == 3
+
+    def test_batches_are_split_by_model_and_size(self):
+        rows = [ClusterRow(model, '1', ['2']) for model in ['a.A', 'a.A', 'a.A', 'a.B', 'a.A']]
+
+        assert [len(batch) for batch in Command._batches(iter(rows), 2)] == [2, 1, 1, 1]
+
+    def test_invalid_sizes(self, tmp_path):
+        with pytest.raises(CommandError):
+            call_command('super_dedupe', str(tmp_path / 'clusters.csv'), '--batch-size', '0')
@@ -0,0 +1,48 @@
+import pytest
+
+from django_super_deduper.discover import find_clusters, normalized, prefix
+from django_super_deduper.merge import MergedModelInstance
+from tests.factories import PlaceFactory
+from tests.models import Place
+
+
+@pytest.mark.django_db
+class FindClustersTest(object):
+
+    def test_find_clusters_by_normalized_key(self):
+        primary_object = PlaceFactory.create(name='Joe\'s Pizza', address='1 Main St')
+        alias_object = PlaceFactory.create(name=' joe\'s pizza', address='1 Main Street')
+        PlaceFactory.create(name='Joe\'s Pizza', address='2 Side St')
+        PlaceFactory.create(name='Other Pizza', address='1 Main St')
+
+        clusters = list(find_clusters(Place, [normalized('name'), prefix('address', 6)]))
+
+        assert clusters == [(primary_object, [alias_object])]
+
+    def test_find_clusters_ignores_null_keys(self):
+        PlaceFactory.create_batch(2, name='Same', address=None)
+
+        assert list(find_clusters(Place, ['name', 'address'])) == []
+
+    def test_find_clusters_with_queryset_order_and_match(self):
+        places = [PlaceFactory.create(name='Same', address=address) for address in ('1 Main', '2 Main', '1 Main')]
+
+        clusters = list(find_clusters(
+            Place.objects.all(),
+            ['name'],
+            order_by=['-pk'],
+            match=lambda primary_object, obj: primary_object.address == obj.address,
+        ))
+
+        assert clusters == [(places[2], [places[0]])]
+
+    def test_find_clusters_can_be_merged(self):
+        primary_object = PlaceFactory.create(name='Same', address=None)
+        alias_object = PlaceFactory.create(name='Same')
+
+        for cluster_primary_object, alias_objects in find_clusters(Place, ['name']):
+            MergedModelInstance.create(cluster_primary_object, alias_objects, keep_old=False)
+
+        primary_object.refresh_from_db()
+        assert primary_object.address == alias_object.address
+        assert Place.objects.count() == 1
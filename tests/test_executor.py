@@ -0,0 +1,94 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+import django
+
+import pytest
+
+from django_super_deduper import executor
+from django_super_deduper.executor import ParallelMergeExecutor
+from tests.factories import ArticleFactory, PlaceFactory, ReporterFactory
+from tests.models import Article, Place, Reporter
+
+
+@pytest.mark.django_db
+class ParallelMergeExecutorTest(object):
+
+    def test_schedule_separates_clusters_sharing_a_child(self):
+        clusters = [(ReporterFactory.create(), [ReporterFactory.create()]) for _ in range(3)]
+        ArticleFactory.create(reporter=clusters[0][1][0], editor=clusters[1][1][0])
+
+        assert ParallelMergeExecutor.get_conflict_graph(clusters) == {0: {1}, 1: {0}, 2: set()}
+        assert ParallelMergeExecutor.schedule(clusters) == [[0, 2], [1]]
+
+    def test_schedule_separates_overlapping_clusters(self):
+        primary_object, alias_object, other_primary_object = PlaceFactory.create_batch(3)
+
+        clusters = [(primary_object, [alias_object]), (other_primary_object, [alias_object])]
+
+        assert ParallelMergeExecutor.schedule(clusters) == [[0], [1]]
+
+    def test_run_reports_results_and_failures(self):
+        clusters = [(ReporterFactory.create(), [ReporterFactory.create()]) for _ in range(2)]
+        article = ArticleFactory.create(reporter=clusters[0][1][0], editor=clusters[1][1][0])
+        clusters.append((clusters[0][0], [clusters[0][0]]))
+
+        report = ParallelMergeExecutor(max_workers=1, keep_old=False).run(clusters)
+
+        assert (report.waves, report.merged) == (2, 2)
+        assert [result.primary_pk for result in report.failures] == [clusters[0][0].pk]
+        assert 'Cannot deduplicate an object on itself' in report.failures[0].error
+        assert report.to_dict()['failures'][0]['primary_pk'] == clusters[0][0].pk
+        assert report.throughput > 0
+
+        article = Article.objects.get(pk=article.pk)
+        assert (article.reporter, article.editor) == (clusters[0][0], clusters[1][0])
+        assert Reporter.objects.count() == 2
+
+    def test_run_without_clusters(self):
+        report = ParallelMergeExecutor(max_workers=1).run([])
+
+        assert (report.merged, report.failures) == (0, [])
+        assert Place.objects.count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(django.VERSION < (5, 1), reason='SQLite transactions cannot begin immediately before Django 5.1')
+class ConcurrentMergeExecutorTest(object):
+
+    def test_run_in_worker_threads(self, monkeypatch):
+        initialized = []
+        initialize_worker = executor._initialize_worker
+
+        def record_initialize_worker():
+            initialized.append(threading.current_thread())
+            initialize_worker()
+        monkeypatch.setattr(executor, '_initialize_worker', record_initialize_worker)
+
+        clusters = [(ReporterFactory.create(), ReporterFactory.create_batch(2)) for _ in range(3)]
+        article = ArticleFactory.create(reporter=clusters[0][1][0], editor=clusters[1][1][0])
+
+        report = ParallelMergeExecutor(max_workers=2, executor_class=ThreadPoolExecutor, keep_old=False).run(clusters)
+
+        assert (report.waves, report.merged, report.failures) == (2, 3, [])
+        assert [result.primary_pk for result in report.results] == [clusters[i][0].pk for i in (0, 2, 1)]
+        assert initialized and threading.current_thread() not in initialized
+        article = Article.objects.get(pk=article.pk)
+        assert (article.reporter, article.editor) == (clusters[0][0], clusters[1][0])
+        assert set(Reporter.objects.all()) == {primary_object for primary_object, _ in clusters}
+
+    @pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='Workers inherit the settings')
+    def test_run_in_worker_processes(self):
+        clusters = [(ReporterFactory.create(), ReporterFactory.create_batch(2)) for _ in range(3)]
+        article = ArticleFactory.create(reporter=clusters[0][1][0], editor=clusters[1][1][0])
+        # the test settings are configured in this process instead of a settings module that workers could load
+        executor_class = partial(ProcessPoolExecutor, mp_context=multiprocessing.get_context('fork'))
+
+        report = ParallelMergeExecutor(max_workers=2, executor_class=executor_class, keep_old=False).run(clusters)
+
+        assert (report.waves, report.merged, report.failures) == (2, 3, [])
+        article = Article.objects.get(pk=article.pk)
+        assert (article.reporter, article.editor) == (clusters[0][0], clusters[1][0])
+        assert set(Reporter.objects.all()) == {primary_object for primary_object, _ in clusters}
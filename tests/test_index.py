@@ -0,0 +1,108 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+import pytest
+
+from django_super_deduper.discover import normalized, prefix
+from django_super_deduper.index.indexing import (
+    find_indexed_clusters,
+    get_candidates,
+    register,
+    unregister,
+    update_index,
+)
+from django_super_deduper.index.models import DedupeIndex
+from django_super_deduper.merge import MergedModelInstance
+from tests.factories import PlaceFactory
+from tests.models import Place
+
+
+@pytest.fixture
+def indexed_places():
+    register(Place, {'name': [normalized('name')], 'address': [normalized('name'), prefix('address', 6)]})
+    yield
+    unregister(Place)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('indexed_places')
+class DedupeIndexTest(object):
+
+    def test_index_follows_save_and_delete(self):
+        place = PlaceFactory.create(name='Joe\'s Pizza', address=None)
+
+        assert list(DedupeIndex.objects.values_list('name', flat=True)) == ['name']
+
+        place.address = '1 Main St'
+        place.save()
+        key = DedupeIndex.objects.get(name='address').key
+        assert DedupeIndex.objects.filter(object_pk=str(place.pk)).count() == 2
+
+        place.address = '2 Side St'
+        place.save()
+        assert DedupeIndex.objects.get(name='address').key != key
+
+        place.delete()
+        assert not DedupeIndex.objects.exists()
+
+    def test_get_candidates_in_one_query(self):
+        place = PlaceFactory.create(name='Joe\'s Pizza', address='1 Main St')
+        same_name = PlaceFactory.create(name=' joe\'s pizza', address='2 Side St')
+        same_address = PlaceFactory.create(name='JOE\'S PIZZA', address='1 Main Street')
+        PlaceFactory.create(name='Other Pizza', address='1 Main St')
+
+        with CaptureQueriesContext(connection) as queries:
+            candidates = list(get_candidates(place).order_by('pk'))
+
+        assert candidates == [same_name, same_address]
+        assert len(queries) == 1
+        assert list(get_candidates(place, Place.objects.filter(address__startswith='1'))) == [same_address]
+
+    def test_update_index_after_bulk_writes(self):
+        Place.objects.bulk_create([Place(name='Same', address=None) for _ in range(3)])
+
+        assert not DedupeIndex.objects.exists()
+        assert update_index(Place, batch_size=2) == 3
+        assert DedupeIndex.objects.count() == 3
+
+        Place.objects.update(name='Other')
+        update_index(Place.objects.all())
+        assert DedupeIndex.objects.count() == 3
+        assert len(set(DedupeIndex.objects.values_list('key', flat=True))) == 1
+
+    def test_find_indexed_clusters_since_last_run(self):
+        primary_object, alias_object = [PlaceFactory.create(name='Same', address=None) for _ in range(2)]
+        other_primary_object, other_alias_object = [PlaceFactory.create(name='Other', address=None) for _ in range(2)]
+
+        assert sorted(find_indexed_clusters(Place), key=lambda cluster: cluster[0].pk) == [
+            (primary_object, [alias_object]),
+            (other_primary_object, [other_alias_object]),
+        ]
+
+        since = timezone.now()
+        new_object = PlaceFactory.create(name='same', address=None)
+        clusters = list(find_indexed_clusters(Place, since=since))
+
+        assert clusters == [(primary_object, [alias_object, new_object])]
+
+        for primary_object, alias_objects in clusters:
+            MergedModelInstance.create(primary_object, alias_objects, keep_old=False)
+
+        assert set(DedupeIndex.objects.values_list('object_pk', flat=True)) == {
+            str(obj.pk) for obj in (primary_object, other_primary_object, other_alias_object)
+        }
+        assert list(find_indexed_clusters(Place, since=timezone.now())) == []
+
+    def test_find_indexed_clusters_with_match(self):
+        places = [PlaceFactory.create(name='Same', address=address) for address in ('1 Main', '2 Main', '1 Main')]
+
+        clusters = list(find_indexed_clusters(Place, match=lambda a, b: a.address == b.address))
+
+        assert clusters == [(places[0], [places[2]])]
+
+    def test_unregistered_models_are_not_indexed(self):
+        unregister(Place)
+        PlaceFactory.create_batch(2, name='Same')
+
+        assert not DedupeIndex.objects.exists()
@@ -0,0 +1,62 @@
+import pytest
+from asgiref.sync import async_to_sync
+
+from django_super_deduper.instrumentation import merge_measured
+from django_super_deduper.merge import MergedModelInstance
+from tests.factories import NewsAgencyFactory, ReporterFactory
+from tests.models import NewsAgency
+
+
+@pytest.mark.django_db
+class InstrumentationTest(object):
+
+    def test_metrics_cover_every_statement(self, django_assert_max_num_queries):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        ReporterFactory.create_batch(2, news_agency=alias_object)
+
+        with django_assert_max_num_queries(20) as captured:
+            instance = MergedModelInstance._create(primary_object, [alias_object], keep_old=False, bulk=True,
+                                                   instrument=True)
+
+        metrics = instance.metrics
+        assert metrics.statements == len(captured.captured_queries)
+        assert metrics.phases['test'].rows == 2
+        assert metrics.phases['delete'].statements > 0
+        assert metrics.elapsed == sum(phase.elapsed for phase in metrics.phases.values())
+        assert [phase['name'] for phase in metrics.to_dict()['phases']][:3] == ['fields', 'prefetch', 'snapshot']
+
+    def test_metrics_are_off_by_default(self):
+        primary_object, alias_object = NewsAgencyFactory.create_batch(2)
+
+        assert MergedModelInstance._create(primary_object, [alias_object]).metrics is None
+
+    def test_merge_measured_signal(self):
+        received = []
+
+        def receiver(sender, metrics, primary_objects, **kwargs):
+            received.append((sender, metrics, primary_objects))
+
+        clusters = [(primary_object, [alias_object]) for primary_object, alias_object in
+                    zip(NewsAgencyFactory.create_batch(2), NewsAgencyFactory.create_batch(2))]
+        merge_measured.connect(receiver)
+        try:
+            MergedModelInstance.merge_many(clusters, instrument=True)
+        finally:
+            merge_measured.disconnect(receiver)
+
+        assert len(received) == 1
+        sender, metrics, primary_objects = received[0]
+        assert sender is NewsAgency
+        assert primary_objects == [primary_object for primary_object, _ in clusters]
+        assert metrics.model_name == 'NewsAgency'
+
+    def test_async_metrics(self):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        ReporterFactory.create_batch(3, news_agency=alias_object)
+
+        instance = async_to_sync(MergedModelInstance._acreate)(primary_object, [alias_object], instrument=True)
+
+        assert instance.metrics.phases['test'].rows == 3
+        assert instance.metrics.phases['fields'].statements == 1
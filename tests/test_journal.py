@@ -0,0 +1,187 @@
+from datetime import date
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from django_super_deduper.journal.models import MergeJournal
+from django_super_deduper.journal.operations import DELETE, INSERT, UPDATE, decode
+from django_super_deduper.merge import MergedModelInstance
+from tests.factories import (
+    ArticleFactory,
+    EarningsReportFactory,
+    EditorshipFactory,
+    NewsAgencyFactory,
+    PlaceFactory,
+    PublicationFactory,
+    ReporterFactory,
+    RestaurantFactory,
+    WaiterFactory,
+)
+from tests.models import (
+    Article,
+    EarningsReport,
+    Editorship,
+    NewsAgency,
+    Place,
+    Reporter,
+    Restaurant,
+    TaggedItem,
+    Waiter,
+)
+
+
+def _tables(*models):
+    return {model._meta.label: list(model._base_manager.order_by('pk').values()) for model in models}
+
+
+def _m2m_links(model):
+    return list(model._base_manager.order_by('pk').values())
+
+
+@pytest.mark.django_db
+class JournalTest(object):
+
+    def test_unmerge_restores_o2m_relations_and_deleted_aliases(self):
+        primary_object = RestaurantFactory.create(place=None, serves_pizza=False)
+        alias_object = RestaurantFactory.create(serves_pizza=True)
+        WaiterFactory.create(name='Joe', restaurant=primary_object)
+        WaiterFactory.create(name='Joe', restaurant=alias_object)
+        WaiterFactory.create_batch(3, restaurant=alias_object)
+        EarningsReportFactory.create(restaurant=primary_object, date=date(2020, 1, 1))
+        EarningsReportFactory.create(restaurant=alias_object, date=date(2020, 1, 1))
+        EarningsReportFactory.create(restaurant=alias_object, date=date(2020, 1, 2))
+        before = _tables(Place, Restaurant, Waiter, EarningsReport)
+        alias_pk = alias_object.pk
+
+        instance = MergedModelInstance._create(primary_object, [alias_object], keep_old=False, journal=True)
+
+        assert Restaurant.objects.count() == 1
+        assert Waiter.objects.filter(restaurant__isnull=True).count() == 1
+        assert EarningsReport.objects.count() == 2
+
+        journal = MergeJournal.objects.get()
+        assert journal.merge_id == instance.merge_id
+        assert journal.model == 'tests.Restaurant'
+        assert journal.primary_pk == str(primary_object.pk)
+        assert journal.alias_pks == [alias_pk]
+        assert {operation for operation, *_ in decode(journal.data)} == {UPDATE, DELETE}
+
+        MergedModelInstance.unmerge(instance.merge_id)
+
+        assert _tables(Place, Restaurant, Waiter, EarningsReport) == before
+        journal.refresh_from_db()
+        assert journal.unmerged_at is not None
+
+    def test_unmerge_restores_m2m_links(self):
+        primary_object = ReporterFactory.create()
+        alias_object = ReporterFactory.create()
+        shared_publication, publication = PublicationFactory.create_batch(2)
+        EditorshipFactory.create(reporter=primary_object, publication=shared_publication)
+        EditorshipFactory.create(reporter=alias_object, publication=shared_publication, since=date(2001, 1, 1))
+        EditorshipFactory.create(reporter=alias_object, publication=publication, since=date(2002, 1, 1))
+        ArticleFactory.create(reporter=alias_object, editor=alias_object)
+        before = _tables(Reporter, Editorship, Article)
+
+        instance = MergedModelInstance._create(primary_object, [alias_object], keep_old=False, journal=True)
+
+        assert Editorship.objects.filter(reporter=primary_object).count() == 2
+        assert INSERT in {operation for operation, *_ in decode(MergeJournal.objects.get().data)}
+
+        MergedModelInstance.unmerge(instance.merge_id)
+
+        assert _tables(Reporter, Editorship, Article) == before
+
+    def test_unmerge_restores_auto_created_m2m_links(self):
+        primary_object = ArticleFactory.create(number_of_publications=1)
+        alias_object = ArticleFactory.create(number_of_publications=2)
+        alias_object.publications.add(primary_object.publications.get())
+        through = Article.publications.through
+        before = _m2m_links(through)
+
+        instance = MergedModelInstance._create(primary_object, [alias_object], journal=True)
+
+        assert primary_object.publications.count() == 3
+        MergedModelInstance.unmerge(instance.merge_id)
+
+        assert _m2m_links(through) == before
+
+    def test_unmerge_restores_multi_table_inheritance_and_generic_relations(self):
+        primary_object = NewsAgencyFactory.create(website=None)
+        alias_object = NewsAgencyFactory.create()
+        ReporterFactory.create_batch(2, news_agency=alias_object)
+        article = ArticleFactory.create(reporter=None)
+        alias_article = ArticleFactory.create(reporter=None)
+        TaggedItem.objects.create(tag='alias', content_object=alias_article)
+        before = _tables(Place, NewsAgency, Reporter, Article, TaggedItem)
+
+        instance = MergedModelInstance._create(primary_object, [alias_object], keep_old=False, journal=True)
+        article_instance = MergedModelInstance._create(article, [alias_article], keep_old=False, journal=True)
+
+        assert not NewsAgency.objects.filter(pk=alias_object.pk).exists()
+        assert NewsAgency.objects.get(pk=primary_object.pk).website == alias_object.website
+        assert article.tags.count() == 1
+
+        MergedModelInstance.unmerge(article_instance.merge_id)
+        MergedModelInstance.unmerge(instance.merge_id)
+
+        assert _tables(Place, NewsAgency, Reporter, Article, TaggedItem) == before
+
+    def test_unmerge_restores_nested_merges(self):
+        primary_object, alias_object = PlaceFactory.create_batch(2)
+        primary_restaurant = RestaurantFactory.create(place=primary_object)
+        alias_restaurant = RestaurantFactory.create(place=alias_object)
+        WaiterFactory.create_batch(2, restaurant=alias_restaurant)
+        WaiterFactory.create(restaurant=primary_restaurant)
+        before = _tables(Place, Restaurant, Waiter)
+
+        instance = MergedModelInstance._create(primary_object, [alias_object], keep_old=False, o2o_merge_depth=1,
+                                               journal=True)
+
+        assert Restaurant.objects.count() == 1
+        assert MergeJournal.objects.count() == 1
+
+        MergedModelInstance.unmerge(instance.merge_id)
+
+        assert _tables(Place, Restaurant, Waiter) == before
+
+    def test_merge_many_writes_one_journal_per_cluster(self):
+        clusters = [(primary_object, [alias_object]) for primary_object, alias_object in
+                    zip(NewsAgencyFactory.create_batch(3), NewsAgencyFactory.create_batch(3))]
+        for _, [alias_object] in clusters:
+            ReporterFactory.create(news_agency=alias_object)
+        before = _tables(Place, NewsAgency, Reporter)
+
+        MergedModelInstance.merge_many(clusters, journal=True)
+
+        journals = MergeJournal.objects.order_by('created_at')
+        assert sorted(journal.primary_pk for journal in journals) == sorted(str(p.pk) for p, _ in clusters)
+
+        for journal in journals:
+            MergedModelInstance.unmerge(journal.merge_id)
+        assert _tables(Place, NewsAgency, Reporter) == before
+
+    def test_unmerge_twice(self):
+        primary_object, alias_object = NewsAgencyFactory.create_batch(2)
+        instance = MergedModelInstance._create(primary_object, [alias_object], journal=True)
+
+        MergedModelInstance.unmerge(instance.merge_id)
+        with pytest.raises(ValueError):
+            MergedModelInstance.unmerge(instance.merge_id)
+
+    def test_journal_is_off_by_default(self):
+        primary_object, alias_object = NewsAgencyFactory.create_batch(2)
+
+        assert MergedModelInstance._create(primary_object, [alias_object]).merge_id is None
+        assert not MergeJournal.objects.exists()
+
+    def test_acreate_journal(self):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        ReporterFactory.create(news_agency=alias_object)
+        before = _tables(Place, NewsAgency, Reporter)
+
+        instance = async_to_sync(MergedModelInstance._acreate)(primary_object, [alias_object], keep_old=False,
+                                                               journal=True)
+        MergedModelInstance.unmerge(instance.merge_id)
+
+        assert _tables(Place, NewsAgency, Reporter) == before
@@ -0,0 +1,126 @@
+import pytest
+
+from django_super_deduper.discover import prefix
+from django_super_deduper.scoring import (
+    EDIT_DISTANCE,
+    JACCARD,
+    TRIGRAM,
+    SimilarityScorer,
+    edit_distance_similarity,
+    get_features,
+    jaccard_similarity,
+    trigram_similarity,
+)
+from tests.factories import PlaceFactory
+from tests.models import Place
+
+
+class SimilarityTest(object):
+
+    def test_get_features_normalizes_values(self):
+        features = get_features(' Joe\'s  PIZZA ')
+
+        assert features.text == 'joes pizza'
+        assert features.tokens == {'joes', 'pizza'}
+        assert get_features('') is None
+        assert get_features(None) is None
+
+    def test_similarity_functions(self):
+        a, b = get_features('Joe\'s Pizza'), get_features('Joes Pizza Inc')
+
+        assert edit_distance_similarity(a, b) == pytest.approx(1 - 4 / 14)
+        assert jaccard_similarity(a, b) == pytest.approx(2 / 3)
+        assert 0 < trigram_similarity(a, b) < 1
+        assert trigram_similarity(a, a) == 1
+
+    def test_edit_distance_stops_below_the_minimum(self):
+        a, b = get_features('joes pizza'), get_features('golden dragon')
+
+        assert edit_distance_similarity(a, a, minimum=1) == 1
+        assert edit_distance_similarity(a, b, minimum=0.9) < 0.9
+        assert edit_distance_similarity(a, b, minimum=0.9) >= edit_distance_similarity(a, b)
+        assert edit_distance_similarity(a, get_features('j'), minimum=0.5) == pytest.approx(1 - 9 / 10)
+
+    def test_score_uses_weights_and_skips_blank_fields(self):
+        scorer = SimilarityScorer({'name': 3, 'address': 1}, metrics={'name': JACCARD})
+        a = (get_features('joes pizza'), get_features('1 main st'))
+        b = (get_features('joes pizza'), get_features('99 other rd'))
+
+        assert scorer.score(a, a) == 1
+        assert scorer.score(a, (a[0], None)) == pytest.approx(0.75)
+        assert scorer.score((a[0], None), (a[0], None)) == 1
+        assert scorer.score(a, b) == pytest.approx(0.75)
+
+    def test_candidates_share_more_than_a_common_trigram(self):
+        scorer = SimilarityScorer({'name': 1}, threshold=0.8)
+        rows = [(get_features(f'{name} pizza'), ) for name in ('alpha', 'bravo', 'charlie', 'alpha')]
+
+        assert list(scorer._get_candidates(rows)) == [(0, []), (1, []), (2, []), (3, [0])]
+
+    @pytest.mark.parametrize('metric', [TRIGRAM, JACCARD, EDIT_DISTANCE])
+    @pytest.mark.parametrize('threshold', [0.5, 0.8, 1])
+    def test_candidates_include_every_similar_pair(self, metric, threshold):
+        values = ['joes pizza', 'joe pizza', 'joes pizzas', 'pizza joes', 'jo', 'j', 'golden dragon', 'golden dragons']
+        scorer = SimilarityScorer({'name': 2, 'address': 1}, threshold=threshold, default_metric=metric)
+        rows = [(get_features(name), get_features(address)) for name in values for address in (None, 'main st')]
+
+        candidates = {(j, i) for i, row_candidates in scorer._get_candidates(rows) for j in row_candidates}
+
+        for i in range(len(rows)):
+            for j in range(i):
+                assert scorer.score(rows[i], rows[j]) < threshold or (j, i) in candidates
+
+    @pytest.mark.parametrize('metric', [TRIGRAM, JACCARD, EDIT_DISTANCE])
+    @pytest.mark.parametrize('threshold', [0.5, 0.8, 1])
+    def test_match_pairs_like_their_scores(self, metric, threshold):
+        values = ['joes pizza', 'joe pizza', 'joes pizzas', 'pizza joes', 'jo', 'j', 'golden dragon', 'golden dragons']
+        scorer = SimilarityScorer({'name': 2, 'address': 1}, threshold=threshold, metrics={'name': metric},
+                                  default_metric=EDIT_DISTANCE)
+        rows = [(get_features(name), get_features(address)) for name in values for address in (None, 'main st')]
+        pairs = [(i, j) for i in range(len(rows)) for j in range(i)]
+
+        assert scorer._match_pairs(rows, pairs) == [
+            (i, j) for i, j in pairs if scorer.score(rows[i], rows[j]) >= threshold
+        ]
+
+
+@pytest.mark.django_db
+class SimilarityScorerTest(object):
+
+    def test_find_clusters(self):
+        primary_object = PlaceFactory.create(name='Joe\'s Pizza', address='1 Main St')
+        alias_object = PlaceFactory.create(name='Joes Pizza Inc', address='1 Main Street')
+        PlaceFactory.create(name='Golden Dragon', address='1 Main St')
+
+        scorer = SimilarityScorer({'name': 2, 'address': 1}, threshold=0.6, metrics={'name': EDIT_DISTANCE})
+
+        assert list(scorer.find_clusters(Place)) == [(primary_object, [alias_object])]
+
+    def test_find_clusters_within_blocks(self):
+        places = [
+            PlaceFactory.create(name='Joe\'s Pizza', address=address)
+            for address in ('1 Main St', '2 Side St', '1 Main Street')
+        ]
+
+        scorer = SimilarityScorer({'name': 1}, threshold=0.9)
+        clusters = list(scorer.find_clusters(Place, [prefix('address', 6)], order_by=['-pk']))
+
+        assert clusters == [(places[2], [places[0]])]
+
+    def test_find_clusters_is_transitive(self):
+        places = [PlaceFactory.create(name=name) for name in ('abcdefghij', 'abcdefghix', 'abcdefghxx', 'zzzzzzzzzz')]
+
+        scorer = SimilarityScorer({'name': 1}, threshold=0.85, metrics={'name': EDIT_DISTANCE})
+
+        assert list(scorer.find_clusters(Place)) == [(places[0], places[1:3])]
+
+    def test_find_clusters_rejects_large_blocks(self):
+        primary_object, alias_object = PlaceFactory.create_batch(2, name='Joe\'s Pizza')
+        PlaceFactory.create(name='Golden Dragon')
+
+        scorer = SimilarityScorer({'name': 1})
+
+        with pytest.raises(ValueError):
+            list(scorer.find_clusters(Place, max_block_size=2))
+        clusters = list(scorer.find_clusters(Place, [prefix('name', 3)], max_block_size=2))
+        assert clusters == [(primary_object, [alias_object])]
@@ -0,0 +1,90 @@
+import pytest
+
+from django_super_deduper.merge import MergedModelInstance
+from django_super_deduper.strategies import (
+    MostRecent,
+    Prioritized,
+    coalesce,
+    longest,
+    maximum,
+    minimum,
+    most_frequent,
+    resolve_field_values,
+)
+from tests.factories import PlaceFactory, RestaurantFactory
+from tests.models import Place, Restaurant
+
+name = Place._meta.get_field('name')
+address = Place._meta.get_field('address')
+
+
+class StrategiesTest(object):
+
+    def test_strategies(self):
+        rows = [{'id': 3, 'name': 'b'}, {'id': 1, 'name': 'ccc'}, {'id': 2, 'name': 'a'}, {'id': 4, 'name': 'a'}]
+
+        assert coalesce(name, rows) == 'b'
+        assert most_frequent(name, rows) == 'a'
+        assert longest(name, rows) == 'ccc'
+        assert maximum(name, rows) == 'ccc'
+        assert minimum(name, rows) == 'a'
+        assert MostRecent('id')(name, rows) == 'a'
+        assert Prioritized('id')(name, rows) == 'ccc'
+
+    def test_prioritized_puts_missing_values_last(self):
+        rows = [
+            {'name': 'a', 'rank': None, 'id': 1},
+            {'name': 'b', 'rank': 1, 'id': 2},
+            {'name': 'c', 'rank': 1, 'id': 3},
+        ]
+
+        assert Prioritized('rank')(name, rows) == 'b'
+        assert Prioritized('-rank', '-id')(name, rows) == 'c'
+
+    def test_resolve_field_values(self):
+        rows = [{'name': 'Joe', 'address': None}, {'name': 'Joe\'s Pizza', 'address': ''}, {'name': '', 'address': '1'}]
+
+        assert resolve_field_values([name, address], rows) == {address: '1'}
+        assert resolve_field_values([name, address], rows, {'name': longest}) == {name: 'Joe\'s Pizza', address: '1'}
+        assert resolve_field_values([name], rows, default_strategy=minimum) == {}
+
+
+@pytest.mark.django_db
+class FieldStrategiesTest(object):
+
+    def test_merge_with_field_strategies(self):
+        primary_object = PlaceFactory.create(name='Joe', address='1 Main St')
+        alias_objects = [
+            PlaceFactory.create(name='Joe\'s Pizza', address='2 Main St'),
+            PlaceFactory.create(name='Joes', address='2 Main St'),
+        ]
+
+        merged_object = MergedModelInstance.create(
+            primary_object, alias_objects, field_strategies={'name': longest, 'address': most_frequent},
+        )
+
+        merged_object.refresh_from_db()
+        assert (merged_object.name, merged_object.address) == ('Joe\'s Pizza', '2 Main St')
+
+    def test_merge_reads_alias_values_with_one_query(self, django_assert_max_num_queries):
+        primary_object = RestaurantFactory.create(place=None, serves_pizza=False)
+        for _ in range(5):
+            RestaurantFactory.create(place=None, serves_pizza=True)
+        alias_objects = list(Restaurant.objects.exclude(pk=primary_object.pk).only('pk'))
+
+        with django_assert_max_num_queries(50) as captured:
+            MergedModelInstance.create(primary_object, alias_objects, bulk=True, default_strategy=maximum)
+
+        queries = [query['sql'] for query in captured.captured_queries]
+        assert len([query for query in queries if query.startswith('SELECT') and '"serves_pizza"' in query]) == 1
+        updates = [query for query in queries if query.startswith('UPDATE "tests_restaurant"')]
+        assert len(updates) == 1 and '"serves_pizza"' in updates[0]
+
+    def test_plan_uses_field_strategies(self):
+        primary_object = PlaceFactory.create(name='Joe')
+        alias_object = PlaceFactory.create(name='Joe\'s Pizza')
+
+        assert MergedModelInstance.plan(primary_object, [alias_object]).updated_fields == []
+        assert MergedModelInstance.plan(
+            primary_object, [alias_object], field_strategies={'name': longest},
+        ).updated_fields == ['name']
@@ -1,19 +1,39 @@
+import json
+import logging
+
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed
+from django.test.utils import CaptureQueriesContext
 
 import pytest
+from asgiref.sync import async_to_sync
 
+from django_super_deduper import merge
+from django_super_deduper.checkpoints import MemoryCheckpointStore
 from django_super_deduper.merge import MergedModelInstance
-from django_super_deduper.models import ModelMeta
+from django_super_deduper.models import ModelMeta, clear_merge_plans
+from django_super_deduper.reports import DELETED, MERGED, NULLED, REPOINTED, AuditRecord
 from tests.factories import (
     ArticleFactory,
     EarningsReportFactory,
+    EditorshipFactory,
     NewsAgencyFactory,
     PlaceFactory,
     PublicationFactory,
     ReporterFactory,
+    ReservationFactory,
     RestaurantFactory,
     WaiterFactory,
 )
+from tests.models import Article, Place, Reservation, Restaurant, TaggedItem, Waiter
+
+
+def audit_records(objs, action=REPOINTED):
+    return {AuditRecord(obj._meta.label, obj.pk, action) for obj in objs}
 
 
 @pytest.mark.django_db
@@ -110,6 +130,64 @@ class MergedModelInstanceTest(object):
         with pytest.raises(ValidationError):
             MergedModelInstance.create(primary_object, [alias_object], raise_validation_exception=True)
 
+    @pytest.mark.parametrize('bulk', [False, True])
+    def test_merge_model_with_o2m_relationship_and_conditional_unique_constraint(self, bulk):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        ReservationFactory(restaurant=primary_object, table=1)
+        duplicate_reservation = ReservationFactory(restaurant=alias_object, table=1)
+        cancelled_reservation = ReservationFactory(restaurant=alias_object, table=1, cancelled=True)
+        other_reservation = ReservationFactory(restaurant=alias_object, table=2)
+
+        merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object], bulk=bulk,
+        )
+
+        assert not Reservation.objects.filter(pk=duplicate_reservation.pk).exists()
+        assert set(merged_object.reservation_set.all()) >= {cancelled_reservation, other_reservation}
+        assert AuditRecord('tests.Reservation', duplicate_reservation.pk, DELETED) in audit_trail
+
+    def test_merge_o2m_relationship_predicts_unique_conflicts(self, django_assert_max_num_queries):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        waiter = WaiterFactory(restaurant=primary_object)
+        duplicate_waiter = WaiterFactory(name=waiter.name, restaurant=alias_object)
+        WaiterFactory.create_batch(10, restaurant=alias_object)
+
+        with django_assert_max_num_queries(30):
+            merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+                primary_object, [alias_object], merge_field_values=False,
+            )
+
+        assert merged_object.waiter_set.count() == 11
+        assert audit_trail[0] == AuditRecord('tests.Waiter', duplicate_waiter.pk, NULLED)
+
+    @pytest.mark.parametrize('factory', [ArticleFactory, PlaceFactory])
+    @pytest.mark.parametrize('bulk', [False, True])
+    def test_merge_reads_scale_with_relations_not_alias_objects(self, django_assert_max_num_queries, bulk, factory):
+        def count_queries(alias_count):
+            primary_object = factory.create()
+            alias_objects = factory.create_batch(alias_count)
+            with django_assert_max_num_queries(100) as captured:
+                MergedModelInstance.create(primary_object, alias_objects, bulk=bulk)
+            return len(captured.captured_queries)
+
+        assert count_queries(2) == count_queries(20)
+
+    def test_per_row_merge_uses_prefetched_related_rows(self):
+        primary_object = ArticleFactory.create(number_of_publications=1)
+        alias_objects = [ArticleFactory.create(number_of_publications=2) for _ in range(2)]
+        alias_objects.append(ArticleFactory.create())
+        shared_publication = primary_object.publications.get()
+        alias_objects[0].publications.add(shared_publication)
+        TaggedItem.objects.create(tag='alias', content_object=alias_objects[1])
+
+        merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, alias_objects, keep_related_objects=True,
+        )
+
+        assert merged_object.publications.count() == 5
+        assert merged_object.tags.count() == 1
+        assert shared_publication in audit_trail
+
     def test_merge_model_with_m2m_relationship(self):
         primary_object = ArticleFactory.create(reporter=None)
         related_object = ReporterFactory.create()
@@ -140,6 +218,58 @@ class MergedModelInstanceTest(object):
         with pytest.raises(TypeError):
             MergedModelInstance.create(primary_object, [alias_object])
 
+    def test_merge_saves_primary_object_once_with_updated_fields(self, django_assert_max_num_queries):
+        primary_object = NewsAgencyFactory.create(address=None, website=None)
+        alias_objects = [NewsAgencyFactory.create(address=None), NewsAgencyFactory.create(address='1 Main St')]
+
+        with django_assert_max_num_queries(10) as captured:
+            MergedModelInstance.create(primary_object, alias_objects)
+
+        updates = [query['sql'] for query in captured.captured_queries if query['sql'].startswith('UPDATE')]
+        assert len(updates) == 2
+        assert '"address"' in updates[0] and '"name"' not in updates[0]
+        assert '"website"' in updates[1]
+
+        primary_object.refresh_from_db()
+        assert primary_object.address == alias_objects[1].address
+        assert primary_object.website == alias_objects[0].website
+
+    def test_merge_skips_saving_unchanged_primary_object(self, django_assert_max_num_queries):
+        primary_object, alias_object = PlaceFactory.create_batch(2)
+
+        with django_assert_max_num_queries(10) as captured:
+            MergedModelInstance.create(primary_object, [alias_object])
+
+        assert not [query for query in captured.captured_queries if not query['sql'].startswith('SELECT')]
+
+    def test_merge_does_not_format_logs_when_debug_is_disabled(self, monkeypatch):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        WaiterFactory.create_batch(2, restaurant=alias_object)
+
+        def fail(*args, **kwargs):
+            raise AssertionError('should not be called')
+
+        monkeypatch.setattr(merge, 'serialize', fail)
+        monkeypatch.setattr(merge.logger, 'debug', fail)
+        package_logger = logging.getLogger('django_super_deduper')
+        package_logger.setLevel(logging.WARNING)
+        try:
+            merged_object = MergedModelInstance.create(primary_object, [alias_object])
+        finally:
+            package_logger.setLevel(logging.DEBUG)
+
+        assert merged_object.waiter_set.count() == 2
+
+    def test_merge_with_snapshot(self, caplog):
+        primary_object, alias_object = PlaceFactory.create_batch(2)
+
+        with caplog.at_level(logging.INFO, logger='django_super_deduper.merge.snapshots'):
+            merged_model_instance = MergedModelInstance._create(primary_object, [alias_object], take_snapshot=True)
+
+        snapshot = json.loads(merged_model_instance.snapshot)
+        assert [obj['pk'] for obj in snapshot] == [primary_object.pk, alias_object.pk]
+        assert merged_model_instance.snapshot in caplog.messages
+
     def test_merge_deletes_alias_objects(self):
         primary_object = PlaceFactory.create(address=None)
         alias_object = PlaceFactory.create()
@@ -162,7 +292,7 @@ class MergedModelInstanceTest(object):
     def test_o2o_merge_with_audit_trail(self):
         primary_object = RestaurantFactory.create(place=None, serves_hot_dogs=True, serves_pizza=False)
         alias_objects = RestaurantFactory.create_batch(3)
-        related_object = set([alias_objects[0].place])
+        related_object = audit_records([alias_objects[0].place])
 
         _, audit_trail = MergedModelInstance.create_with_audit_trail(primary_object, alias_objects)
 
@@ -171,7 +301,7 @@ class MergedModelInstanceTest(object):
     def test_o2m_merge_with_audit_trail(self):
         primary_object = NewsAgencyFactory.create()
         alias_object = NewsAgencyFactory.create()
-        related_objects = set(ReporterFactory.create_batch(3, news_agency=alias_object))
+        related_objects = audit_records(ReporterFactory.create_batch(3, news_agency=alias_object))
 
         _, audit_trail = MergedModelInstance.create_with_audit_trail(primary_object, [alias_object])
 
@@ -181,7 +311,7 @@ class MergedModelInstanceTest(object):
         primary_object = ArticleFactory.create(reporter=None)
         related_object = ReporterFactory.create()
         alias_object = ArticleFactory.create(number_of_publications=3, reporter=related_object)
-        related_objects = set(alias_object.publications.all())
+        related_objects = audit_records(alias_object.publications.all())
 
         _, audit_trail = MergedModelInstance.create_with_audit_trail(primary_object, [alias_object])
 
@@ -190,12 +320,53 @@ class MergedModelInstanceTest(object):
     def test_reverse_m2m_merge_with_audit_trail(self):
         primary_object = PublicationFactory.create()
         alias_object = PublicationFactory.create(number_of_articles=3)
-        related_objects = set(alias_object.article_set.all())
+        related_objects = audit_records(alias_object.article_set.all())
 
         _, audit_trail = MergedModelInstance.create_with_audit_trail(primary_object, [alias_object])
 
         assert set(audit_trail) == related_objects
 
+    def test_merge_with_audit_trail_of_related_objects(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        waiter = WaiterFactory(restaurant=primary_object)
+        duplicate_waiter = WaiterFactory(name=waiter.name, restaurant=alias_object)
+        other_waiter = WaiterFactory(restaurant=alias_object)
+
+        merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object], keep_related_objects=True,
+        )
+
+        assert set(audit_trail) == {duplicate_waiter, other_waiter}
+        assert {obj.restaurant for obj in audit_trail} == {None, merged_object}
+
+    def test_merge_with_audit_trail_records_actions(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        waiter = WaiterFactory(restaurant=primary_object)
+        duplicate_waiter = WaiterFactory(name=waiter.name, restaurant=alias_object)
+        report = EarningsReportFactory(restaurant=primary_object)
+        duplicate_report = EarningsReportFactory(date=report.date, restaurant=alias_object)
+        other_report = EarningsReportFactory(restaurant=alias_object)
+
+        _, audit_trail = MergedModelInstance.create_with_audit_trail(primary_object, [alias_object])
+
+        assert set(audit_trail) == (
+            audit_records([duplicate_waiter], NULLED) |
+            audit_records([duplicate_report], DELETED) |
+            audit_records([other_report])
+        )
+
+    def test_merge_streams_related_objects_in_chunks(self):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        related_objects = ReporterFactory.create_batch(5, news_agency=alias_object)
+
+        _, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object], iterator_chunk_size=2,
+        )
+
+        assert audit_trail == [AuditRecord('tests.Reporter', obj.pk, REPOINTED) for obj in related_objects]
+        assert primary_object.test.count() == 5
+
     def test_merge_generic_foreign_keys(self):
         primary_object = ArticleFactory()
         alias_object = ArticleFactory()
@@ -206,6 +377,629 @@ class MergedModelInstanceTest(object):
 
         assert merged_object.tags.count() == 2
 
+    def test_bulk_merge_generic_relation_with_one_update(self, django_assert_max_num_queries):
+        primary_object, alias_object, other_alias_object = ArticleFactory.create_batch(3)
+        for alias in (alias_object, other_alias_object):
+            for i in range(10):
+                alias.tags.create(content_object=alias, tag=f'tag-{i}')
+
+        with django_assert_max_num_queries(10) as captured:
+            merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+                primary_object, [alias_object, other_alias_object], bulk=True, merge_field_values=False,
+            )
+
+        updates = [query['sql'] for query in captured.captured_queries if query['sql'].startswith('UPDATE')]
+        assert len(updates) == 1 and '"content_type_id" =' in updates[0]
+        assert merged_object.tags.count() == 20
+        assert set(audit_trail) == audit_records(merged_object.tags.all())
+
+    def test_merge_many_generic_relations(self):
+        articles = ArticleFactory.create_batch(4)
+        tags = [articles[i].tags.create(content_object=articles[i], tag='python') for i in (1, 3)]
+
+        MergedModelInstance.merge_many([(articles[0], [articles[1]]), (articles[2], [articles[3]])])
+
+        assert [tag.object_id for tag in TaggedItem.objects.filter(pk__in=[tag.pk for tag in tags])] == [
+            articles[0].pk, articles[2].pk,
+        ]
+
+    @pytest.mark.parametrize('bulk', [True, False])
+    def test_merge_undeclared_generic_foreign_keys(self, bulk):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        tag = TaggedItem.objects.create(content_object=alias_object, tag='pizza')
+
+        MergedModelInstance.create(primary_object, [alias_object], bulk=bulk)
+        tag.refresh_from_db()
+        assert tag.content_object == alias_object
+
+        MergedModelInstance.create(primary_object, [alias_object], bulk=bulk, generic_foreign_keys=True)
+        tag.refresh_from_db()
+        assert tag.content_object == primary_object
+
+    def test_bulk_merge_model_with_o2m_relationship(self):
+        primary_object = NewsAgencyFactory.create()
+        alias_objects = NewsAgencyFactory.create_batch(2)
+        related_objects = ReporterFactory.create_batch(3, news_agency=alias_objects[0])
+        related_objects += ReporterFactory.create_batch(2, news_agency=alias_objects[1])
+
+        merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, alias_objects, bulk=True, keep_related_objects=True,
+        )
+
+        assert set(audit_trail) == set(related_objects)
+        assert all(obj.news_agency == merged_object for obj in audit_trail)
+        assert set(merged_object.test.all()) == set(related_objects)
+
+    def test_bulk_merge_model_with_o2m_relationship_and_unique_validation_set_null(self):
+        primary_object, alias_object, other_alias_object = RestaurantFactory.create_batch(3)
+        waiter = WaiterFactory(restaurant=primary_object)
+        duplicate_waiter = WaiterFactory(name=waiter.name, restaurant=alias_object)
+        other_waiter = WaiterFactory(restaurant=alias_object)
+        other_duplicate_waiter = WaiterFactory(name=other_waiter.name, restaurant=other_alias_object)
+
+        merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object, other_alias_object], bulk=True, keep_related_objects=True,
+        )
+
+        waiter.refresh_from_db()
+        assert waiter.restaurant == merged_object
+
+        other_waiter.refresh_from_db()
+        assert other_waiter.restaurant == merged_object
+
+        for obj in (duplicate_waiter, other_duplicate_waiter):
+            obj.refresh_from_db()
+            assert obj.restaurant is None
+
+        assert set(audit_trail) == {duplicate_waiter, other_waiter, other_duplicate_waiter}
+        assert [obj.restaurant for obj in audit_trail if obj == duplicate_waiter] == [None]
+
+    def test_bulk_merge_model_with_o2m_relationship_and_unique_validation_delete(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        report = EarningsReportFactory(restaurant=primary_object)
+        other_report = EarningsReportFactory(date=report.date, restaurant=alias_object)
+
+        merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object], bulk=True,
+        )
+
+        report.refresh_from_db()
+        assert report.restaurant == merged_object
+
+        with pytest.raises(EarningsReportFactory._meta.model.DoesNotExist):
+            other_report.refresh_from_db()
+
+        assert audit_trail == [AuditRecord('tests.EarningsReport', other_report.pk, DELETED)]
+
+    def test_bulk_merge_model_with_o2m_relationship_and_raise_unique_validation(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        report = EarningsReportFactory(restaurant=primary_object)
+        other_report = EarningsReportFactory(date=report.date, restaurant=alias_object)
+
+        with pytest.raises(ValidationError):
+            MergedModelInstance.create(primary_object, [alias_object], bulk=True, raise_validation_exception=True)
+
+        other_report.refresh_from_db()
+        assert other_report.restaurant == alias_object
+
+    def test_bulk_merge_o2m_query_count_does_not_scale_with_children(self, django_assert_max_num_queries):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        ReporterFactory.create_batch(20, news_agency=alias_object)
+
+        with django_assert_max_num_queries(10):
+            MergedModelInstance.create(primary_object, [alias_object], bulk=True, merge_field_values=False)
+
+        assert primary_object.test.count() == 20
+
+    def test_bulk_merge_model_with_m2m_relationship(self):
+        primary_object = ArticleFactory.create(number_of_publications=1)
+        alias_object = ArticleFactory.create(number_of_publications=3)
+        shared_publication = alias_object.publications.first()
+        primary_object.publications.add(shared_publication)
+        related_objects = list(alias_object.publications.all())
+
+        merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object], bulk=True,
+        )
+
+        assert merged_object.publications.count() == 4
+        assert alias_object.publications.count() == 0
+        assert set(audit_trail) == audit_records(related_objects)
+
+    def test_bulk_merge_model_with_reverse_m2m_relationship(self):
+        primary_object = PublicationFactory.create()
+        alias_objects = [PublicationFactory.create(number_of_articles=3) for _ in range(2)]
+
+        merged_object = MergedModelInstance.create(primary_object, alias_objects, bulk=True)
+
+        assert merged_object.article_set.count() == 6
+        assert all(alias_object.article_set.count() == 0 for alias_object in alias_objects)
+
+    def test_bulk_merge_model_with_custom_through_model(self):
+        primary_object, alias_object = PublicationFactory.create_batch(2)
+        editorship = EditorshipFactory.create(publication=primary_object)
+        EditorshipFactory.create(publication=alias_object, reporter=editorship.reporter)
+        other_editorship = EditorshipFactory.create(publication=alias_object)
+
+        merged_object = MergedModelInstance.create(primary_object, [alias_object], bulk=True)
+
+        assert set(merged_object.editors.all()) == {editorship.reporter, other_editorship.reporter}
+        assert merged_object.editorship_set.get(reporter=other_editorship.reporter).since == other_editorship.since
+        assert alias_object.editorship_set.count() == 0
+
+    def test_bulk_merge_m2m_signals_are_opt_in(self):
+        primary_object = ArticleFactory.create()
+        alias_object, other_alias_object = [ArticleFactory.create(number_of_publications=2) for _ in range(2)]
+        actions = []
+
+        def receiver(sender, action, **kwargs):
+            actions.append(action)
+
+        m2m_changed.connect(receiver)
+        try:
+            MergedModelInstance.create(primary_object, [alias_object], bulk=True)
+            assert actions == []
+
+            MergedModelInstance.create(primary_object, [other_alias_object], bulk=True, send_m2m_signals=True)
+            assert actions == ['pre_remove', 'pre_add', 'post_remove', 'post_add']
+        finally:
+            m2m_changed.disconnect(receiver)
+
+
+@pytest.mark.django_db
+class MergeManyTest(object):
+
+    def test_merge_many_o2m_relationship(self):
+        clusters = [(NewsAgencyFactory.create(), NewsAgencyFactory.create_batch(2)) for _ in range(3)]
+        related_objects = {
+            primary_object: set(ReporterFactory.create_batch(2, news_agency=alias_objects[0]) +
+                                ReporterFactory.create_batch(1, news_agency=alias_objects[1]))
+            for primary_object, alias_objects in clusters
+        }
+
+        audit_trails = MergedModelInstance.merge_many(clusters, keep_related_objects=True)
+
+        assert [audit_trail[0] for audit_trail in audit_trails] == [cluster[0] for cluster in clusters]
+        for primary_object, audit_trail in audit_trails:
+            assert set(audit_trail) == related_objects[primary_object]
+            assert all(obj.news_agency == primary_object for obj in audit_trail)
+            assert set(primary_object.test.all()) == related_objects[primary_object]
+
+    def test_merge_many_o2m_unique_conflicts_are_per_cluster(self):
+        primary_object, alias_object, other_primary_object, other_alias_object = RestaurantFactory.create_batch(4)
+        report = EarningsReportFactory(restaurant=primary_object)
+        duplicate_report = EarningsReportFactory(date=report.date, restaurant=alias_object)
+        other_report = EarningsReportFactory(date=report.date, restaurant=other_alias_object)
+
+        MergedModelInstance.merge_many([(primary_object, [alias_object]), (other_primary_object, [other_alias_object])])
+
+        with pytest.raises(EarningsReportFactory._meta.model.DoesNotExist):
+            duplicate_report.refresh_from_db()
+
+        other_report.refresh_from_db()
+        assert other_report.restaurant == other_primary_object
+
+    def test_merge_many_m2m_relationship(self):
+        clusters = [(ArticleFactory.create(), [ArticleFactory.create(number_of_publications=2)]) for _ in range(3)]
+        related_objects = {
+            primary_object: audit_records(alias_objects[0].publications.all())
+            for primary_object, alias_objects in clusters
+        }
+
+        audit_trails = MergedModelInstance.merge_many(clusters)
+
+        for primary_object, audit_trail in audit_trails:
+            assert set(audit_trail) == related_objects[primary_object]
+            assert audit_records(primary_object.publications.all()) == related_objects[primary_object]
+
+    def test_merge_many_query_count_does_not_scale_with_clusters(self, django_assert_max_num_queries):
+        clusters = [(NewsAgencyFactory.create(), [NewsAgencyFactory.create()]) for _ in range(10)]
+        for _, alias_objects in clusters:
+            ReporterFactory.create_batch(2, news_agency=alias_objects[0])
+
+        with django_assert_max_num_queries(2):
+            MergedModelInstance.merge_many(clusters, merge_field_values=False)
+
+    def test_merge_many_overlapping_clusters(self):
+        primary_object, alias_object, other_primary_object = PlaceFactory.create_batch(3)
+
+        with pytest.raises(ValueError):
+            MergedModelInstance.merge_many([(primary_object, [alias_object]), (other_primary_object, [alias_object])])
+
+    def test_merge_many_different_models(self):
+        with pytest.raises(TypeError):
+            MergedModelInstance.merge_many([
+                (PlaceFactory.create(), [PlaceFactory.create()]),
+                (ArticleFactory.create(), [ArticleFactory.create()]),
+            ])
+
+
+class InterruptingCheckpointStore(MemoryCheckpointStore):
+
+    def __init__(self, interrupt_after: int) -> None:
+        super().__init__()
+        self.interrupt_after = interrupt_after
+
+    def set(self, key, value):
+        super().set(key, value)
+        self.interrupt_after -= 1
+        if not self.interrupt_after:
+            raise KeyboardInterrupt
+
+
+@pytest.mark.django_db
+class ChunkedMergeTest(object):
+
+    def test_chunked_merge_o2m_relationship(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        waiter = WaiterFactory(restaurant=primary_object)
+        duplicate_waiter = WaiterFactory(name=waiter.name, restaurant=alias_object)
+        waiters = WaiterFactory.create_batch(4, restaurant=alias_object)
+        checkpoint_store = MemoryCheckpointStore()
+
+        merged_object, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object], chunk_size=2, checkpoint_store=checkpoint_store,
+        )
+
+        assert set(merged_object.waiter_set.all()) == {waiter, *waiters}
+        duplicate_waiter.refresh_from_db()
+        assert duplicate_waiter.restaurant is None
+        assert set(audit_trail) == audit_records(waiters) | audit_records([duplicate_waiter], NULLED)
+        assert checkpoint_store.checkpoints == {}
+
+    def test_chunked_merge_resumes_from_checkpoint(self):
+        primary_object, alias_object = NewsAgencyFactory.create_batch(2)
+        reporters = ReporterFactory.create_batch(5, news_agency=alias_object)
+        checkpoint_store = InterruptingCheckpointStore(interrupt_after=2)
+
+        with pytest.raises(KeyboardInterrupt):
+            MergedModelInstance.create(primary_object, [alias_object], chunk_size=2, checkpoint_store=checkpoint_store)
+
+        assert primary_object.test.count() == 4
+        assert list(checkpoint_store.checkpoints.values()) == [reporters[3].pk]
+
+        _, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object], chunk_size=2, checkpoint_store=checkpoint_store,
+        )
+
+        assert audit_trail == [AuditRecord('tests.Reporter', reporters[4].pk, REPOINTED)]
+        assert set(primary_object.test.all()) == set(reporters)
+        assert checkpoint_store.checkpoints == {}
+
+    def test_checkpoint_store_rejects_atomic_merges(self):
+        primary_object, alias_object = NewsAgencyFactory.create_batch(2)
+
+        with pytest.raises(ValueError):
+            MergedModelInstance.create(primary_object, [alias_object], chunk_size=2, atomic=True,
+                                       checkpoint_store=MemoryCheckpointStore())
+
+    @pytest.mark.django_db(transaction=True)
+    def test_checkpoint_store_rejects_outer_transactions(self):
+        primary_object, alias_object = NewsAgencyFactory.create_batch(2)
+        ReporterFactory.create_batch(3, news_agency=alias_object)
+        checkpoint_store = MemoryCheckpointStore()
+
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                MergedModelInstance.create(primary_object, [alias_object], chunk_size=2,
+                                           checkpoint_store=checkpoint_store)
+
+        assert checkpoint_store.checkpoints == {}
+        assert alias_object.test.count() == 3
+
+
+@pytest.mark.django_db
+class AtomicMergeTest(object):
+
+    def test_atomic_merge_rolls_back_the_cluster(self, monkeypatch):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        related_objects = ReporterFactory.create_batch(2, news_agency=alias_object)
+
+        def fail(self):
+            raise RuntimeError
+
+        monkeypatch.setattr(MergedModelInstance, '_save_primary_object', fail)
+        with pytest.raises(RuntimeError):
+            MergedModelInstance.create(primary_object, [alias_object], keep_old=False, atomic=True)
+
+        alias_object = NewsAgencyFactory._meta.model.objects.get(pk=related_objects[0].news_agency_id)
+        assert set(alias_object.test.all()) == set(related_objects)
+
+    def test_atomic_merge_locks_rows_in_a_single_transaction(self, django_assert_max_num_queries):
+        primary_object = NewsAgencyFactory.create()
+        alias_objects = NewsAgencyFactory.create_batch(2)
+        ReporterFactory.create(news_agency=alias_objects[0])
+
+        with django_assert_max_num_queries(30) as captured:
+            merged_object = MergedModelInstance.create(primary_object, alias_objects, bulk=True, atomic=True)
+
+        queries = [query['sql'] for query in captured.captured_queries]
+        assert queries[1].startswith('SELECT') and 'ORDER BY' in queries[1]
+        assert len([query for query in queries if query.startswith('SAVEPOINT')]) == 1
+        assert merged_object.test.count() == 1
+
+    def test_async_atomic_merge(self):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        related_object = ReporterFactory.create(news_agency=alias_object)
+
+        merged_object = async_to_sync(MergedModelInstance.acreate)(primary_object, [alias_object], atomic=True)
+
+        assert list(merged_object.test.all()) == [related_object]
+
+
+@pytest.mark.django_db
+class RecursiveMergeTest(object):
+
+    def test_merge_forward_o2o_objects(self):
+        primary_object = RestaurantFactory.create(place__address=None)
+        alias_object = RestaurantFactory.create()
+        primary_place, alias_place = primary_object.place, alias_object.place
+
+        _, audit_trail = MergedModelInstance.create_with_audit_trail(
+            primary_object, [alias_object], keep_old=False, o2o_merge_depth=1,
+        )
+
+        primary_place.refresh_from_db()
+        assert primary_place.address == alias_place.address
+        assert list(Place.objects.all()) == [primary_place]
+        assert audit_records([alias_place], MERGED) <= set(audit_trail)
+
+    def test_merge_reverse_o2o_objects(self):
+        primary_object = RestaurantFactory.create().place
+        alias_restaurant = RestaurantFactory.create()
+        waiter = WaiterFactory.create(restaurant=alias_restaurant)
+
+        merged_object = MergedModelInstance.create(
+            primary_object, [alias_restaurant.place], keep_old=False, o2o_merge_depth=1,
+        )
+
+        assert list(Restaurant.objects.all()) == [merged_object.restaurant]
+        assert list(merged_object.restaurant.waiter_set.all()) == [waiter]
+
+    def test_merge_o2o_objects_of_aliases_into_the_moved_one(self):
+        primary_object = RestaurantFactory.create(place=None)
+        alias_objects = RestaurantFactory.create_batch(2)
+        alias_places = [alias_object.place for alias_object in alias_objects]
+
+        merged_object = MergedModelInstance.create(primary_object, alias_objects, keep_old=False, o2o_merge_depth=1)
+
+        assert merged_object.place == alias_places[0]
+        assert list(Place.objects.all()) == [alias_places[0]]
+
+    @pytest.mark.parametrize('bulk', [True, False])
+    def test_merge_reverse_o2o_objects_of_aliases_into_the_moved_one(self, bulk):
+        primary_object = PlaceFactory.create()
+        alias_restaurants = RestaurantFactory.create_batch(2)
+        waiters = [WaiterFactory.create(restaurant=restaurant) for restaurant in alias_restaurants]
+
+        merged_object = MergedModelInstance.create(
+            primary_object, [restaurant.place for restaurant in alias_restaurants], bulk=bulk, keep_old=False,
+            o2o_merge_depth=1,
+        )
+
+        assert list(Restaurant.objects.all()) == [alias_restaurants[0]]
+        assert Restaurant.objects.get().place_id == merged_object.pk
+        assert sorted(Waiter.objects.values_list('pk', 'restaurant_id')) == [
+            (waiter.pk, alias_restaurants[0].pk) for waiter in waiters
+        ]
+
+    def test_move_reverse_o2o_object_without_recursion(self):
+        primary_object = PlaceFactory.create()
+        alias_restaurant = RestaurantFactory.create()
+
+        merged_object = MergedModelInstance.create(primary_object, [alias_restaurant.place], keep_old=False)
+
+        assert list(Restaurant.objects.values_list('pk', 'place_id')) == [(alias_restaurant.pk, merged_object.pk)]
+
+    def test_o2o_objects_are_left_alone_without_recursion(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+
+        MergedModelInstance.create(primary_object, [alias_object], keep_old=False)
+
+        assert Place.objects.count() == 2
+
+    def test_recursion_stops_at_cycles(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        WaiterFactory.create(restaurant=alias_object)
+
+        merged_object = MergedModelInstance.create(primary_object, [alias_object], keep_old=False, o2o_merge_depth=10)
+
+        assert Place.objects.count() == 1
+        assert list(Restaurant.objects.all()) == [merged_object]
+        assert merged_object.waiter_set.count() == 1
+
+    def test_nested_merges_are_batched_per_level(self, monkeypatch):
+        clusters = [
+            (primary_object.place, [alias_object.place])
+            for primary_object, alias_object in zip(*[RestaurantFactory.create_batch(3) for _ in range(2)])
+        ]
+        batches = []
+        merge_clusters = MergedModelInstance._merge_clusters.__func__
+
+        def record(cls, merges):
+            batches.append(len(merges))
+            merge_clusters(cls, merges)
+
+        monkeypatch.setattr(MergedModelInstance, '_merge_clusters', classmethod(record))
+        MergedModelInstance.merge_many(clusters, keep_old=False, o2o_merge_depth=2)
+
+        assert batches == [3, 3]
+        assert Restaurant.objects.count() == 3
+
+    def test_amerge_reverse_o2o_objects(self):
+        primary_object = RestaurantFactory.create().place
+        alias_restaurant = RestaurantFactory.create()
+        waiter = WaiterFactory.create(restaurant=alias_restaurant)
+
+        async_to_sync(MergedModelInstance.acreate)(
+            primary_object, [alias_restaurant.place], keep_old=False, o2o_merge_depth=1,
+        )
+
+        assert Restaurant.objects.count() == 1
+        assert Waiter.objects.get(pk=waiter.pk).restaurant.place == primary_object
+
+
+@pytest.mark.django_db
+class AsyncMergeTest(object):
+
+    def test_acreate_o2m_relationship_and_unique_validation(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        waiter = WaiterFactory(restaurant=primary_object)
+        duplicate_waiter = WaiterFactory(name=waiter.name, restaurant=alias_object)
+        other_waiter = WaiterFactory(restaurant=alias_object)
+
+        merged_object, audit_trail = async_to_sync(MergedModelInstance.acreate_with_audit_trail)(
+            primary_object, [alias_object], keep_old=False,
+        )
+
+        assert set(merged_object.waiter_set.all()) == {waiter, other_waiter}
+        duplicate_waiter.refresh_from_db()
+        assert duplicate_waiter.restaurant is None
+        assert set(audit_trail) == {
+            AuditRecord('tests.Waiter', duplicate_waiter.pk, NULLED),
+            AuditRecord('tests.Waiter', other_waiter.pk, REPOINTED),
+        }
+        assert not Restaurant.objects.filter(pk=alias_object.pk).exists()
+
+    def test_acreate_m2m_relationship_and_fields(self):
+        primary_object = ArticleFactory.create(number_of_publications=1, reporter=None)
+        alias_object = ArticleFactory.create(number_of_publications=2)
+        primary_object.publications.add(alias_object.publications.first())
+        alias_object.tags.create(content_object=alias_object, tag='python')
+
+        merged_object = async_to_sync(MergedModelInstance.acreate)(primary_object, [alias_object])
+
+        merged_object.refresh_from_db()
+        assert merged_object.publications.count() == 3
+        assert alias_object.publications.count() == 0
+        assert merged_object.reporter_id == alias_object.reporter_id
+        assert [tag.tag for tag in merged_object.tags.all()] == ['python']
+
+    def test_acreate_generic_relation_with_cold_caches(self):
+        primary_object, alias_object = ArticleFactory.create_batch(2)
+        tag = alias_object.tags.create(content_object=alias_object, tag='python')
+        clear_merge_plans()
+        ContentType.objects.clear_cache()
+
+        merged_object = async_to_sync(MergedModelInstance.acreate)(primary_object, [alias_object])
+
+        assert list(merged_object.tags.all()) == [tag]
+
+    def test_amerge_per_row_m2m_relationship_with_signals(self):
+        primary_object = PublicationFactory.create()
+        alias_object = PublicationFactory.create(number_of_articles=2)
+        actions = []
+
+        def receiver(action, **kwargs):
+            actions.append(action)
+
+        m2m_changed.connect(receiver, sender=Article.publications.through)
+        try:
+            merged_model_instance = MergedModelInstance(primary_object, bulk=False, send_m2m_signals=True)
+            async_to_sync(merged_model_instance.amerge)(alias_object)
+        finally:
+            m2m_changed.disconnect(receiver, sender=Article.publications.through)
+
+        assert primary_object.article_set.count() == 2
+        assert 'post_add' in actions
+
+    def test_acreate_per_row_o2o_relationship(self):
+        primary_object = PlaceFactory.create()
+        alias_object = RestaurantFactory.create().place
+
+        merged_object = async_to_sync(MergedModelInstance.acreate)(primary_object, [alias_object], bulk=False)
+
+        assert merged_object.restaurant.pk == Restaurant.objects.get().pk
+
+
+@pytest.mark.django_db
+class MergePlanTest(object):
+
+    def test_plan_o2m_relationship_with_unique_conflicts(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        waiter = WaiterFactory(restaurant=primary_object)
+        WaiterFactory(name=waiter.name, restaurant=alias_object)
+        WaiterFactory(restaurant=alias_object)
+        report = EarningsReportFactory(restaurant=primary_object)
+        EarningsReportFactory(date=report.date, restaurant=alias_object)
+
+        merge_report = MergedModelInstance.plan(primary_object, [alias_object])
+        relations = {relation.accessor_name: relation for relation in merge_report.relations}
+
+        assert (relations['waiter_set'].repointed, relations['waiter_set'].nulled) == (1, 1)
+        assert (relations['earningsreport_set'].repointed, relations['earningsreport_set'].deleted) == (0, 1)
+        assert merge_report.conflicts == 2
+        assert alias_object.waiter_set.count() == 2
+        assert alias_object.earningsreport_set.count() == 1
+
+    def test_plan_m2m_and_o2o_relationships(self):
+        primary_object = ArticleFactory.create(number_of_publications=1)
+        alias_object = ArticleFactory.create(number_of_publications=2)
+        primary_object.publications.add(alias_object.publications.first())
+
+        relations = {
+            relation.accessor_name: relation
+            for relation in MergedModelInstance.plan(primary_object, [alias_object]).relations
+        }
+
+        assert (relations['publications'].repointed, relations['publications'].deleted) == (1, 1)
+        assert primary_object.publications.count() == 2
+
+        primary_object = RestaurantFactory.create(place=None, serves_hot_dogs=True, serves_pizza=False)
+        alias_objects = RestaurantFactory.create_batch(2)
+
+        merge_report = MergedModelInstance.plan(primary_object, alias_objects, keep_old=False)
+
+        assert {relation.accessor_name: relation.repointed for relation in merge_report.relations}['place'] == 1
+        assert merge_report.updated_fields == ['place']
+        assert merge_report.deleted_aliases == 2
+
+    def test_plan_does_not_write(self, django_assert_max_num_queries):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        ReporterFactory.create_batch(3, news_agency=alias_object)
+
+        with django_assert_max_num_queries(20) as captured:
+            merge_report = MergedModelInstance.plan(primary_object, [alias_object])
+
+        assert all(query['sql'].startswith('SELECT') for query in captured.captured_queries)
+        assert merge_report.repointed == 3
+        assert merge_report.to_dict()['relations']
+        assert primary_object.test.count() == 0
+
+    def test_plan_estimates_fewer_statements_in_bulk_mode(self):
+        primary_object = NewsAgencyFactory.create()
+        alias_object = NewsAgencyFactory.create()
+        ReporterFactory.create_batch(10, news_agency=alias_object)
+
+        merge_report = MergedModelInstance.plan(primary_object, [alias_object])
+        bulk_merge_report = MergedModelInstance.plan(primary_object, [alias_object], bulk=True)
+
+        assert bulk_merge_report.estimated_statements < merge_report.estimated_statements
+
+    @pytest.mark.parametrize('bulk', [True, False])
+    @pytest.mark.parametrize('keep_old', [True, False])
+    def test_plan_estimates_the_statements_of_the_merge(self, bulk, keep_old):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+        waiter = WaiterFactory(restaurant=primary_object)
+        WaiterFactory(name=waiter.name, restaurant=alias_object)
+        WaiterFactory(restaurant=alias_object)
+        primary_article = ArticleFactory.create(number_of_publications=1)
+        alias_article = ArticleFactory.create(number_of_publications=2)
+        primary_place, alias_place = PlaceFactory.create(), RestaurantFactory.create().place
+
+        for primary_object, alias_object in [
+            (primary_object, alias_object), (primary_article, alias_article), (primary_place, alias_place),
+        ]:
+            merge_report = MergedModelInstance.plan(primary_object, [alias_object], bulk=bulk, keep_old=keep_old)
+            with CaptureQueriesContext(connection) as captured:
+                MergedModelInstance.create(primary_object, [alias_object], bulk=bulk, keep_old=keep_old)
+
+            assert merge_report.estimated_statements == len(captured.captured_queries)
+
 
 @pytest.mark.django_db
 class ModelMetaTest(object):
@@ -217,3 +1011,48 @@ class ModelMetaTest(object):
 
         for field in model_meta.related_fields:
             assert field.related_model._meta.managed
+
+    def test_merge_plan_is_memoized(self):
+        primary_object, alias_object = RestaurantFactory.create_batch(2)
+
+        assert ModelMeta(primary_object).merge_plan is ModelMeta(alias_object).merge_plan
+
+    def test_merge_plan_is_cleared(self):
+        merge_plan = ModelMeta(RestaurantFactory()).merge_plan
+
+        setting_changed.send(sender=None, setting='DEBUG', value=True, enter=True)
+        assert ModelMeta(RestaurantFactory()).merge_plan is merge_plan
+
+        setting_changed.send(sender=None, setting='INSTALLED_APPS', value=[], enter=True)
+        other_merge_plan = ModelMeta(RestaurantFactory()).merge_plan
+        assert other_merge_plan is not merge_plan
+
+        clear_merge_plans()
+        assert ModelMeta(RestaurantFactory()).merge_plan is not other_merge_plan
+
+    def test_merge_plan_undeclared_generic_relations(self):
+        model_meta = ModelMeta(RestaurantFactory())
+        relations = model_meta.get_relations(generic_foreign_keys=True)
+
+        assert relations[:-1] == model_meta.relations
+        assert relations[-1].generic_foreign_key == TaggedItem._meta.get_field('content_object')
+        assert relations[-1].content_type == ContentType.objects.get_for_model(Restaurant)
+        assert ModelMeta(ArticleFactory()).merge_plan.undeclared_generic_relations == []
+
+    def test_merge_plan_relations(self):
+        relations = {relation.accessor_name: relation for relation in ModelMeta(ArticleFactory()).relations}
+
+        assert relations['tags'].is_generic
+        assert relations['tags'].generic_foreign_key == TaggedItem._meta.get_field('content_object')
+        assert relations['tags'].remote_field_name == 'content_object'
+        assert relations['publications'].many_to_many and not relations['publications'].reverse
+
+        relations = {relation.accessor_name: relation for relation in ModelMeta(RestaurantFactory()).relations}
+
+        assert relations['waiter_set'].remote_field == Waiter._meta.get_field('restaurant')
+        assert relations['waiter_set'].null
+        assert relations['waiter_set'].unique_field_sets == [('name', 'restaurant')]
+        assert relations['reservation_set'].conditional_unique_field_sets == [
+            (('restaurant', 'table'), Q(cancelled=False)),
+        ]
+        assert not relations['earningsreport_set'].null
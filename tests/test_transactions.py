@@ -0,0 +1,225 @@
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from django_super_deduper.merge import MergedModelInstance
+from django_super_deduper.transactions import PartialCommitError, TwoPhaseCommit
+from tests.factories import CouponFactory, CustomerFactory, OrderFactory
+from tests.models import Coupon, Customer, Order, Place, Redemption, Waiter
+
+DATABASES = ['default', 'shard']
+
+
+@pytest.fixture
+def sharded(settings):
+    settings.DATABASE_ROUTERS = ['tests.routers.ShardRouter']
+
+
+def _create_customers():
+    primary_object, alias_object = CustomerFactory.create_batch(2)
+    OrderFactory.create(customer=primary_object, number='1')
+    OrderFactory.create(customer=alias_object, number='1')
+    OrderFactory.create(customer=alias_object, number='2')
+    shared_coupon, coupon = CouponFactory.create_batch(2)
+    primary_object.coupons.add(shared_coupon)
+    alias_object.coupons.add(shared_coupon, coupon)
+    return primary_object, alias_object
+
+
+def _create_customers_on(using):
+    primary_object, alias_object = [Customer.objects.using(using).create(name=name) for name in ('Joe', 'Joseph')]
+    Order.objects.using(using).create(customer=primary_object, number='1')
+    Order.objects.using(using).create(customer=alias_object, number='1')
+    Order.objects.using(using).create(customer=alias_object, number='2')
+    shared_coupon, coupon = [Coupon.objects.using(using).create(code=code) for code in ('A', 'B')]
+    primary_object.coupons.add(shared_coupon)
+    alias_object.coupons.add(shared_coupon, coupon)
+    return primary_object, alias_object
+
+
+def _shard_rows():
+    return (
+        sorted(Order.objects.using('shard').values_list('customer_id', 'number')),
+        sorted(Redemption.objects.using('shard').values_list('customer_id', 'coupon_id')),
+    )
+
+
+@pytest.mark.django_db(databases=DATABASES, transaction=True)
+@pytest.mark.usefixtures('sharded')
+class CrossDatabaseMergeTest(object):
+
+    @pytest.mark.parametrize('bulk', [True, False])
+    def test_merge_rewrites_relations_on_their_database(self, bulk):
+        primary_object, alias_object = _create_customers()
+
+        instance = MergedModelInstance._create(primary_object, [alias_object], bulk=bulk, atomic=True, keep_old=False,
+                                               instrument=True)
+
+        assert not Customer.objects.filter(pk=alias_object.pk).exists()
+        assert sorted(Order.objects.using('shard').values_list('customer_id', 'number')) == [
+            (primary_object.pk, '1'), (primary_object.pk, '2'),
+        ]
+        assert set(Redemption.objects.using('shard').values_list('customer_id', flat=True)) == {primary_object.pk}
+        assert Redemption.objects.using('shard').count() == 2
+        assert not Order.objects.using('default').exists()
+        assert instance.metrics.phases['order_set'].statements > 0
+
+    def test_failure_rolls_back_every_database(self, monkeypatch):
+        primary_object, alias_object = _create_customers()
+        alias_pk = alias_object.pk
+        before = _shard_rows()
+
+        def fail(self):
+            raise ValueError('Saving failed')
+        monkeypatch.setattr(MergedModelInstance, '_save_primary_object', fail)
+
+        with pytest.raises(ValueError):
+            MergedModelInstance.create(primary_object, [alias_object], bulk=True, atomic=True, keep_old=False)
+
+        assert _shard_rows() == before
+        assert Customer.objects.filter(pk=alias_pk).exists()
+
+    def test_failure_on_another_database_rolls_back_the_merge(self):
+        primary_object, alias_object = _create_customers()
+        before = _shard_rows()
+
+        with pytest.raises(ValidationError):
+            MergedModelInstance.create(primary_object, [alias_object], bulk=True, atomic=True, keep_old=False,
+                                       raise_validation_exception=True)
+
+        assert _shard_rows() == before
+        assert Customer.objects.filter(pk=alias_object.pk).exists()
+
+    def test_merge_twice_with_the_same_instance(self):
+        primary_object, alias_object = _create_customers()
+        other_alias_object = CustomerFactory.create()
+        OrderFactory.create(customer=other_alias_object, number='3')
+
+        instance = MergedModelInstance(primary_object, bulk=True, keep_old=False)
+        instance.merge(alias_object)
+        instance.merge(other_alias_object)
+
+        assert instance.two_phase_commit is None
+        assert sorted(Order.objects.using('shard').values_list('customer_id', 'number')) == [
+            (primary_object.pk, '1'), (primary_object.pk, '2'), (primary_object.pk, '3'),
+        ]
+
+    def test_journal_merge_twice_with_the_same_instance(self):
+        primary_object, alias_object = _create_customers()
+        other_alias_object = CustomerFactory.create()
+        OrderFactory.create(customer=other_alias_object, number='3')
+        alias_pks = [alias_object.pk, other_alias_object.pk]
+        before = _shard_rows()
+
+        instance = MergedModelInstance(primary_object, keep_old=False, journal=True)
+        instance.merge(alias_object)
+        first_merge_id = instance.merge_id
+        instance.merge(other_alias_object)
+
+        assert instance.merge_id != first_merge_id
+        MergedModelInstance.unmerge(instance.merge_id)
+        MergedModelInstance.unmerge(first_merge_id)
+
+        assert _shard_rows() == before
+        assert Customer.objects.filter(pk__in=alias_pks).count() == 2
+
+    def test_unmerge_replays_every_database(self):
+        primary_object, alias_object = _create_customers()
+        alias_pk = alias_object.pk
+        before = _shard_rows()
+
+        instance = MergedModelInstance._create(primary_object, [alias_object], keep_old=False, journal=True)
+        assert _shard_rows() != before
+        MergedModelInstance.unmerge(instance.merge_id)
+
+        assert _shard_rows() == before
+        assert Customer.objects.filter(pk=alias_pk).exists()
+
+    def test_merge_many_and_acreate(self):
+        clusters = [_create_customers() for _ in range(2)]
+
+        MergedModelInstance.merge_many([(primary_object, [alias_object]) for primary_object, alias_object in clusters],
+                                       keep_old=False)
+        primary_object, alias_object = _create_customers()
+        async_to_sync(MergedModelInstance.acreate)(primary_object, [alias_object], keep_old=False)
+
+        assert Customer.objects.count() == 3
+        assert set(Order.objects.using('shard').values_list('customer_id', flat=True)) == {
+            primary_object.pk for primary_object, _ in [*clusters, (primary_object, None)]
+        }
+
+
+@pytest.mark.django_db(databases=DATABASES, transaction=True)
+class InstanceHintsTest(object):
+    # without routers, objects are written to the database of the instance they are related to
+
+    def test_acreate(self):
+        primary_object, alias_object = _create_customers_on('shard')
+
+        async_to_sync(MergedModelInstance.acreate)(primary_object, [alias_object], keep_old=False)
+
+        assert not Customer.objects.using('shard').filter(pk=alias_object.pk).exists()
+        coupon_pks = Coupon.objects.using('shard').values_list('pk', flat=True)
+        assert _shard_rows() == (
+            [(primary_object.pk, '1'), (primary_object.pk, '2')],
+            sorted((primary_object.pk, coupon_pk) for coupon_pk in coupon_pks),
+        )
+
+    def test_unmerge(self):
+        primary_object, alias_object = _create_customers_on('shard')
+        alias_pk = alias_object.pk
+        before = _shard_rows()
+
+        instance = MergedModelInstance._create(primary_object, [alias_object], keep_old=False, journal=True)
+        assert _shard_rows() != before
+        MergedModelInstance.unmerge(instance.merge_id)
+
+        assert _shard_rows() == before
+        assert Customer.objects.using('shard').filter(pk=alias_pk).exists()
+
+
+@pytest.mark.django_db(databases=DATABASES, transaction=True)
+class TwoPhaseCommitTest(object):
+
+    def test_commit_after_every_participant_succeeded(self):
+        two_phase_commit = TwoPhaseCommit()
+        two_phase_commit.submit('default', lambda: Place.objects.using('default').create(name='default'))
+        two_phase_commit.submit('shard', lambda: Place.objects.using('shard').create(name='shard'))
+
+        two_phase_commit.prepare()
+        two_phase_commit.commit()
+
+        assert Place.objects.using('default').get().name == 'default'
+        assert Place.objects.using('shard').get().name == 'shard'
+
+    def test_failed_participant_rolls_back_every_participant(self):
+        def fail():
+            raise ValueError('Failed')
+
+        two_phase_commit = TwoPhaseCommit()
+        two_phase_commit.submit('default', lambda: Place.objects.using('default').create(name='default'))
+        two_phase_commit.submit('shard', fail)
+        skipped = two_phase_commit.submit('shard', lambda: Place.objects.using('shard').create(name='shard'))
+
+        with pytest.raises(ValueError):
+            two_phase_commit.prepare()
+
+        assert skipped.cancelled()
+        assert not Place.objects.using('default').exists()
+        assert not Place.objects.using('shard').exists()
+
+    def test_partial_commit(self):
+        two_phase_commit = TwoPhaseCommit()
+        two_phase_commit.submit('default', lambda: Place.objects.using('default').create(name='default'))
+        # foreign keys are checked when the transaction commits
+        two_phase_commit.submit('shard', lambda: Waiter.objects.using('shard').create(name='Joe', restaurant_id=1))
+
+        with pytest.raises(PartialCommitError) as excinfo:
+            two_phase_commit.commit()
+
+        assert excinfo.value.committed == ['default']
+        assert isinstance(excinfo.value.failed['shard'], IntegrityError)
+        assert Place.objects.using('default').exists()
+        assert not Waiter.objects.using('shard').exists()